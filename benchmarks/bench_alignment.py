@@ -0,0 +1,82 @@
+"""Alignment scoring vs. the positional loop: cost per passage length and batch throughput.
+
+Part 1 types passages of increasing length with a few random typos
+(substitutions, insertions, deletions) and times calculate_accuracy's
+positional loop, the bit-parallel distance alone, and the full
+substitution/insertion/deletion count. It also shows how many mistakes
+each method reports. Part 2 runs batch_alignment over distinct synthetic
+sessions.
+Run from the repo root:  python -m benchmarks.bench_alignment
+"""
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from src.alignment import batch_alignment, edit_counts, levenshtein
+from src.features import calculate_accuracy
+from src.reference_corpus import BUILTIN_TEXTS as REFERENCE_TEXTS
+
+def passage(length, rng):
+    words = " ".join(REFERENCE_TEXTS).split()
+    text = ""
+    while len(text) < length:
+        text += rng.choice(words) + " "
+    return text[:length].strip()
+
+def with_typos(text, rate, rng):
+    out = []
+    for ch in text:
+        r = rng.random()
+        if r < rate / 3:
+            out.append(rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif r < 2 * rate / 3:
+            out.append(ch + rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif r >= rate:
+            out.append(ch)
+    return "".join(out)
+
+def per_call_us(fn, pairs):
+    start = time.perf_counter()
+    results = [fn(a, b) for a, b in pairs]
+    return (time.perf_counter() - start) / len(pairs) * 1e6, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[50, 150, 1000, 5000, 20000])
+    parser.add_argument("--typo-rate", type=float, default=0.03)
+    parser.add_argument("--sessions", type=int, default=100_000, help="sessions in the batch test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    print(f"{'chars':>7} {'positional us':>14} {'distance us':>12} {'s/i/d us':>10} {'s/i/d ns/char':>14} "
+          f"{'positional mistakes':>20} {'edits':>7}")
+    for length in args.lengths:
+        repeats = max(3, 20_000 // length)
+        pairs = []
+        for _ in range(repeats):
+            ref = passage(length, rng)
+            pairs.append((ref, with_typos(ref, args.typo_rate, rng)))
+        pos_us, pos = per_call_us(calculate_accuracy, pairs)
+        dist_us, _ = per_call_us(levenshtein, pairs)
+        sid_us, sid = per_call_us(edit_counts, pairs)
+        print(f"{length:7d} {pos_us:14.1f} {dist_us:12.1f} {sid_us:10.1f} {sid_us * 1000 / length:14.0f} "
+              f"{np.mean([m for _, m in pos]):20.1f} {np.mean([sum(c) for c in sid]):7.1f}")
+
+    refs, typed = [], []
+    for _ in range(args.sessions):
+        ref = rng.choice(REFERENCE_TEXTS)
+        refs.append(ref)
+        typed.append(with_typos(ref, args.typo_rate, rng))
+    print(f"\nbatch_alignment on {args.sessions:,} sessions ({len(set(zip(refs, typed))):,} distinct):")
+    for workers in args.workers:
+        start = time.perf_counter()
+        batch_alignment(refs, typed, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"  workers={workers}: {elapsed:.2f} s, {args.sessions / elapsed:,.0f} sessions/s")
+
+if __name__ == "__main__":
+    main()
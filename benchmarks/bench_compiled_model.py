@@ -0,0 +1,75 @@
+"""Single-row latency and batch throughput: joblib/sklearn model vs. compiled arrays.
+
+Run from the repo root:  python -m benchmarks.bench_compiled_model
+(train_model.py writes models/stress_model.npz; if it is missing it is
+compiled here from models/stress_model.pkl.)
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.compiled_model import COMPILED_PATH, CompiledModel, compile_model
+from src.predict_stress import FEATURES, MODEL_PATH
+
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "chars_per_sec": rng.uniform(0.5, 8, n),
+        "mistakes_per_char": rng.uniform(0, 0.6, n),
+        "difficulty_score": rng.integers(0, 120, n).astype(float),
+        "word_mistake_rate": rng.uniform(0, 0.1, n),
+        "accuracy_percent": rng.uniform(40, 100, n),
+        "sleep_hours": rng.integers(0, 10, n).astype(float)
+    })
+
+def latencies(fn, rows, warmup=20):
+    for row in rows[:warmup]:
+        fn(row)
+    out = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        fn(row)
+        out[i] = time.perf_counter() - start
+    return out * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--single", type=int, default=500, help="single-row predictions to time")
+    parser.add_argument("--batch", type=int, default=100_000, help="rows in the batch test")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    if os.path.exists(COMPILED_PATH):
+        compiled = CompiledModel.load(COMPILED_PATH)
+    else:
+        compiled = CompiledModel(compile_model(model, feature_names=FEATURES))
+
+    X = random_features(args.batch)
+    start = time.perf_counter()
+    expected = model.predict(X)
+    sk_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    got = compiled.predict(X.to_numpy())
+    compiled_batch = time.perf_counter() - start
+    assert np.array_equal(expected, got), "compiled predictions differ from sklearn"
+    assert np.array_equal(model.predict_proba(X[:2000]), compiled.predict_proba(X[:2000].to_numpy()))
+
+    rows = [dict(r) for r in X[:args.single].to_dict(orient="records")]
+    # Current path in live_predict/tk_ui: one-row DataFrame -> model.predict.
+    sk = latencies(lambda r: model.predict(pd.DataFrame([r]))[0], rows)
+    values = [[r[f] for f in FEATURES] for r in rows]
+    comp = latencies(compiled.predict_one, values)
+
+    print(f"model: {type(model).__name__}, {compiled.kind} arrays")
+    print(f"{'path':<22} {'p50 us':>10} {'p99 us':>10} {'batch rows/s':>14}")
+    for name, lat, batch in (("joblib + sklearn", sk, sk_batch), ("compiled arrays", comp, compiled_batch)):
+        print(f"{name:<22} {np.percentile(lat, 50):10.1f} {np.percentile(lat, 99):10.1f} "
+              f"{args.batch / batch:14,.0f}")
+    print(f"predictions identical on {args.batch:,} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Rows/sec of the batch feature engine vs. the old row-wise apply.
+
+The engine (batch_session_features) is timed on its own and compared with
+the apply; alignment (batch_alignment) and the whole build_features, which
+runs both, are reported next to it.
+
+Run from the repo root:  python -m benchmarks.bench_feature_engineering
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import DATA_FILE, build_features
+from src.alignment import batch_alignment
+from src.features import batch_session_features, word_level_mistakes
+
+def resample_sessions(n_rows, seed=0):
+    """Resample the real sessions up to n_rows (text columns share string objects)."""
+    base = pd.read_csv(DATA_FILE)
+    idx = np.random.default_rng(seed).integers(0, len(base), size=n_rows)
+    df = base.iloc[idx].reset_index(drop=True)
+    df["session_id"] = np.arange(1, n_rows + 1)
+    return df
+
+def rowwise_features(df):
+    """The pre-batch implementation, kept here as the baseline."""
+    df["chars_per_sec"] = df["typed_text_len"] / df["time_taken_sec"]
+    df["mistakes_per_char"] = df["mistake_count"] / df["reference_text_len"]
+    df["difficulty_score"] = df["backspace_estimate"]
+    df["word_mistake_count"] = df.apply(
+        lambda row: word_level_mistakes(row["reference_text"], row["typed_text"]),
+        axis=1
+    )
+    df["word_mistake_rate"] = df["word_mistake_count"] / df["reference_text_len"]
+    df["sleep_hours"] = df["sleep_hours"].fillna(0)
+    return df
+
+def time_it(fn, df):
+    start = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--rowwise-max", type=int, default=1_000_000,
+                        help="skip the slow row-wise baseline above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'row-wise rows/s':>16} {'engine rows/s':>14} {'speedup':>8} "
+          f"{'alignment rows/s':>17} {'build_features rows/s':>22}")
+    for n in args.sizes:
+        df = resample_sessions(n)
+        _, engine_sec = time_it(
+            lambda d: batch_session_features(d["reference_text"], d["typed_text"], d["time_taken_sec"], d["sleep_hours"]),
+            df
+        )
+        _, align_sec = time_it(lambda d: batch_alignment(d["reference_text"], d["typed_text"]), df)
+        batch, build_sec = time_it(build_features, df.copy())
+        if n <= args.rowwise_max:
+            rowwise, row_sec = time_it(rowwise_features, df.copy())
+            # The batch engine also adds the alignment columns, which the baseline never had.
+            pd.testing.assert_frame_equal(batch[rowwise.columns], rowwise)
+            row_rate = f"{n / row_sec:16,.0f}"
+            speedup = f"{row_sec / engine_sec:7.1f}x"
+        else:
+            row_rate, speedup = f"{'-':>16}", f"{'-':>8}"
+        print(f"{n:>12,} {row_rate} {n / engine_sec:14,.0f} {speedup} {n / align_sec:17,.0f} {n / build_sec:22,.0f}")
+
+if __name__ == "__main__":
+    main()
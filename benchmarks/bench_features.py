@@ -0,0 +1,53 @@
+"""What the reference-text cache buys: feature throughput with and without it.
+
+Scalar and batch features per second with the LRU cache of per-reference
+data and with it bypassed, for a few batch sizes. Parity of the online and
+offline features is checked in tests/test_features.py, on the same
+synthetic sessions (tests/helpers.py).
+Run from the repo root:  python -m benchmarks.bench_features
+"""
+import argparse
+import time
+
+from src import features
+from src.features import Reference, batch_session_features, session_features
+from tests.helpers import typed_sessions
+
+def throughput(refs, typed, times, sleep, batch_size, cached):
+    original = features.reference_info
+    if cached:
+        original.cache_clear()
+    else:
+        # Rebuild the per-reference data on every call, as the copies did.
+        features.reference_info = Reference
+    try:
+        start = time.perf_counter()
+        if batch_size == 1:
+            for r, t, s, h in zip(refs, typed, times, sleep):
+                session_features(r, t, s, h)
+        else:
+            for i in range(0, len(refs), batch_size):
+                j = i + batch_size
+                batch_session_features(refs[i:j], typed[i:j], times[i:j], sleep[i:j])
+        return len(refs) / (time.perf_counter() - start)
+    finally:
+        features.reference_info = original
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1_000, 100_000])
+    args = parser.parse_args()
+
+    refs, typed, times, sleep = typed_sessions(args.sessions)
+    print(f"{'batch size':>10} {'no cache /s':>14} {'LRU cache /s':>14} {'speed-up':>9}")
+    for size in args.batch_sizes:
+        n = min(len(refs), 20_000) if size == 1 else len(refs)
+        args_n = (refs[:n], typed[:n], times[:n], sleep[:n])
+        plain = throughput(*args_n, size, cached=False)
+        cached = throughput(*args_n, size, cached=True)
+        print(f"{size:10,d} {plain:14,.0f} {cached:14,.0f} {cached / plain:8.2f}x")
+    print(features.reference_info.cache_info())
+
+if __name__ == "__main__":
+    main()
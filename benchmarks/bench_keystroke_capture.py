@@ -0,0 +1,102 @@
+"""Per-event cost of keystroke capture, and whether Tk keeps up at typing speed.
+
+Part 1 calls the ring-buffer handlers directly (no display needed) and
+compares them with the obvious list-of-tuples recorder, in time and in
+memory allocated per event. Part 2 (needs a display) binds the recorder to
+a Tk Text widget, injects key events with event_generate at several rates,
+and reports how late the handler ran and whether every event arrived.
+Run from the repo root:  python -m benchmarks.bench_keystroke_capture
+"""
+import argparse
+import time
+import tracemalloc
+
+from src.keystrokes import KeystrokeRecorder, keystroke_stats
+
+class FakeEvent:
+    keysym_num = 0x61
+
+class ListRecorder:
+    """Baseline: one tuple appended per event."""
+
+    def __init__(self):
+        self.events = []
+
+    def on_key_down(self, event):
+        self.events.append((time.perf_counter_ns(), event.keysym_num, 1))
+
+    def on_key_up(self, event):
+        self.events.append((time.perf_counter_ns(), event.keysym_num, 0))
+
+def per_event(recorder, n):
+    event = FakeEvent()
+    down, up = recorder.on_key_down, recorder.on_key_up
+    start = time.perf_counter_ns()
+    for _ in range(n // 2):
+        down(event)
+        up(event)
+    return (time.perf_counter_ns() - start) / n / 1000
+
+def allocated(recorder, n):
+    event = FakeEvent()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(n // 2):
+        recorder.on_key_down(event)
+        recorder.on_key_up(event)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(s.size_diff for s in after.compare_to(before, "filename")) / n
+
+def tk_keep_up(rates, seconds):
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"\nTk test skipped (no display: {e})")
+        return
+    text = tk.Text(root)
+    text.pack()
+    recorder = KeystrokeRecorder()
+    recorder.bind(text)
+    root.update()
+    text.focus_force()
+    print(f"\n{'keys/s':>7} {'events':>7} {'captured':>9} {'mean lag ms':>12} {'max lag ms':>11}")
+    for rate in rates:
+        recorder.reset()
+        n = int(rate * seconds)
+        sent = []
+        def send(i=0):
+            if i >= n:
+                root.quit()
+                return
+            sent.append(time.perf_counter_ns())
+            text.event_generate("<KeyPress>", keysym="a", when="now")
+            text.event_generate("<KeyRelease>", keysym="a", when="now")
+            root.after(max(1, int(1000 / rate)), send, i + 1)
+        root.after(10, send)
+        root.mainloop()
+        times, keys, kinds = recorder.events()
+        downs = times[kinds == 1]
+        lags = [(t - s) / 1e6 for t, s in zip(downs.tolist(), sent)]
+        print(f"{rate:7d} {2 * n:7d} {len(times):9d} {sum(lags) / max(1, len(lags)):12.3f} "
+              f"{max(lags, default=0.0):11.3f}")
+        print(f"        achieved {keystroke_stats(times, keys, kinds)['keys_per_sec']:.1f} keys/s")
+    root.destroy()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--rates", type=int, nargs="+", default=[15, 60, 200])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{'recorder':<24} {'us/event':>9} {'bytes/event':>12}")
+    for name, make in (("ring buffer (array)", KeystrokeRecorder), ("list of tuples", ListRecorder)):
+        cost = per_event(make(), args.events)
+        mem = allocated(make(), 100_000)
+        print(f"{name:<24} {cost:9.3f} {mem:12.1f}")
+    tk_keep_up(args.rates, args.seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Load time and per-process memory: joblib .pkl vs compiled .npz vs memory-mapped registry.
+
+Run from the repo root:  python -m benchmarks.bench_model_registry
+A forest is trained on random sessions (large enough for the difference to
+show), saved all three ways in a temporary directory, then --workers
+processes load it at the same time and each scores a batch. Memory is read
+from /proc/self/smaps_rollup while all of them hold the model: PSS splits
+shared pages between the processes mapping them, so a model all workers
+share costs each only its share.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from benchmarks.bench_compiled_model import random_features
+from src import model_registry
+from src.compiled_model import CompiledModel, export_model
+from src.predict_stress import FEATURES
+
+def memory_kb():
+    """{Rss, Pss, Private} of this process in KB (Linux)."""
+    out = {}
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                out[key] = int(value.split()[0])
+    out["Private"] = out.pop("Private_Clean") + out.pop("Private_Dirty")
+    return out
+
+def load(method, path):
+    if method == "joblib .pkl":
+        return joblib.load(path)
+    if method == "compiled .npz":
+        return CompiledModel.load(path)
+    return model_registry.load(registry=path)
+
+def worker(method, path, X, barrier, results):
+    before = memory_kb()
+    start = time.perf_counter()
+    model = load(method, path)
+    load_ms = (time.perf_counter() - start) * 1000
+    model.predict(X)
+    barrier.wait()
+    after = memory_kb()
+    results.put((load_ms, {k: after[k] - before[k] for k in after}))
+    # Stay alive until every worker has measured, so the pages stay shared.
+    barrier.wait()
+
+def run(method, path, X, workers):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(method, path, X, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trees", type=int, default=200, help="trees in the benchmark forest")
+    parser.add_argument("--rows", type=int, default=20_000, help="training rows (deeper trees with more rows)")
+    parser.add_argument("--workers", type=int, default=4, help="processes loading the model at once")
+    args = parser.parse_args()
+
+    X = random_features(args.rows)
+    rng = np.random.default_rng(1)
+    y = np.clip(np.round(X["mistakes_per_char"] * 4 + rng.normal(0, 0.7, args.rows)), 0, 2).astype(int)
+    model = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(X[FEATURES], y)
+    X_score = X[FEATURES][:2000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl = os.path.join(tmp, "stress_model.pkl")
+        joblib.dump(model, pkl)
+        npz = export_model(model, os.path.join(tmp, "stress_model.npz"), feature_names=FEATURES, source_path=pkl)
+        registry = os.path.join(tmp, "registry")
+        model_registry.publish(model, FEATURES, registry=registry)
+        assert np.array_equal(model_registry.load(registry=registry).predict(X_score), model.predict(X_score))
+
+        print(f"forest: {args.trees} trees, {sum(e.tree_.node_count for e in model.estimators_):,} nodes; "
+              f"{args.workers} workers")
+        print(f"{'artifact':<16} {'load ms':>9} {'RSS KB':>9} {'private KB':>11} {'PSS KB':>9}   (per worker)")
+        for method, path in (("joblib .pkl", pkl), ("compiled .npz", npz), ("registry mmap", registry)):
+            out = run(method, path, X_score, args.workers)
+            load_ms = np.median([ms for ms, _ in out])
+            mem = {k: np.mean([m[k] for _, m in out]) for k in ("Rss", "Private", "Pss")}
+            print(f"{method:<16} {load_ms:9.2f} {mem['Rss']:9,.0f} {mem['Private']:11,.0f} {mem['Pss']:9,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Online updates vs. full retraining as the session archive grows.
+
+The archive (real sessions resampled, features jittered so rows are not
+exact copies) arrives in batches. At each checkpoint it reports the time
+to fold the latest batch into the online model, the time to retrain the
+same pipeline (and the RandomForest train_model.py uses) on everything so
+far, and the accuracy of each on a held-out set.
+Run from the repo root:  python -m benchmarks.bench_online_model --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from benchmarks.bench_feature_engineering import resample_sessions
+from src.online_model import labeled_xy, new_model, partial_update
+
+def jittered(n, seed):
+    X, y = labeled_xy(resample_sessions(n, seed=seed))
+    noise = np.random.default_rng(seed).lognormal(0.0, 0.1, X.shape)
+    return X * noise, y
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--batch", type=int, default=500, help="sessions per online update")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--rf-max", type=int, default=100_000, help="skip the RandomForest retrain above this size")
+    args = parser.parse_args()
+
+    X, y = jittered(max(args.sizes), seed=1)
+    X_test, y_test = jittered(5_000, seed=2)
+    online = new_model()
+    seen = 0
+    print(f"{'archive':>9} {'update s':>9} {'retrain s':>10} {'rf retrain s':>13} "
+          f"{'online acc':>11} {'retrain acc':>12} {'rf acc':>7}")
+    for size in sorted(args.sizes):
+        last = 0.0
+        while seen < size:
+            stop = min(seen + args.batch, size)
+            _, last = timed(lambda: partial_update(online, X[seen:stop], y[seen:stop], args.epochs, seed=seen))
+            seen = stop
+        full, retrain = timed(lambda: partial_update(new_model(), X[:size], y[:size], args.epochs))
+        if size <= args.rf_max:
+            rf, rf_time = timed(lambda: RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
+                                .fit(X[:size], y[:size]))
+            rf_acc = f"{np.mean(rf.predict(X_test) == y_test):7.3f}"
+            rf_time = f"{rf_time:13.3f}"
+        else:
+            rf_acc, rf_time = f"{'-':>7}", f"{'-':>13}"
+        print(f"{size:9,d} {last:9.4f} {retrain:10.3f} {rf_time} "
+              f"{np.mean(online.predict(X_test) == y_test):11.3f} {np.mean(full.predict(X_test) == y_test):12.3f} {rf_acc}")
+
+if __name__ == "__main__":
+    main()
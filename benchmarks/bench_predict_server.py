@@ -0,0 +1,86 @@
+"""Request latency and throughput of the warm prediction server vs. a cold process.
+
+Starts a server on a temporary socket, fires single-row requests from
+concurrent client threads, and compares with what a fresh live_predict.py
+pays (interpreter start, imports, model load) to score one session.
+Run from the repo root:  python -m benchmarks.bench_predict_server --clients 1 8 32
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_compiled_model import random_features
+from src import predict_server
+from src.compiled_model import load_predictor, model_features
+from src.features import FEATURES
+from src.predict_stress import MODEL_PATH
+
+# One row with whatever inputs the current model takes (Z_FEATURES too for a
+# --user-relative model), as MicroBatcher.feature_names() resolves them.
+COLD_START = (
+    "from src.live_predict import load_model; "
+    "from src.compiled_model import model_features, model_input; from src.features import FEATURES; "
+    "model = load_model(); names = model_features(model, FEATURES); "
+    "model.predict(model_input(model, [dict.fromkeys(names, 1.0)], names))"
+)
+
+def run_clients(address, rows, clients):
+    latencies = [[] for _ in range(clients)]
+    def client(i):
+        for row in rows[i::clients]:
+            start = time.perf_counter()
+            predict_server.request({"rows": [row]}, address)
+            latencies[i].append(time.perf_counter() - start)
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, np.concatenate(latencies) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", COLD_START], check=True, stderr=subprocess.DEVNULL)
+    cold = time.perf_counter() - start
+    print(f"cold process (start + imports + load + predict): {cold * 1000:.0f} ms")
+
+    model = load_predictor(MODEL_PATH)
+    X = random_features(args.requests)
+    for name in model_features(model, FEATURES):
+        if name not in X:
+            # User-relative z-scores.
+            X[name] = np.random.default_rng(1).normal(0, 1, len(X))
+    rows = X.to_dict(orient="records")
+    address = os.path.join(tempfile.mkdtemp(prefix="keystrokesense-"), "predict.sock") \
+        if predict_server.HAS_UNIX_SOCKETS else ("127.0.0.1", predict_server.DEFAULT_PORT)
+    print(f"{'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>10}")
+    for clients in args.clients:
+        server = predict_server.make_server(model, address, window_ms=args.window_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            elapsed, lat = run_clients(address, rows, clients)
+            stats = server.batcher.stats()
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.batcher.stop()
+        print(f"{clients:7d} {len(rows) / elapsed:9,.0f} {np.percentile(lat, 50):8.2f} "
+              f"{np.percentile(lat, 99):8.2f} {stats['mean_batch_rows']:10.1f}")
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Start-up cost of each entry point: import breakdown and wall-clock to the first prompt.
+
+For every entry point this runs, in fresh interpreters:
+  * `python -X importtime -c "import src.<module>"` and reports the total
+    import time with its most expensive direct imports, and
+  * the entry point itself, timing until its first prompt appears on
+    stdout/stderr (the process is then killed).
+Each figure is the median of --repeats runs. The run fails (exit status 1)
+if an entry point imports pandas, sklearn or joblib at start-up, or if its
+time to first prompt exceeds its threshold.
+
+Run from the repo root:  python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY = ("pandas", "sklearn", "joblib")
+# (module, args, text of the first prompt, threshold in ms). tk_ui needs a
+# display to show a window, so only its imports are timed.
+ENTRY_POINTS = [
+    ("src.live_predict", [], "Enter user id", 600),
+    ("src.predict_stress", [], "Enter chars per second", 600),
+    ("src.typing_logger", [], "Enter user id", 600),
+    ("src.predict_server", ["--stats-interval", "0"], "Serving", 800),
+    ("src.tk_ui", None, None, 600),
+]
+
+def import_profile(module):
+    """(total ms, {direct import: cumulative ms}, every module imported) from -X importtime."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    ).stderr
+    children, imported = {}, set()
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        imported.add(name)
+        if depth == 1:
+            children[name] = int(cumulative) / 1000
+        elif depth == 0:
+            # Lines are printed when an import finishes, so a module's
+            # children come just before it.
+            if name == module:
+                return int(cumulative) / 1000, children, imported
+            children = {}
+    raise RuntimeError(f"no import time reported for {module}")
+
+def time_to_prompt(module, args, marker, timeout=30.0):
+    """Milliseconds from launch until `marker` is printed."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONUNBUFFERED="1", KEYSTROKESENSE_SOCKET=os.path.join(tmp, "bench.sock"))
+        return _time_to_prompt(module, args, marker, env, timeout)
+
+def _time_to_prompt(module, args, marker, env, timeout):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", module, *args], env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    seen = b""
+    try:
+        while marker.encode() not in seen:
+            chunk = proc.stdout.read1(4096)
+            if not chunk or time.perf_counter() - start > timeout:
+                raise RuntimeError(f"{module} exited or stalled before its prompt:\n{seen.decode(errors='replace')}")
+            seen += chunk
+        return (time.perf_counter() - start) * 1000
+    finally:
+        proc.kill()
+        proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="packages to list per entry point")
+    parser.add_argument("--threshold-ms", type=float, help="override every entry point's threshold")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':<20} {'imports ms':>11} {'to prompt ms':>13} {'limit ms':>9}  slowest imports")
+    for module, cli_args, marker, limit in ENTRY_POINTS:
+        limit = args.threshold_ms or limit
+        profiles = [import_profile(module) for _ in range(args.repeats)]
+        import_ms = statistics.median(total for total, _, _ in profiles)
+        packages = profiles[-1][1]
+        heavy = sorted({name.split(".")[0] for name in profiles[-1][2]} & set(HEAVY))
+        prompt_ms = None
+        if marker is not None:
+            prompt_ms = statistics.median(time_to_prompt(module, cli_args, marker) for _ in range(args.repeats))
+        slowest = sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]
+        print(f"{module:<20} {import_ms:11.0f} {prompt_ms if prompt_ms is not None else float('nan'):13.0f} "
+              f"{limit:9.0f}  " + ", ".join(f"{name} {ms:.0f}" for name, ms in slowest))
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at start-up")
+        if (prompt_ms if prompt_ms is not None else import_ms) > limit:
+            failures.append(f"{module} takes {prompt_ms or import_ms:.0f} ms to start (limit {limit:.0f} ms)")
+
+    for failure in failures:
+        print(f"⚠️ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ All entry points within their start-up budget")
+
+if __name__ == "__main__":
+    main()
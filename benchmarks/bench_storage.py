@@ -0,0 +1,89 @@
+"""Load time and peak memory of the training columns: CSV vs Parquet vs Feather.
+
+Each load runs in a fresh process so peak RSS is measured in isolation.
+Run from the repo root:  python -m benchmarks.bench_storage --sizes 100000 1000000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_feature_engineering import resample_sessions
+from src import storage
+from src.feature_engineering import build_features
+
+FEATURES = [
+    "chars_per_sec",
+    "mistakes_per_char",
+    "difficulty_score",
+    "word_mistake_rate",
+    "accuracy_percent",
+    "sleep_hours"
+]
+COLUMNS = FEATURES + ["self_stress_level"]
+
+def _max_rss_mb():
+    # VmHWM is this process's own peak; ru_maxrss on Linux also carries the
+    # peak of the (large) parent across fork+exec.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def _load(method, path):
+    import pandas as pd
+    storage._pyarrow()
+    before = _max_rss_mb()
+    start = time.perf_counter()
+    if method == "csv (current: full read)":
+        df = pd.read_csv(path)[COLUMNS]
+    else:
+        df = storage.read(path, columns=COLUMNS, dtype={f: "float32" for f in FEATURES})
+    elapsed = time.perf_counter() - start
+    return elapsed, _max_rss_mb() - before, len(df)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    ctx = mp.get_context("spawn")
+    tmp = tempfile.mkdtemp(prefix="keystrokesense-storage-")
+    try:
+        for n in args.sizes:
+            df = build_features(resample_sessions(n))
+            paths = {fmt: os.path.join(tmp, f"features_{n}.{fmt}") for fmt in storage.FORMATS}
+            for path in paths.values():
+                storage.write(df, path)
+            del df
+            methods = [
+                ("csv (current: full read)", paths["csv"]),
+                ("csv (usecols, float32)", paths["csv"]),
+                ("parquet (projection)", paths["parquet"]),
+                ("feather (projection)", paths["feather"]),
+            ]
+            print(f"\n{n:,} sessions")
+            print(f"{'method':<28} {'on disk MB':>10} {'load s':>8} {'peak +MB':>9}")
+            for method, path in methods:
+                with ctx.Pool(1) as pool:
+                    elapsed, peak, rows = pool.apply(_load, (method, path))
+                assert rows == n
+                size = sum(
+                    os.path.getsize(os.path.join(root, f))
+                    for root, _, files in os.walk(path) for f in files
+                ) if os.path.isdir(path) else os.path.getsize(path)
+                print(f"{method:<28} {size / 2**20:10.1f} {elapsed:8.3f} {peak:9.1f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
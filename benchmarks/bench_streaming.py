@@ -0,0 +1,80 @@
+"""Per-keystroke cost of live features, and live prediction latency under fast typing.
+
+Part 1 compares StreamingFeatures' O(1) update with recomputing the
+features from the whole typed text on every key, for short and long
+texts. Part 2 feeds keystrokes at a fixed rate into a LiveScorer and
+reports how many predictions ran and how long after a key its result
+arrived.
+Run from the repo root:  python -m benchmarks.bench_streaming
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.features import calculate_accuracy, word_level_mistakes
+from src.reference_corpus import BUILTIN_TEXTS as REFERENCE_TEXTS
+from src.streaming import LiveScorer, StreamingFeatures
+
+def rescan_update(reference, typed):
+    acc, mistakes = calculate_accuracy(reference, typed)
+    return acc, mistakes, word_level_mistakes(reference, typed)
+
+def per_key_us(reference):
+    stream = StreamingFeatures(reference)
+    typed = ""
+    stream_cost, rescan_cost = [], []
+    for ch in reference:
+        typed += ch
+        start = time.perf_counter()
+        stream.type_char(ch)
+        stream.features()
+        stream_cost.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        rescan_update(reference, typed)
+        rescan_cost.append(time.perf_counter() - start)
+    return np.mean(stream_cost) * 1e6, np.mean(rescan_cost) * 1e6
+
+def live_run(rate, seconds, debounce):
+    results = []
+    scorer = LiveScorer(results.append, debounce_sec=debounce)
+    scorer.get_model()
+    reference = REFERENCE_TEXTS[-1] * 20
+    stream = StreamingFeatures(reference)
+    n = int(rate * seconds)
+    handler = []
+    next_key = time.perf_counter()
+    for ch in reference[:n]:
+        next_key += 1 / rate
+        while time.perf_counter() < next_key:
+            time.sleep(min(0.001, max(0.0, next_key - time.perf_counter())))
+        start = time.perf_counter()
+        stream.type_char(ch)
+        scorer.update(stream.features())
+        handler.append(time.perf_counter() - start)
+    time.sleep(debounce + 0.2)
+    scorer.close()
+    lat = np.array([r["latency_ms"] for r in results if "latency_ms" in r])
+    return n, len(results), np.percentile(handler, 99) * 1e6, np.percentile(lat, 50), np.percentile(lat, 99)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=int, nargs="+", default=[15, 50, 200])
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--debounce", type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"{'text chars':>10} {'streaming us/key':>17} {'rescan us/key':>14}")
+    for length in (45, 500, 5000):
+        reference = (" ".join(REFERENCE_TEXTS) * (length // 100 + 1))[:length]
+        stream_us, rescan_us = per_key_us(reference)
+        print(f"{length:10d} {stream_us:17.2f} {rescan_us:14.2f}")
+
+    print(f"\n{'keys/s':>7} {'keys':>6} {'predictions':>12} {'handler p99 us':>15} "
+          f"{'latency p50 ms':>15} {'latency p99 ms':>15}")
+    for rate in args.rates:
+        keys, preds, handler, p50, p99 = live_run(rate, args.seconds, args.debounce)
+        print(f"{rate:7d} {keys:6d} {preds:12d} {handler:15.1f} {p50:15.1f} {p99:15.1f}")
+
+if __name__ == "__main__":
+    main()
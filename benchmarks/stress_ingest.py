@@ -0,0 +1,87 @@
+"""Dozens of concurrent writers through SessionIngestor: no lost or duplicate rows.
+
+Run from the repo root:  python -m benchmarks.stress_ingest --writers 32 --sessions 50
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from src.ingest import FSYNC_POLICIES, SessionIngestor
+from src.session_store import SessionStore
+from src.typing_logger import RAW_COLUMNS
+
+def writer(path, writer_id, n_sessions, fsync, wait, start):
+    ingestor = SessionIngestor(path, RAW_COLUMNS, fsync=fsync)
+    start.wait()
+    ids = []
+    for seq in range(n_sessions):
+        ids.append(ingestor.submit({
+            "user_id": f"writer{writer_id}",
+            "reference_text": "Python makes data science fun and powerful.",
+            "typed_text": "Python makes data science fun, and powerful.",
+            "date_time": "2025-11-21 20:34:27",
+            "self_stress_level": seq % 3,
+            "notes": f"{writer_id}:{seq}"
+        }, wait=wait))
+    return ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=50, help="sessions per writer")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="batch")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="fire-and-forget submits, drained by one final commit")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="keystrokesense-ingest-")
+    path = os.path.join(tmp, "raw_sessions.csv")
+    try:
+        start = mp.Manager().Barrier(args.writers + 1)
+        with mp.Pool(args.writers) as pool:
+            jobs = [
+                pool.apply_async(writer, (path, w, args.sessions, args.fsync, not args.no_wait, start))
+                for w in range(args.writers)
+            ]
+            start.wait()
+            t0 = time.perf_counter()
+            returned = [i for job in jobs for i in job.get()]
+        SessionIngestor(path, RAW_COLUMNS, fsync=args.fsync).commit()
+        elapsed = time.perf_counter() - t0
+
+        expected = args.writers * args.sessions
+        df = SessionStore(path).read_frame()
+        ids = df["session_id"].tolist()
+        keys = df["notes"].tolist()
+        problems = []
+        if len(df) != expected:
+            problems.append(f"expected {expected} rows, found {len(df)}")
+        if sorted(ids) != list(range(1, len(df) + 1)):
+            problems.append("session ids are not exactly 1..N")
+        if len(set(keys)) != len(keys):
+            problems.append(f"{len(keys) - len(set(keys))} duplicated sessions")
+        missing = {f"{w}:{s}" for w in range(args.writers) for s in range(args.sessions)} - set(keys)
+        if missing:
+            problems.append(f"{len(missing)} lost sessions")
+        if not args.no_wait and sorted(returned) != sorted(ids):
+            problems.append("ids returned to writers do not match the CSV")
+        # Parse the CSV independently of the index, to catch interleaved writes.
+        if len(pd.read_csv(path)) != expected:
+            problems.append("raw CSV does not parse back to the expected row count")
+
+        print(f"writers={args.writers} sessions/writer={args.sessions} fsync={args.fsync} "
+              f"wait={not args.no_wait}")
+        print(f"{expected} sessions in {elapsed:.2f}s -> {expected / elapsed:,.0f} sessions/sec")
+        if problems:
+            raise SystemExit("FAILED: " + "; ".join(problems))
+        print("OK: no lost, duplicate or interleaved rows")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""Micro-benchmark suite for the hot paths, with JSON results and a regression check.
+
+Cases (each at several data scales):
+  accuracy           features.calculate_accuracy, by passage length
+  word_mistakes      features.word_level_mistakes, by passage length
+  csv_append         SessionStore.append of one row, by rows already stored
+  ingest_submit      SessionIngestor.submit (what run_typing_session does)
+  next_session_id    open the store + next_id (get_next_session_id)
+  build_features     feature_engineering.build_features, by rows
+  predict_compiled   compiled model predict, by rows per call
+  predict_sklearn    joblib/sklearn model predict, by rows per call
+
+Every measurement is warmed up, then timed over --repeats rounds of N
+calls each (N chosen so a round takes at least --min-time), giving
+min/mean/p50/p90/p99 per call. Peak traced memory of one call is measured
+separately with tracemalloc so it does not skew the timings.
+
+    python -m benchmarks.suite run [--filter accuracy] [--quick]
+    python -m benchmarks.suite compare OLD.json NEW.json [--threshold 0.1]
+    python -m benchmarks.suite list
+
+`run` writes benchmarks/results/<time>-<commit>.json. `compare` prints the
+per-case change and exits with status 1 if any p50 time (or peak memory)
+regressed by more than the threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+CASES = {}
+# Smaller peak-memory increases are noise, not regressions.
+MIN_MEMORY_KB = 64
+
+def case(name, scales, unit):
+    """Register `setup(scale, tmp)` -> (fn, items per call) under `name`."""
+    def register(setup):
+        CASES[name] = {"setup": setup, "scales": scales, "unit": unit}
+        return setup
+    return register
+
+# ---------- data ----------
+
+def _passage(length, rng):
+    from src.reference_corpus import BUILTIN_TEXTS as REFERENCE_TEXTS
+    words = " ".join(REFERENCE_TEXTS).split()
+    text = ""
+    while len(text) < length:
+        text += rng.choice(words) + " "
+    return text[:length].strip()
+
+def _typed(reference, rng, rate=0.03):
+    out = []
+    for ch in reference:
+        r = rng.random()
+        if r < rate / 2:
+            out.append(rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif r >= rate:
+            out.append(ch)
+    return "".join(out)
+
+def _sessions(n):
+    from benchmarks.bench_feature_engineering import resample_sessions
+    return resample_sessions(n)
+
+def _session_file(tmp, n):
+    from src.session_store import SessionStore
+    path = os.path.join(tmp, f"sessions_{n}.csv")
+    SessionStore.write_frame(path, _sessions(n))
+    return path
+
+def _row(store_columns):
+    row = dict.fromkeys(store_columns, "")
+    row.update({"user_id": "bench", "reference_text": "Typing is fun.", "typed_text": "Typing is fun.",
+                "time_taken_sec": 3.2, "accuracy_percent": 100.0, "self_stress_level": 1})
+    row.pop("session_id", None)
+    return row
+
+def _features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0.5, 8, n), rng.uniform(0, 0.6, n), rng.integers(0, 120, n),
+        rng.uniform(0, 0.1, n), rng.uniform(40, 100, n), rng.integers(0, 10, n)
+    ]).astype(np.float64)
+
+# ---------- cases ----------
+
+@case("accuracy", [50, 150, 1000], "chars")
+def _accuracy(length, tmp):
+    from src.features import calculate_accuracy
+    rng = random.Random(length)
+    ref = _passage(length, rng)
+    typed = _typed(ref, rng)
+    return (lambda: calculate_accuracy(ref, typed)), 1
+
+@case("word_mistakes", [50, 150, 1000], "chars")
+def _word_mistakes(length, tmp):
+    from src.features import word_level_mistakes
+    rng = random.Random(length)
+    ref = _passage(length, rng)
+    typed = _typed(ref, rng)
+    return (lambda: word_level_mistakes(ref, typed)), 1
+
+@case("csv_append", [1_000, 100_000], "stored rows")
+def _csv_append(n, tmp):
+    from src.session_store import SessionStore
+    store = SessionStore(_session_file(tmp, n))
+    row = _row(store.columns)
+    return (lambda: store.append(row)), 1
+
+@case("ingest_submit", [1_000, 100_000], "stored rows")
+def _ingest_submit(n, tmp):
+    from src.ingest import SessionIngestor
+    from src.session_store import SessionStore
+    path = _session_file(tmp, n)
+    columns = SessionStore(path).columns
+    ingestor = SessionIngestor(path, columns)
+    row = _row(columns)
+    return (lambda: ingestor.submit(row)), 1
+
+@case("next_session_id", [1_000, 100_000, 1_000_000], "stored rows")
+def _next_session_id(n, tmp):
+    from src.session_store import SessionStore
+    path = _session_file(tmp, n)
+    return (lambda: SessionStore(path).next_id()), 1
+
+@case("build_features", [1_000, 10_000, 100_000], "rows")
+def _build_features(n, tmp):
+    from src.feature_engineering import build_features
+    df = _sessions(n)
+    return (lambda: build_features(df.copy())), n
+
+@case("predict_compiled", [1, 1_000, 100_000], "rows")
+def _predict_compiled(n, tmp):
+    from src.compiled_model import COMPILED_PATH, CompiledModel
+    model = CompiledModel.load(COMPILED_PATH)
+    X = _features(n)
+    if n == 1:
+        row = X[0].tolist()
+        return (lambda: model.predict_one(row)), 1
+    return (lambda: model.predict(X)), n
+
+@case("predict_sklearn", [1, 1_000, 100_000], "rows")
+def _predict_sklearn(n, tmp):
+    import warnings
+    import joblib
+    import pandas as pd
+    from src.features import FEATURES
+    from src.predict_stress import MODEL_PATH
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = joblib.load(MODEL_PATH)
+    X = pd.DataFrame(_features(n), columns=FEATURES)
+    return (lambda: model.predict(X)), n
+
+# ---------- harness ----------
+
+def measure(fn, repeats=15, warmup=3, min_time=0.05):
+    """Per-call timings in seconds: `repeats` rounds of `number` calls each."""
+    for _ in range(warmup):
+        fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples = np.empty(repeats)
+    for r in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples[r] = (time.perf_counter() - start) / number
+    return samples, number
+
+def peak_memory(fn):
+    """Peak bytes traced by tracemalloc during one call."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    versions = {}
+    for name in ("numpy", "pandas", "sklearn"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            pass
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": versions
+    }
+
+def run(names, repeats, warmup, min_time, quick, output=None):
+    meta = _meta()
+    results = {}
+    print(f"{'case':<34} {'p50':>10} {'p90':>10} {'p99':>10} {'items/s':>12} {'peak KB':>9}")
+    for name in names:
+        spec = CASES[name]
+        scales = spec["scales"][:1] if quick else spec["scales"]
+        for scale in scales:
+            key = f"{name}[{scale}]"
+            with tempfile.TemporaryDirectory() as tmp:
+                fn, items = spec["setup"](scale, tmp)
+                samples, number = measure(fn, repeats, warmup, min_time)
+                peak = peak_memory(fn)
+            p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+            results[key] = {
+                "case": name, "scale": scale, "unit": spec["unit"], "items": items,
+                "repeats": repeats, "number": number,
+                "min_ms": samples.min() * 1e3, "mean_ms": samples.mean() * 1e3,
+                "p50_ms": p50 * 1e3, "p90_ms": p90 * 1e3, "p99_ms": p99 * 1e3,
+                "items_per_sec": items / p50, "peak_kb": peak / 1024
+            }
+            print(f"{key:<34} {_ms(p50):>10} {_ms(p90):>10} {_ms(p99):>10} {items / p50:12,.0f} {peak / 1024:9,.0f}")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = output or os.path.join(
+        RESULTS_DIR, f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{meta['commit']}.json"
+    )
+    with open(output, mode="w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"✅ Results saved to: {output}")
+    return output
+
+def _ms(seconds):
+    ms = seconds * 1e3
+    return f"{ms * 1e3:.1f}us" if ms < 1 else f"{ms:.2f}ms"
+
+def compare(old_path, new_path, threshold, metric="p50_ms"):
+    """Print old vs new per case; returns the keys that regressed past `threshold`."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"old: {old['meta']['commit']} ({old['meta']['time']})  new: {new['meta']['commit']} ({new['meta']['time']})")
+    print(f"{'case':<34} {'old':>10} {'new':>10} {'change':>8} {'peak KB':>15}")
+    regressions = []
+    for key, n in new["results"].items():
+        o = old["results"].get(key)
+        if o is None:
+            print(f"{key:<34} {'-':>10} {_ms(n[metric] / 1e3):>10} {'new':>8}")
+            continue
+        change = n[metric] / o[metric] - 1
+        # Memory only counts once it grows by more than a few pages.
+        mem_grew = n["peak_kb"] - o["peak_kb"] > max(threshold * o["peak_kb"], MIN_MEMORY_KB)
+        flag = ""
+        if change > threshold or mem_grew:
+            flag = "  ⚠️ regression"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<34} {_ms(o[metric] / 1e3):>10} {_ms(n[metric] / 1e3):>10} {change:+8.1%} "
+              f"{o['peak_kb']:>7,.0f}→{n['peak_kb']:<7,.0f}{flag}")
+    for key in sorted(old["results"].keys() - new["results"].keys()):
+        print(f"{key:<34} missing from the new run")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="run the suite and save the results as JSON")
+    run_p.add_argument("--filter", nargs="+", help="only cases whose name contains one of these")
+    run_p.add_argument("--repeats", type=int, default=15)
+    run_p.add_argument("--warmup", type=int, default=3)
+    run_p.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per timed round")
+    run_p.add_argument("--quick", action="store_true", help="smallest scale of each case only")
+    run_p.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    cmp_p = sub.add_parser("compare", help="compare two results files")
+    cmp_p.add_argument("old")
+    cmp_p.add_argument("new")
+    cmp_p.add_argument("--threshold", type=float, default=0.10, help="relative slow-down that counts as a regression")
+    cmp_p.add_argument("--metric", default="p50_ms", choices=["min_ms", "mean_ms", "p50_ms", "p90_ms", "p99_ms"])
+    sub.add_parser("list", help="list the cases and their scales")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, spec in CASES.items():
+            print(f"{name:<18} {spec['unit']}: {', '.join(f'{s:,}' for s in spec['scales'])}")
+    elif args.command == "run":
+        names = [n for n in CASES if not args.filter or any(f in n for f in args.filter)]
+        run(names, args.repeats, args.warmup, args.min_time, args.quick, args.output)
+    else:
+        regressions = compare(args.old, args.new, args.threshold, args.metric)
+        if regressions:
+            print(f"⚠️ {len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Alignment-based typing scores: substitutions, insertions and deletions.
+
+calculate_accuracy() compares the typed text with the reference position by
+position, so one extra character shifts everything after it and every
+following character counts as a mistake. Here the typed text is aligned
+with the reference by Levenshtein distance instead, and the edits are split
+into substitutions (wrong character), insertions (extra typed character)
+and deletions (reference character left out), for characters and for
+whole words.
+
+The distance uses Myers' bit-parallel algorithm (Hyyrö's formulation):
+each column of the edit-distance matrix is a pair of bit vectors held in a
+Python int, so one typed character costs a handful of integer operations.
+Only a diagonal band is computed (Ukkonen). It starts at a lower bound
+on the distance from symbol counts and doubles until the distance it
+finds fits inside it, which proves the result exact. Time is about the
+length times the number of edits divided by the machine word size: a long
+passage with few typos costs close to linear time, and a badly mistyped
+one approaches the full length-squared matrix. The per-column vectors
+are kept so a traceback can count the edit types without building the
+full matrix. Common prefixes and suffixes are stripped first.
+"""
+import collections
+import multiprocessing as mp
+import numpy as np
+
+ALIGNMENT_COLUMNS = [
+    "char_substitutions",
+    "char_insertions",
+    "char_deletions",
+    "word_substitutions",
+    "word_insertions",
+    "word_deletions"
+]
+
+def _trim(a, b):
+    """Lengths of the common prefix and suffix of `a` and `b`."""
+    n = min(len(a), len(b))
+    pre = 0
+    while pre < n and a[pre] == b[pre]:
+        pre += 1
+    suf = 0
+    while suf < n - pre and a[len(a) - 1 - suf] == b[len(b) - 1 - suf]:
+        suf += 1
+    return pre, suf
+
+def _band(a, b, k, keep=False):
+    """Myers' algorithm with `a` as the pattern over `b`, restricted to a diagonal band.
+
+    Only rows that a path of cost <= k can reach are computed; the row just
+    above the band is taken to grow by one per column, and a row entering
+    the band at the bottom to be one more than the row above it. Every value
+    is then the cost of some real path, so the result is exact whenever it
+    is <= k (or the band covers the whole matrix).
+
+    Returns (distance, covers_all, columns). Column j is (lo, top, hi, pv, mv):
+    rows lo..hi, top = D[lo-1][j], and bit r of pv/mv set when
+    D[lo+r][j] - D[lo+r-1][j] is +1/-1.
+    """
+    m, n = len(a), len(b)
+    peq = {}
+    for i, sym in enumerate(a):
+        peq[sym] = peq.get(sym, 0) | (1 << i)
+    delta = m - n
+    slack = max(0, (k - abs(delta)) // 2)
+    lo_off, hi_off = min(0, delta) - slack, max(0, delta) + slack
+    covers_all = lo_off + n <= 1 and hi_off >= m
+    # Each symbol's match bits, cut into overlapping pages so taking the
+    # band's window is a shift of a page rather than of the whole pattern.
+    width = hi_off - lo_off + 1
+    page = max(256, width)
+    span = (1 << (page + width)) - 1
+    pages = {sym: [(bits >> p) & span for p in range(0, m, page)] for sym, bits in peq.items()}
+    empty = [0] * len(next(iter(pages.values())))
+    lo, top, hi = 1, 0, min(m, hi_off)
+    pv, mv = (1 << hi) - 1, 0
+    cols = [(lo, top, hi, pv, mv)] if keep else None
+    for j, sym in enumerate(b, 1):
+        new_hi = min(m, j + hi_off)
+        if new_hi > hi:
+            pv |= 1 << (new_hi - lo)
+            hi = new_hi
+        mask = (1 << (hi - lo + 1)) - 1
+        p, r = divmod(lo - 1, page)
+        eq = (pages.get(sym, empty)[p] >> r) & mask
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        # The row above the band (row 0 at first) grows by one per column.
+        sh = ((ph << 1) | 1) & mask
+        pv = ((mh << 1) & mask) | (~(xv | sh) & mask)
+        mv = sh & xv
+        top += 1
+        if j + lo_off > lo:
+            top += (pv & 1) - (mv & 1)
+            pv >>= 1
+            mv >>= 1
+            lo += 1
+        if keep:
+            cols.append((lo, top, hi, pv, mv))
+    if not keep:
+        cols = [(lo, top, hi, pv, mv)]
+    return _value(cols[-1], m), covers_all, cols
+
+def _value(col, i):
+    """D[i][j] for the computed column `col`, or None outside it."""
+    lo, top, hi, pv, mv = col
+    if i < lo - 1:
+        return None
+    extra = max(0, i - hi)
+    bits = (1 << (min(i, hi) - lo + 1)) - 1
+    return top + (pv & bits).bit_count() - (mv & bits).bit_count() + extra
+
+def _lower_bound(a, b):
+    """Cheap lower bound on the edit distance from symbol counts.
+
+    A substitution changes two counts by one, an insertion or deletion one.
+    """
+    counts = collections.Counter(a)
+    counts.subtract(b)
+    return max(abs(len(a) - len(b)), (sum(map(abs, counts.values())) + 1) // 2)
+
+def _align(a, b, keep=False, k=None):
+    """Exact distance, widening the band until the distance fits in it.
+
+    Each band's result is the cost of a real alignment, so it bounds the
+    true distance: the band never needs to grow past it, and doubling
+    keeps the total work within about twice that of the last pass.
+    """
+    # Below a few hundred bits a column costs the same however narrow the
+    # band (interpreter overhead dominates), so there is no point starting lower.
+    k = max(256, _lower_bound(a, b)) if k is None else k
+    while True:
+        dist, covers_all, cols = _band(a, b, k, keep)
+        if dist <= k or covers_all:
+            return dist, cols
+        k = min(dist, 2 * k)
+
+def levenshtein(a, b):
+    """Edit distance between two strings (or two sequences of words)."""
+    pre, suf = _trim(a, b)
+    a, b = a[pre:len(a) - suf], b[pre:len(b) - suf]
+    if not a or not b:
+        return len(a) + len(b)
+    return _align(a, b)[0]
+
+def edit_counts(reference, typed):
+    """(substitutions, insertions, deletions) of one optimal alignment of `typed` to `reference`.
+
+    Works on strings or on lists of words. Their sum is the Levenshtein
+    distance.
+    """
+    pre, suf = _trim(reference, typed)
+    a, b = reference[pre:len(reference) - suf], typed[pre:len(typed) - suf]
+    if not a or not b:
+        return 0, len(b), len(a)
+    d, cols = _align(a, b, keep=True)
+    subs = ins = dels = 0
+    i, j = len(a), len(b)
+    while i and j:
+        diag = _value(cols[j - 1], i - 1)
+        if diag is not None and diag == d and a[i - 1] == b[j - 1]:
+            i, j = i - 1, j - 1
+            continue
+        if diag is not None and diag + 1 == d:
+            subs += 1
+            i, j, d = i - 1, j - 1, diag
+            continue
+        up = _value(cols[j], i - 1)
+        if up is not None and up + 1 == d:
+            dels += 1
+            i, d = i - 1, up
+        else:
+            ins += 1
+            j, d = j - 1, d - 1
+    return subs, ins + j, dels + i
+
+def alignment_scores(reference, typed):
+    """Character- and word-level edit counts for one session, keyed like ALIGNMENT_COLUMNS."""
+    ref, t = str(reference).strip(), str(typed).strip()
+    if ref == t:
+        return dict.fromkeys(ALIGNMENT_COLUMNS, 0)
+    return dict(zip(ALIGNMENT_COLUMNS, edit_counts(ref, t) + edit_counts(ref.split(), t.split())))
+
+def _score_pairs(pairs):
+    return [tuple(alignment_scores(ref, t).values()) for ref, t in pairs]
+
+def batch_alignment(references, typed, workers=1, chunk_size=50_000):
+    """Column-wise alignment_scores(): a dict of int64 arrays, one per ALIGNMENT_COLUMNS entry.
+
+    Exact copies of the reference are skipped, and each distinct
+    (reference, typed) pair is aligned once. With `workers` > 1 the
+    distinct pairs are split over a process pool.
+    """
+    refs = [str(r) for r in references]
+    texts = ["" if t is None or t != t else str(t) for t in typed]
+    out = np.zeros((len(refs), len(ALIGNMENT_COLUMNS)), dtype=np.int64)
+    index = {}
+    rows = []
+    for k, (ref, t) in enumerate(zip(refs, texts)):
+        if ref.strip() == t.strip():
+            continue
+        rows.append((k, index.setdefault((ref, t), len(index))))
+    pairs = list(index)
+    if workers > 1 and len(pairs) > chunk_size:
+        chunks = [pairs[s:s + chunk_size] for s in range(0, len(pairs), chunk_size)]
+        with mp.get_context("spawn").Pool(workers) as pool:
+            scored = [row for part in pool.imap(_score_pairs, chunks) for row in part]
+    else:
+        scored = _score_pairs(pairs)
+    if rows:
+        at, which = np.array(rows, dtype=np.int64).T
+        out[at] = np.array(scored, dtype=np.int64)[which]
+    return {col: out[:, c] for c, col in enumerate(ALIGNMENT_COLUMNS)}
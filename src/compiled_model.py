@@ -0,0 +1,261 @@
+"""Flat-array export of the stress model and a NumPy-only predictor for it.
+
+A RandomForest becomes one set of node arrays (feature, threshold, left,
+right, class probabilities) for all trees; a LogisticRegression becomes
+its coefficient matrix. A StandardScaler in front of the model is stored
+with it. Scoring needs only NumPy: no pandas, no sklearn, no validation
+overhead, so a single row costs microseconds instead of milliseconds.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+COMPILED_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.npz")
+FORMAT_VERSION = 1
+
+def _unwrap(model, scaler):
+    """Split an sklearn Pipeline of [StandardScaler,] estimator into its parts."""
+    if hasattr(model, "steps"):
+        steps = [step for _, step in model.steps]
+        if len(steps) == 2 and hasattr(steps[0], "scale_"):
+            return steps[1], steps[0]
+        if len(steps) == 1:
+            return steps[0], scaler
+        raise ValueError("Only [StandardScaler ->] estimator pipelines can be compiled")
+    return model, scaler
+
+def _compile_forest(forest):
+    n_classes = len(forest.classes_)
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in forest.estimators_:
+        tree = est.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        leaf = left < 0
+        nodes = np.arange(tree.node_count, dtype=np.int32)
+        # Leaves point at themselves, so traversal can run a fixed number of
+        # steps for every tree without checking for leaves.
+        lefts.append(np.where(leaf, nodes, left) + offset)
+        rights.append(np.where(leaf, nodes, right) + offset)
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        sums = value.sum(axis=1, keepdims=True)
+        if not np.allclose(sums, 1.0):
+            # Older sklearn stores counts and normalises them at predict time.
+            value = value / sums
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.array(max_depth)
+    }
+
+def _compile_linear(model):
+    return {
+        "coef": np.asarray(model.coef_, dtype=np.float64),
+        "intercept": np.asarray(model.intercept_, dtype=np.float64)
+    }
+
+def file_digest(path):
+    with open(path, mode="rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def compile_model(model, scaler=None, feature_names=None, source_path=None):
+    """Flat arrays for a fitted forest or logistic regression (optionally scaled).
+
+    `source_path` is the joblib file the model was saved to; its digest is
+    recorded so stale compiled copies can be detected.
+    """
+    estimator, scaler = _unwrap(model, scaler)
+    if hasattr(estimator, "estimators_") and hasattr(estimator.estimators_[0], "tree_"):
+        kind, arrays = "forest", _compile_forest(estimator)
+    elif hasattr(estimator, "coef_"):
+        kind, arrays = "linear", _compile_linear(estimator)
+        if scaler is not None:
+            # Fold (x - mean) / scale into the weights: one dot product per row.
+            mean = scaler.mean_ if scaler.with_mean else np.zeros_like(scaler.scale_)
+            scale = scaler.scale_ if scaler.with_std else np.ones_like(mean)
+            arrays["intercept"] = arrays["intercept"] - arrays["coef"] @ (mean / scale)
+            arrays["coef"] = arrays["coef"] / scale
+            scaler = None
+    else:
+        raise ValueError(f"Cannot compile model of type {type(estimator).__name__}")
+    if scaler is not None:
+        arrays["scaler_mean"] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(scaler.scale_, dtype=np.float64)
+    if feature_names is None and hasattr(estimator, "feature_names_in_"):
+        feature_names = list(estimator.feature_names_in_)
+    meta = {
+        "version": FORMAT_VERSION,
+        "kind": kind,
+        "classes": [c.item() if hasattr(c, "item") else c for c in estimator.classes_],
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        # SGDClassifier normalises one-vs-rest sigmoids; LogisticRegression uses softmax.
+        "proba": "ovr" if type(estimator).__name__ == "SGDClassifier" else "softmax",
+        "source_sha1": file_digest(source_path) if source_path else None
+    }
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+    return arrays
+
+def export_model(model, path=COMPILED_PATH, scaler=None, feature_names=None, source_path=None):
+    """Compile `model` and save it as an .npz next to the joblib model."""
+    arrays = compile_model(model, scaler=scaler, feature_names=feature_names, source_path=source_path)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
+
+class CompiledModel:
+    """Scores single rows or NumPy batches straight from the exported arrays.
+
+    Forest predictions repeat sklearn's arithmetic (float32 inputs, per-tree
+    probabilities summed in tree order), so labels and probabilities match
+    the joblib model exactly.
+    """
+
+    def __init__(self, arrays):
+        self.meta = json.loads(bytes(arrays["meta"]).decode("utf-8"))
+        self.kind = self.meta["kind"]
+        self.classes_ = np.array(self.meta["classes"])
+        self.feature_names = self.meta["feature_names"]
+        self._ovr = self.meta.get("proba") == "ovr"
+        self.arrays = {k: np.asarray(v) for k, v in arrays.items() if k != "meta"}
+        self._mean = self.arrays.get("scaler_mean")
+        self._scale = self.arrays.get("scaler_scale")
+        if self.kind == "forest":
+            a = self.arrays
+            self._max_depth = int(a["max_depth"])
+            self._n_trees = len(a["roots"])
+            # Arrays already in the layout scoring uses (runtime_arrays(), e.g.
+            # memory-mapped from the model registry) are used without a copy.
+            self._roots = a["roots"].astype(np.intp, copy=False)
+            self._feature = a["feature"].astype(np.intp, copy=False)
+            # children[2 * node + went_right]: one gather per level.
+            if "children" in a:
+                self._children = a["children"].astype(np.intp, copy=False)
+            else:
+                self._children = np.stack([a["left"], a["right"]], axis=1).astype(np.intp).ravel()
+            if "value_by_class" in a:
+                self._value = list(a["value_by_class"])
+            else:
+                self._value = [np.ascontiguousarray(a["value"][:, k]) for k in range(a["value"].shape[1])]
+
+    @classmethod
+    def load(cls, path=COMPILED_PATH):
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def runtime_arrays(self):
+        """The arrays in the exact layout scoring uses, for saving as .npy files
+        that later loads can memory-map and share without converting."""
+        arrays = dict(self.arrays)
+        arrays["meta"] = np.frombuffer(json.dumps(self.meta).encode("utf-8"), dtype=np.uint8)
+        if self.kind == "forest":
+            for k in ("left", "right", "value"):
+                arrays.pop(k, None)
+            arrays.update(roots=self._roots, feature=self._feature, children=self._children,
+                          value_by_class=np.stack(self._value))
+        return arrays
+
+    def _as_matrix(self, X):
+        if hasattr(X, "columns") and self.feature_names is not None:
+            X = X[self.feature_names]
+        elif isinstance(X, dict):
+            X = [X[f] for f in self.feature_names]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if np.isnan(X).any():
+            raise ValueError("Input contains NaN")
+        if self._mean is not None:
+            X = (X - self._mean) / self._scale
+        # sklearn validates tree inputs to float32 before comparing.
+        return X.astype(np.float32) if self.kind == "forest" else X
+
+    def _forest_proba(self, X, chunk_rows=4096):
+        a = self.arrays
+        n_features = X.shape[1]
+        out = np.empty((len(X), len(self._value)), dtype=np.float64)
+        for start in range(0, len(X), chunk_rows):
+            x = X[start:start + chunk_rows]
+            flat = x.ravel()
+            row_base = (np.arange(len(x)) * n_features)[None, :]
+            # nodes[t, r]: current node of tree t for row r.
+            nodes = np.repeat(self._roots[:, None], len(x), axis=1)
+            for _ in range(self._max_depth):
+                go_right = flat[row_base + self._feature[nodes]] > a["threshold"][nodes]
+                nodes = self._children[2 * nodes + go_right]
+            # Reducing over the leading axis adds trees one after another,
+            # the same order sklearn accumulates them in.
+            for k in range(out.shape[1]):
+                out[start:start + len(x), k] = np.add.reduce(self._value[k][nodes], axis=0)
+        return out / self._n_trees
+
+    def decision_function(self, X):
+        X = self._as_matrix(X)
+        scores = X @ self.arrays["coef"].T + self.arrays["intercept"]
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        if self.kind == "forest":
+            return self._forest_proba(self._as_matrix(X))
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1 - p, p])
+        if self._ovr:
+            with np.errstate(over="ignore"):
+                p = 1.0 / (1.0 + np.exp(-scores))
+            return p / p.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        e = np.exp(scores)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        if self.kind == "forest":
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict_one(self, row):
+        """Label for one row (sequence of feature values or dict by feature name)."""
+        return self.predict(row)[0].item()
+
+def load_predictor(model_path, compiled_path=COMPILED_PATH):
+    """The compiled model if it was exported from `model_path`'s current contents, else the joblib model."""
+    if os.path.exists(compiled_path):
+        compiled = CompiledModel.load(compiled_path)
+        source = compiled.meta.get("source_sha1")
+        if not os.path.exists(model_path) or source == file_digest(model_path):
+            return compiled
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found at: {model_path}")
+    import joblib
+    return joblib.load(model_path)
+
+def model_features(model, default):
+    """Feature names `model` was trained on, in order; `default` if it does not record them."""
+    names = model.feature_names if isinstance(model, CompiledModel) else getattr(model, "feature_names_in_", None)
+    return list(default if names is None else names)
+
+def model_input(model, rows, feature_names):
+    """`rows` (feature dicts) in the form `model` takes: a plain matrix for a
+    CompiledModel, so the prediction path never imports pandas; a DataFrame
+    with named columns for a joblib model."""
+    if isinstance(model, CompiledModel):
+        return [[row[f] for f in feature_names] for row in rows]
+    import pandas as pd
+    return pd.DataFrame(rows, columns=feature_names)
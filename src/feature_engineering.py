@@ -1,25 +1,138 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
 import os
+from src.session_store import SessionStore
+from src import metrics, storage
+from src.alignment import ALIGNMENT_COLUMNS, batch_alignment
+from src.features import FEATURES, batch_session_features
 DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "raw_sessions.csv")
-df = pd.read_csv(DATA_FILE)
-df["chars_per_sec"] = df["typed_text_len"] / df["time_taken_sec"]
-df["mistakes_per_char"] = df["mistake_count"] / df["reference_text_len"]
-df["difficulty_score"] = df["backspace_estimate"]
-def word_level_mistakes(ref, typed):
-    ref_words = str(ref).split()
-    typed_words = str(typed).split()
-    mistakes = sum(1 for rw, tw in zip(ref_words, typed_words) if rw != tw)
-    mistakes += abs(len(ref_words) - len(typed_words))
-    return mistakes
-df["word_mistake_count"] = df.apply(
-    lambda row: word_level_mistakes(row["reference_text"], row["typed_text"]),
-    axis=1
-)
-df["word_mistake_rate"] = df["word_mistake_count"] / df["reference_text_len"]
-df["sleep_hours"] = df["sleep_hours"].fillna(0)
 OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "sessions_with_features.csv")
-df.to_csv(OUTPUT_FILE, index=False)
-print("✅ Feature engineering complete.")
-print(f"Saved file: {OUTPUT_FILE}")
-print("Here are the first few rows with new columns:")
-print(df.head())
+STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "sessions_with_features.state.json")
+
+# Bump when the feature logic changes; incremental runs then rebuild from scratch.
+FEATURE_VERSION = 3
+FEATURE_COLUMNS = FEATURES + ["word_mistake_count"] + ALIGNMENT_COLUMNS
+
+def build_features(df):
+    """Add the derived feature columns to a raw sessions frame, column-wise.
+
+    Features come from the texts, time and sleep through the same kernel
+    the live entry points use, so offline and online values are identical.
+    """
+    with metrics.span("fe.features"):
+        features = batch_session_features(
+            df["reference_text"], df["typed_text"], df["time_taken_sec"], df["sleep_hours"]
+        )
+    features.index = df.index
+    # Sessions imported without char-level scores get them filled in.
+    df["mistake_count"] = df["mistake_count"].fillna(features["mistake_count"])
+    df["accuracy_percent"] = df["accuracy_percent"].fillna(features["accuracy_percent"])
+    for col in ["chars_per_sec", "mistakes_per_char", "difficulty_score", "word_mistake_count",
+                "word_mistake_rate", "sleep_hours"]:
+        df[col] = features[col]
+    # Edit-based counts next to the positional ones the model was trained on.
+    with metrics.span("fe.alignment"):
+        edits = batch_alignment(df["reference_text"], df["typed_text"])
+    for col, values in edits.items():
+        df[col] = values
+    metrics.count("fe.rows", len(df))
+    return df
+
+def _tail_digest(offset, size=4096):
+    """Hash of the bytes just before `offset`, to detect a rewritten raw file."""
+    with open(DATA_FILE, mode="rb") as f:
+        f.seek(max(0, offset - size))
+        return hashlib.sha1(f.read(min(offset, size))).hexdigest()
+
+def _schema(header):
+    return {"version": FEATURE_VERSION, "raw_columns": header, "feature_columns": FEATURE_COLUMNS}
+
+def _load_state():
+    try:
+        with open(STATE_FILE, mode="r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_state(df, offset, rows, header, output):
+    state = {
+        "schema": _schema(header),
+        "raw_offset": offset,
+        "raw_digest": _tail_digest(offset),
+        "last_session_id": int(df["session_id"].iloc[-1]) if len(df) else None,
+        "rows": rows,
+        "output": os.path.basename(output),
+        "output_mark": storage.backend_for(output).mark(output)
+    }
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, mode="w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+def run_full(output=OUTPUT_FILE):
+    """Rebuild the whole features file from the raw sessions."""
+    raw = SessionStore(DATA_FILE)
+    with metrics.span("fe.read"):
+        df, offset = raw.read_tail(0)
+    df = build_features(df)
+    with metrics.span("fe.write"):
+        storage.write(df, output)
+    _save_state(df, offset, len(df), raw.columns, output)
+    return df
+
+def _needs_rebuild(state, header, output):
+    if state is None or state.get("schema") != _schema(header):
+        return True
+    if state.get("output") != os.path.basename(output) or not os.path.exists(output):
+        return True
+    if storage.backend_for(output).mark(output) < state["output_mark"]:
+        return True
+    offset = state["raw_offset"]
+    return os.path.getsize(DATA_FILE) < offset or _tail_digest(offset) != state["raw_digest"]
+
+def run_incremental(output=OUTPUT_FILE):
+    """Append features for sessions added since the last run.
+
+    Falls back to run_full() when there is no usable high-water mark, the
+    feature schema or output format changed, or the raw file was rewritten
+    rather than appended.
+    """
+    raw = SessionStore(DATA_FILE)
+    state = _load_state()
+    if _needs_rebuild(state, raw.columns, output):
+        return run_full(output)
+    with metrics.span("fe.read"):
+        df, offset = raw.read_tail(state["raw_offset"])
+    if df.empty:
+        return df
+    df = build_features(df)
+    backend = storage.backend_for(output)
+    # Drop rows a crashed run appended without recording them in the state.
+    with metrics.span("fe.write"):
+        backend.rollback(output, state["output_mark"])
+        backend.append(df, output)
+    _save_state(df, offset, state["rows"] + len(df), raw.columns, output)
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute typing features for the raw sessions.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only process sessions appended since the last run")
+    parser.add_argument("--format", choices=sorted(storage.FORMATS), default="csv",
+                        help="storage format of the features file")
+    args = parser.parse_args()
+    output = storage.with_format(OUTPUT_FILE, args.format)
+    if args.incremental:
+        df = run_incremental(output)
+        print(f"✅ Incremental feature engineering complete ({len(df)} new sessions).")
+        print(f"Saved file: {output}")
+        return
+    df = run_full(output)
+    print("✅ Feature engineering complete.")
+    print(f"Saved file: {output}")
+    print("Here are the first few rows with new columns:")
+    print(df.head())
+
+if __name__ == "__main__":
+    main()
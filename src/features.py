@@ -0,0 +1,272 @@
+"""The typing features, computed the same way by every entry point.
+
+The scalar functions score one session (typing_logger, live_predict,
+tk_ui); the batch functions score columns of sessions (feature_engineering,
+predict_stress) and return exactly what the scalar ones would for each row.
+
+Sessions reuse a handful of reference sentences, so everything derived
+from a reference text alone (stripped text, words, lengths, code points,
+word boundaries) is computed once per distinct text and kept in a bounded
+LRU cache keyed by the text.
+
+pandas is imported by the batch functions only, so the interactive entry
+points start without it.
+"""
+import functools
+import numpy as np
+
+FEATURES = [
+    "chars_per_sec",
+    "mistakes_per_char",
+    "difficulty_score",
+    "word_mistake_rate",
+    "accuracy_percent",
+    "sleep_hours"
+]
+# The model's classes (self_stress_level) by name.
+LABELS = {
+    0: "Calm",
+    1: "Normal",
+    2: "Stressed"
+}
+# What session_features()/batch_session_features() return: the model
+# features plus the counts they are built from.
+SESSION_COLUMNS = [
+    "reference_len",
+    "typed_len",
+    "mistake_count",
+    "word_mistake_count"
+] + FEATURES
+
+REFERENCE_CACHE_SIZE = 1024
+
+# Rows per block when texts are expanded into fixed-width arrays, so memory
+# stays bounded on very large archives.
+CHUNK_ROWS = 100_000
+
+class Reference:
+    """Everything the features need from one reference text."""
+    __slots__ = ("text", "length", "words", "_word_table")
+
+    def __init__(self, text):
+        self.text = text.strip()
+        self.length = len(self.text)
+        self.words = self.text.split()
+        self._word_table = None
+
+    @property
+    def word_table(self):
+        """(code points, word starts, word lengths), built on first use by the batch functions."""
+        if self._word_table is None:
+            self._word_table = _flat_words([self.text])[:3]
+        return self._word_table
+
+@functools.lru_cache(maxsize=REFERENCE_CACHE_SIZE)
+def reference_info(text):
+    """Cached Reference for `text`."""
+    return Reference(text)
+
+# ---------- SCALAR ----------
+
+def calculate_accuracy(reference, typed):
+    """Return (accuracy_percent, mistake_count), comparing characters position by position."""
+    ref = reference_info(reference).text
+    t = typed.strip()
+    max_len = max(len(ref), len(t))
+
+    mistakes = 0
+    for i in range(max_len):
+        ref_char = ref[i] if i < len(ref) else ""
+        t_char = t[i] if i < len(t) else ""
+        if ref_char != t_char:
+            mistakes += 1
+
+    if max_len == 0:
+        return 0.0, mistakes
+
+    accuracy = ((max_len - mistakes) / max_len) * 100
+    return round(accuracy, 2), mistakes
+
+def word_level_mistakes(ref, typed):
+    ref_words = reference_info(str(ref)).words
+    typed_words = str(typed).split()
+    mistakes = sum(1 for rw, tw in zip(ref_words, typed_words) if rw != tw)
+    mistakes += abs(len(ref_words) - len(typed_words))
+    return mistakes
+
+def session_features(reference, typed, time_taken_sec, sleep_hours=0.0):
+    """SESSION_COLUMNS for one session, as a dict."""
+    reference_len = reference_info(reference).length
+    typed_len = len(typed.strip())
+    accuracy_percent, mistake_count = calculate_accuracy(reference, typed)
+    word_mistake_count = word_level_mistakes(reference, typed)
+    return {
+        "reference_len": reference_len,
+        "typed_len": typed_len,
+        "mistake_count": mistake_count,
+        "word_mistake_count": word_mistake_count,
+        "chars_per_sec": typed_len / time_taken_sec if time_taken_sec > 0 else 0.0,
+        "mistakes_per_char": mistake_count / reference_len if reference_len > 0 else 0.0,
+        "difficulty_score": max(0, (reference_len - typed_len) + mistake_count),
+        "word_mistake_rate": word_mistake_count / reference_len if reference_len > 0 else 0.0,
+        "accuracy_percent": accuracy_percent,
+        "sleep_hours": sleep_hours
+    }
+
+# ---------- BATCH ----------
+
+def _as_text(values):
+    """Object array of str, matching the str(...) calls in the scalar helpers."""
+    import pandas as pd
+    values = pd.Series(values).to_numpy(dtype=object)
+    # Not .astype(str): pandas would build an Arrow string column and convert
+    # it back, which costs more than the features themselves.
+    if set(map(type, values)) <= {str}:
+        return values
+    return np.fromiter(map(str, values), dtype=object, count=len(values))
+
+def _by_reference(refs):
+    """{reference text: row indices}, in order of first appearance."""
+    import pandas as pd
+    codes, uniques = pd.factorize(refs)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+    return dict(zip(uniques, np.split(order, bounds)))
+
+def _stripped(texts):
+    return np.fromiter(map(str.strip, texts), dtype=object, count=len(texts))
+
+def _char_codes(strings, width):
+    """Pack strings into a (rows, width) uint32 array of code points, zero padded."""
+    arr = np.asarray(strings, dtype=f"<U{width}")
+    return arr.view(np.uint32).reshape(len(arr), width)
+
+def batch_calculate_accuracy(references, typed):
+    """Column-wise calculate_accuracy(): returns (accuracy_percent, mistake_count) arrays."""
+    refs = _as_text(references)
+    return _accuracy(_by_reference(refs), _stripped(_as_text(typed)))
+
+def _accuracy(groups, stripped):
+    n = len(stripped)
+    accuracy = np.zeros(n, dtype=np.float64)
+    mistakes = np.zeros(n, dtype=np.int64)
+    for ref, idx in groups.items():
+        ref = reference_info(ref).text
+        for start in range(0, len(idx), CHUNK_ROWS):
+            rows = idx[start:start + CHUNK_ROWS]
+            t = stripped[rows]
+            t_len = np.fromiter(map(len, t), dtype=np.int64, count=len(t))
+            width = max(len(ref), int(t_len.max()), 1)
+            ref_codes = _char_codes([ref], width)
+            t_codes = _char_codes(t, width)
+            max_len = np.maximum(len(ref), t_len)
+            # A position only one side reaches is a mistake even if it holds "\0".
+            pos = np.arange(width)
+            one_sided = (pos >= len(ref)) | (pos >= t_len[:, None])
+            one_sided &= pos < max_len[:, None]
+            m = ((t_codes != ref_codes) | one_sided).sum(axis=1)
+            mistakes[rows] = m
+            with np.errstate(divide="ignore", invalid="ignore"):
+                acc = np.round((max_len - m) / max_len * 100, 2)
+            accuracy[rows] = np.where(max_len == 0, 0.0, acc)
+    return accuracy, mistakes
+
+# Code points str.split() treats as separators.
+_WHITESPACE = np.array([i for i in range(0x3001) if chr(i).isspace()], dtype=np.uint32)
+
+def _flat_words(texts):
+    """Locate whitespace-split words in a block of texts without splitting them.
+
+    Returns the texts' code points as one flat array, plus per word its start
+    position in that array, its length and the row it came from.
+    """
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    row_ends = np.cumsum(lengths)
+    if len(codes) and codes.max() < 0x80:
+        in_word = (codes > 0x20) | ((codes > 0x0d) & (codes < 0x1c)) | (codes < 0x09)
+    else:
+        in_word = ~np.isin(codes, _WHITESPACE)
+    # Row boundaries also end words, as if each text were split on its own.
+    cut = np.zeros(len(codes) + 1, dtype=bool)
+    cut[row_ends] = True
+    before = np.r_[False, in_word]
+    after = np.r_[in_word, False]
+    starts = np.flatnonzero(in_word & (~before[:-1] | cut[:-1]))
+    ends = np.flatnonzero(in_word & (~after[1:] | cut[1:])) + 1
+    rows = np.searchsorted(row_ends, starts, side="right")
+    return codes, starts, ends - starts, rows
+
+def batch_word_mistakes(references, typed):
+    """Column-wise word_level_mistakes(), grouped per distinct reference text.
+
+    Each block of typed texts is flattened into one code-point array and its
+    words are compared with the same-numbered reference word, so there is no
+    per-row Python split.
+    """
+    refs = _as_text(references)
+    return _word_mistakes(_by_reference(refs), _as_text(typed))
+
+def _word_mistakes(groups, texts):
+    out = np.zeros(len(texts), dtype=np.int64)
+    for ref, idx in groups.items():
+        ref_codes, ref_starts, ref_lens = reference_info(ref).word_table
+        n_ref = len(ref_starts)
+        # Exact copies of the reference have no word mistakes; skip them.
+        idx = idx[texts[idx] != ref]
+        for start in range(0, len(idx), CHUNK_ROWS):
+            rows = idx[start:start + CHUNK_ROWS]
+            codes, starts, lens, word_rows = _flat_words(texts[rows])
+            n_words = np.bincount(word_rows, minlength=len(rows))
+            # Position of each word within its own row.
+            j = np.arange(len(starts)) - (np.cumsum(n_words) - n_words)[word_rows]
+            paired = j < n_ref
+            starts, lens, word_rows, j = starts[paired], lens[paired], word_rows[paired], j[paired]
+            wrong = lens != ref_lens[j]
+            # Only same-length pairs need a char-by-char comparison.
+            same = np.flatnonzero(~wrong)
+            if len(same):
+                same_lens = lens[same]
+                offsets = np.arange(same_lens.sum()) - np.repeat(np.cumsum(same_lens) - same_lens, same_lens)
+                typed_chars = codes[np.repeat(starts[same], same_lens) + offsets]
+                ref_chars = ref_codes[np.repeat(ref_starts[j[same]], same_lens) + offsets]
+                word_of_char = np.repeat(np.arange(len(same)), same_lens)
+                wrong[same] = np.bincount(
+                    word_of_char[typed_chars != ref_chars], minlength=len(same)
+                ) > 0
+            out[rows] = np.bincount(word_rows[wrong], minlength=len(rows)) + np.abs(n_ref - n_words)
+    return out
+
+def batch_session_features(references, typed, time_taken_sec, sleep_hours=None):
+    """Column-wise session_features(): a DataFrame with SESSION_COLUMNS, one row per session."""
+    import pandas as pd
+    refs = _as_text(references)
+    texts = _as_text(pd.Series(typed).fillna(""))
+    # Grouping, str conversion and stripping are shared by all the features.
+    groups = _by_reference(refs)
+    stripped = _stripped(texts)
+    reference_len = np.zeros(len(refs), dtype=np.int64)
+    for ref, idx in groups.items():
+        reference_len[idx] = reference_info(ref).length
+    typed_len = np.fromiter(map(len, stripped), dtype=np.int64, count=len(stripped))
+    time_taken = pd.to_numeric(pd.Series(time_taken_sec), errors="coerce").fillna(0).to_numpy()
+    sleep = np.zeros(len(refs)) if sleep_hours is None else \
+        pd.to_numeric(pd.Series(sleep_hours), errors="coerce").fillna(0.0).to_numpy()
+    accuracy_percent, mistake_count = _accuracy(groups, stripped)
+    word_mistake_count = _word_mistakes(groups, texts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chars_per_sec = np.where(time_taken > 0, typed_len / time_taken, 0.0)
+        mistakes_per_char = np.where(reference_len > 0, mistake_count / reference_len, 0.0)
+        word_mistake_rate = np.where(reference_len > 0, word_mistake_count / reference_len, 0.0)
+    return pd.DataFrame({
+        "reference_len": reference_len,
+        "typed_len": typed_len,
+        "mistake_count": mistake_count,
+        "word_mistake_count": word_mistake_count,
+        "chars_per_sec": chars_per_sec,
+        "mistakes_per_char": mistakes_per_char,
+        "difficulty_score": np.maximum(0, (reference_len - typed_len) + mistake_count),
+        "word_mistake_rate": word_mistake_rate,
+        "accuracy_percent": accuracy_percent,
+        "sleep_hours": sleep
+    })
@@ -0,0 +1,200 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from src.session_store import SessionStore
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FSYNC_POLICIES = ("batch", "interval", "none")
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by all local processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, mode="a+b")
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        else:
+            self._f.seek(0)
+            msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        else:
+            self._f.seek(0)
+            msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        self._f.close()
+
+class SessionIngestor:
+    """Group-commit ingestion of typing sessions from many local processes.
+
+    Stations drop each session into a spool directory next to the CSV
+    (an atomic rename, no lock needed). Whichever process holds the lock
+    drains the whole spool into the CSV: ids are allocated under the lock,
+    each batch is one append (plus one fsync, depending on `fsync`), and the
+    batch is journalled first so a crash mid-write is repaired on the next
+    commit instead of duplicating rows.
+
+    fsync: "batch" syncs every group commit before it is acknowledged,
+    "interval" at most every `fsync_interval` seconds, "none" leaves it to
+    the OS.
+    """
+
+    def __init__(self, path, columns, fsync="batch", fsync_interval=1.0, max_batch=500):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.columns = columns
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.spool_dir = path + ".spool"
+        self.incoming_dir = os.path.join(self.spool_dir, "incoming")
+        self.receipt_dir = os.path.join(self.spool_dir, "receipts")
+        self.rejected_dir = os.path.join(self.spool_dir, "rejected")
+        self.journal_path = os.path.join(self.spool_dir, "commit.json")
+        self.lock_path = os.path.join(self.spool_dir, "commit.lock")
+        for d in (self.incoming_dir, self.receipt_dir, self.rejected_dir):
+            os.makedirs(d, exist_ok=True)
+        self._counter = itertools.count()
+        self._last_fsync = 0.0
+
+    # ---------- station side ----------
+
+    def submit(self, row, wait=True, timeout=30.0):
+        """Spool one session. With wait=True, commit and return its session_id."""
+        ticket = f"{time.time_ns():020d}-{os.getpid()}-{next(self._counter)}"
+        tmp = os.path.join(self.incoming_dir, f".{ticket}.tmp")
+        with open(tmp, mode="w", encoding="utf-8") as f:
+            json.dump({"row": row, "receipt": wait}, f)
+        os.replace(tmp, os.path.join(self.incoming_dir, ticket + ".json"))
+        if not wait:
+            return None
+        receipt = os.path.join(self.receipt_dir, ticket)
+        deadline = time.monotonic() + timeout
+        while True:
+            # Drains everything pending, so ours is in by the time this returns
+            # unless another committer took it first (then its receipt is there).
+            self.commit()
+            try:
+                with open(receipt, mode="r", encoding="utf-8") as f:
+                    session_id = int(f.read())
+                os.remove(receipt)
+                return session_id
+            except (OSError, ValueError):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Session {ticket} was not committed within {timeout}s")
+                time.sleep(0.01)
+
+    # ---------- committer side ----------
+
+    def _pending(self):
+        return sorted(n[:-5] for n in os.listdir(self.incoming_dir) if n.endswith(".json"))
+
+    def _load(self, ticket):
+        with open(os.path.join(self.incoming_dir, ticket + ".json"), mode="r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _should_fsync(self):
+        if self.fsync == "batch":
+            return True
+        if self.fsync == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._last_fsync = time.monotonic()
+            return True
+        return False
+
+    def _finish(self, tickets, receipts, ids):
+        for ticket, wants_receipt, session_id in zip(tickets, receipts, ids):
+            if wants_receipt:
+                tmp = os.path.join(self.receipt_dir, f".{ticket}.tmp")
+                with open(tmp, mode="w", encoding="utf-8") as f:
+                    f.write(str(session_id))
+                os.replace(tmp, os.path.join(self.receipt_dir, ticket))
+            try:
+                os.remove(os.path.join(self.incoming_dir, ticket + ".json"))
+            except FileNotFoundError:
+                pass
+        os.remove(self.journal_path)
+
+    def _recover(self):
+        """Finish or roll back a batch a crashed committer left journalled."""
+        try:
+            with open(self.journal_path, mode="r", encoding="utf-8") as f:
+                journal = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            # Crashed while journalling: nothing was written to the CSV yet.
+            os.remove(self.journal_path)
+            return
+        end = journal["offset"] + journal["length"]
+        if os.path.isfile(self.path) and os.path.getsize(self.path) >= end:
+            self._finish(journal["tickets"], journal["receipts"], journal["ids"])
+        else:
+            if os.path.isfile(self.path):
+                with open(self.path, mode="r+b") as f:
+                    f.truncate(journal["offset"])
+            os.remove(self.journal_path)
+
+    def commit(self):
+        """Drain the spool into the CSV in group commits; returns rows written."""
+        written = 0
+        with FileLock(self.lock_path):
+            self._recover()
+            store = SessionStore(self.path, columns=self.columns)
+            while True:
+                tickets, entries = [], []
+                for ticket in self._pending()[:self.max_batch]:
+                    try:
+                        entries.append(self._load(ticket))
+                        tickets.append(ticket)
+                    except (OSError, ValueError):
+                        os.replace(os.path.join(self.incoming_dir, ticket + ".json"),
+                                   os.path.join(self.rejected_dir, ticket + ".json"))
+                if not tickets:
+                    return written
+                receipts = [bool(e.get("receipt")) for e in entries]
+                sync = self._should_fsync()
+
+                def journal(offset, length, ids):
+                    with open(self.journal_path, mode="w", encoding="utf-8") as f:
+                        json.dump({"offset": offset, "length": length, "ids": ids,
+                                   "tickets": tickets, "receipts": receipts}, f)
+                        if sync:
+                            f.flush()
+                            os.fsync(f.fileno())
+
+                ids = store.append_rows([e["row"] for e in entries], fsync=sync, before_write=journal)
+                self._finish(tickets, receipts, ids)
+                written += len(ids)
+
+def main():
+    from src.typing_logger import DATA_FILE, RAW_COLUMNS
+    parser = argparse.ArgumentParser(description="Commit spooled typing sessions into raw_sessions.csv.")
+    parser.add_argument("--watch", action="store_true", help="keep committing until interrupted")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between commits with --watch")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="batch")
+    args = parser.parse_args()
+    ingestor = SessionIngestor(DATA_FILE, RAW_COLUMNS, fsync=args.fsync)
+    while True:
+        written = ingestor.commit()
+        if written:
+            print(f"Committed {written} sessions to {DATA_FILE}")
+        if not args.watch:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
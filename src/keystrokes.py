@@ -0,0 +1,149 @@
+"""Per-keystroke capture: a preallocated ring buffer of key events plus a compact file format.
+
+KeystrokeRecorder is bound to a Tk widget's <KeyPress>/<KeyRelease>. Each
+event writes a monotonic timestamp, the keysym number and down/up into
+three array.array buffers allocated once up front; the handler does no
+I/O and creates no lists or objects of its own, so the Tk main loop never
+waits on it. If a session outgrows the buffer, the oldest events are
+overwritten and counted in `dropped`.
+
+Sessions are saved as data/keystrokes/<session>.ks:
+    header  "<4sHHIq": magic b"KSTK", version, flags, event count, t0 (ns)
+    uint32  microseconds since t0, per event
+    uint32  keysym number, per event
+    uint8   1 = key down, 0 = key up, per event
+(9 bytes per event; a 150-character sentence is about 3 KB.)
+"""
+import argparse
+import array
+import glob
+import os
+import struct
+import time
+import numpy as np
+
+KEYSTROKE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "keystrokes")
+HEADER = struct.Struct("<4sHHIq")
+MAGIC = b"KSTK"
+FORMAT_VERSION = 1
+KEY_DOWN, KEY_UP = 1, 0
+BACKSPACE = 0xFF08  # X11 keysym, also what Tk reports on Windows and macOS
+PAUSE_SEC = 2.0
+
+class KeystrokeRecorder:
+    def __init__(self, capacity=16384):
+        self.capacity = capacity
+        self.times = array.array("q", bytes(8 * capacity))
+        self.keys = array.array("I", bytes(4 * capacity))
+        self.kinds = array.array("B", bytes(capacity))
+        self.count = 0
+        self._clock = time.perf_counter_ns
+
+    @property
+    def dropped(self):
+        return max(0, self.count - self.capacity)
+
+    def on_key_down(self, event):
+        i = self.count % self.capacity
+        self.times[i] = self._clock()
+        self.keys[i] = event.keysym_num
+        self.kinds[i] = KEY_DOWN
+        self.count += 1
+
+    def on_key_up(self, event):
+        i = self.count % self.capacity
+        self.times[i] = self._clock()
+        self.keys[i] = event.keysym_num
+        self.kinds[i] = KEY_UP
+        self.count += 1
+
+    def bind(self, widget):
+        widget.bind("<KeyPress>", self.on_key_down, add="+")
+        widget.bind("<KeyRelease>", self.on_key_up, add="+")
+
+    def reset(self):
+        self.count = 0
+
+    def events(self):
+        """(time_ns, keysym, kind) arrays of the buffered events, oldest first."""
+        n = min(self.count, self.capacity)
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        order = (np.arange(n) + start) % self.capacity
+        times = np.frombuffer(self.times, dtype=np.int64)[order]
+        keys = np.frombuffer(self.keys, dtype=np.uint32)[order]
+        kinds = np.frombuffer(self.kinds, dtype=np.uint8)[order]
+        return times, keys, kinds
+
+def save_session(path, times, keys, kinds):
+    """Write one session's events (as returned by KeystrokeRecorder.events) to `path`."""
+    t0 = int(times[0]) if len(times) else 0
+    offsets = ((np.asarray(times, dtype=np.int64) - t0) // 1000).astype("<u4")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, mode="wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(offsets), t0))
+        f.write(offsets.tobytes())
+        f.write(np.asarray(keys, dtype="<u4").tobytes())
+        f.write(np.asarray(kinds, dtype=np.uint8).tobytes())
+    os.replace(tmp, path)
+    return path
+
+def load_session(path):
+    """(time_ns, keysym, kind) arrays from a .ks file; times are t0 + microsecond offsets."""
+    with open(path, mode="rb") as f:
+        data = f.read()
+    magic, version, _, n, t0 = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} keystroke file")
+    pos = HEADER.size
+    offsets = np.frombuffer(data, dtype="<u4", count=n, offset=pos)
+    keys = np.frombuffer(data, dtype="<u4", count=n, offset=pos + 4 * n)
+    kinds = np.frombuffer(data, dtype=np.uint8, count=n, offset=pos + 8 * n)
+    return t0 + offsets.astype(np.int64) * 1000, keys.astype(np.uint32), kinds.copy()
+
+def session_path(session):
+    return os.path.join(KEYSTROKE_DIR, f"{session}.ks")
+
+def keystroke_stats(times, keys, kinds, pause_sec=PAUSE_SEC):
+    """Dwell, flight, pause and backspace statistics for one session's events."""
+    times = np.asarray(times, dtype=np.int64)
+    down = kinds == KEY_DOWN
+    down_times = times[down]
+    # Dwell: each key-up paired with the first unmatched key-down of the same key.
+    dwell = []
+    pressed = {}
+    for t, key, kind in zip(times.tolist(), keys.tolist(), kinds.tolist()):
+        if kind == KEY_DOWN:
+            # Auto-repeat sends repeated downs; keep the first.
+            pressed.setdefault(key, t)
+        elif key in pressed:
+            dwell.append(t - pressed.pop(key))
+    dwell = np.array(dwell, dtype=np.float64) / 1e9
+    # Flight: key-up to the next key-down.
+    up_times = times[~down]
+    nxt = np.searchsorted(down_times, up_times, side="right")
+    valid = nxt < len(down_times)
+    flight = (down_times[nxt[valid]] - up_times[valid]) / 1e9
+    gaps = np.diff(down_times) / 1e9
+    return {
+        "key_downs": int(down.sum()),
+        "backspaces": int(np.sum(down & (keys == BACKSPACE))),
+        "mean_dwell_sec": float(dwell.mean()) if len(dwell) else 0.0,
+        "mean_flight_sec": float(flight.mean()) if len(flight) else 0.0,
+        "pauses": int(np.sum(gaps >= pause_sec)),
+        "longest_pause_sec": float(gaps.max()) if len(gaps) else 0.0,
+        "keys_per_sec": float((len(down_times) - 1) / ((down_times[-1] - down_times[0]) / 1e9))
+        if len(down_times) > 1 and down_times[-1] > down_times[0] else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise saved keystroke sessions.")
+    parser.add_argument("paths", nargs="*", help=".ks files (default: everything in data/keystrokes)")
+    args = parser.parse_args()
+    paths = args.paths or sorted(glob.glob(os.path.join(KEYSTROKE_DIR, "*.ks")))
+    for path in paths:
+        stats = keystroke_stats(*load_session(path))
+        print(os.path.basename(path), " ".join(f"{k}={round(v, 3)}" for k, v in stats.items()))
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,46 @@
+import argparse
+import sys
+import threading
 import time
-import random
-import os
-import joblib
-import pandas as pd
-REFERENCE_TEXTS = [
-    "Python makes data science fun and powerful.",
-    "Typing speed and accuracy can reflect our focus.",
-    "Machine learning finds patterns in noisy data.",
-    "College projects are a great way to learn real skills.",
-    "Typing speed and accuracy during a test can reflect how focused or distracted a student is at that moment.",
-    "Machine learning models can discover hidden patterns in noisy data, helping us make better predictions about the real world."
-]
-def choose_reference_text():
-    return random.choice(REFERENCE_TEXTS)
-def calculate_accuracy(reference, typed):
-    """Return (accuracy_percent, mistake_count)."""
-    ref = reference.strip()
-    t = typed.strip()
-    max_len = max(len(ref), len(t))
-
-    mistakes = 0
-    for i in range(max_len):
-        ref_char = ref[i] if i < len(ref) else ""
-        t_char = t[i] if i < len(t) else ""
-        if ref_char != t_char:
-            mistakes += 1
-    if max_len == 0:
-        return 0.0, mistakes
-    accuracy = ((max_len - mistakes) / max_len) * 100
-    return round(accuracy, 2), mistakes
-def word_level_mistakes(ref, typed):
-    ref_words = str(ref).split()
-    typed_words = str(typed).split()
-    mistakes = sum(1 for rw, tw in zip(ref_words, typed_words) if rw != tw)
-    mistakes += abs(len(ref_words) - len(typed_words))
-    return mistakes
+from src import metrics, model_cache
+from src.streaming import LiveScorer, StreamingFeatures
+from src.alignment import alignment_scores
+from src.compiled_model import model_features, model_input
+from src.features import FEATURES, LABELS, session_features
+from src.predict_server import remote_predict
+from src.reference_corpus import LEVELS, choose_reference_text
+from src.user_profiles import ProfileStore
 def load_model():
-    model_path = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.pkl")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file not found at: {model_path}")
-    return joblib.load(model_path)
-def run_live_prediction():
-    print("\n=== KeystrokeSense: Live Stress Prediction ===\n")
-    reference_text = choose_reference_text()
-    print("Type the following sentence as accurately and quickly as you can:\n")
+    """Warm model from the process-wide cache (reloaded when train_model.py writes a new one)."""
+    return model_cache.shared.get()
+def user_relative(user_id, f):
+    """Z_FEATURES of session features `f` against the user's stored baseline (zeros without one)."""
+    with metrics.span("predict.baseline"):
+        return ProfileStore().z_scores(user_id, f)
+def predict_one(features):
+    """Label for one feature dict: from the prediction server if reachable, else in-process.
+
+    `features` holds FEATURES and, for models trained with --user-relative,
+    the Z_FEATURES as well.
+    """
+    with metrics.span("predict.server"):
+        served = remote_predict([features])
+    if served is not None:
+        metrics.count("predict.remote")
+        return served[0]
+    metrics.count("predict.local")
+    with metrics.span("predict.get_model"):
+        model = load_model()
+    with metrics.span("predict.input"):
+        X = model_input(model, [features], model_features(model, FEATURES))
+    with metrics.span("predict.model"):
+        return model.predict(X)[0]
+def run_live_prediction(show_title=True, level=None):
+    if show_title:
+        print("\n=== KeystrokeSense: Live Stress Prediction ===\n")
+    user_id = input("Enter user id (optional, for your personal baseline): ").strip()
+    reference_text = choose_reference_text(level)
+    print("\nType the following sentence as accurately and quickly as you can:\n")
     print("-->", reference_text)
     input("\nPress ENTER when you are ready to start...")
     print("\nStart typing and press ENTER when done:")
@@ -51,14 +48,6 @@ def run_live_prediction():
     typed_text = input("> ")
     end_time = time.time()
     time_taken_sec = round(end_time - start_time, 2)
-    reference_len = len(reference_text.strip())
-    typed_len = len(typed_text.strip())
-    accuracy_percent, mistake_count = calculate_accuracy(reference_text, typed_text)
-    difficulty_score = max(0, (reference_len - typed_len) + mistake_count)
-    chars_per_sec = typed_len / time_taken_sec if time_taken_sec > 0 else 0.0
-    mistakes_per_char = mistake_count / reference_len if reference_len > 0 else 0.0
-    word_mistake_count = word_level_mistakes(reference_text, typed_text)
-    word_mistake_rate = word_mistake_count / reference_len if reference_len > 0 else 0.0
     sleep_raw = input("\nHow many hours did you sleep last night? (just press ENTER to skip): ").strip()
     if sleep_raw == "":
         sleep_hours = 0.0
@@ -67,35 +56,132 @@ def run_live_prediction():
             sleep_hours = float(sleep_raw)
         except ValueError:
             sleep_hours = 0.0
+    with metrics.span("predict.features"):
+        f = session_features(reference_text, typed_text, time_taken_sec, sleep_hours)
     print("\n=== Typing Session Summary ===")
     print(f"Time taken (sec):        {time_taken_sec}")
-    print(f"Reference length:        {reference_len}")
-    print(f"Typed length:            {typed_len}")
-    print(f"Accuracy (%):            {accuracy_percent}")
-    print(f"Mistakes (char-level):   {mistake_count}")
-    print(f"Word-level mistakes:     {word_mistake_count}")
-    print(f"Chars per second:        {round(chars_per_sec, 3)}")
-    print(f"Mistakes per char:       {round(mistakes_per_char, 4)}")
-    print(f"Difficulty score:        {difficulty_score}")
-    print(f"Word mistake rate:       {round(word_mistake_rate, 4)}")
+    print(f"Reference length:        {f['reference_len']}")
+    print(f"Typed length:            {f['typed_len']}")
+    print(f"Accuracy (%):            {f['accuracy_percent']}")
+    print(f"Mistakes (char-level):   {f['mistake_count']}")
+    print(f"Word-level mistakes:     {f['word_mistake_count']}")
+    with metrics.span("predict.alignment"):
+        edits = alignment_scores(reference_text, typed_text)
+    print(f"Char edits (sub/ins/del): {edits['char_substitutions']}/{edits['char_insertions']}/{edits['char_deletions']}")
+    print(f"Word edits (sub/ins/del): {edits['word_substitutions']}/{edits['word_insertions']}/{edits['word_deletions']}")
+    print(f"Chars per second:        {round(f['chars_per_sec'], 3)}")
+    print(f"Mistakes per char:       {round(f['mistakes_per_char'], 4)}")
+    print(f"Difficulty score:        {f['difficulty_score']}")
+    print(f"Word mistake rate:       {round(f['word_mistake_rate'], 4)}")
     print(f"Sleep hours:             {sleep_hours}")
-    model = load_model()
-    feature_row = pd.DataFrame([{
-        "chars_per_sec": chars_per_sec,
-        "mistakes_per_char": mistakes_per_char,
-        "difficulty_score": difficulty_score,
-        "word_mistake_rate": word_mistake_rate,
-        "accuracy_percent": accuracy_percent,
-        "sleep_hours": sleep_hours
-    }])
-    pred = model.predict(feature_row)[0]
-    labels = {
-        0: "Calm",
-        1: "Normal",
-        2: "Stressed"
-    }
+    features = {name: f[name] for name in FEATURES}
+    features.update(user_relative(user_id, f))
+    if user_id:
+        print(f"Speed vs your baseline:  z = {features['chars_per_sec_z']:+.2f}")
+        print(f"Accuracy vs baseline:    z = {features['accuracy_percent_z']:+.2f}")
+    # Use the warm prediction server if one is running, else load the model here.
+    pred = predict_one(features)
     print("\n=== Model Prediction ===")
-    print(f"🧠 Predicted Stress Level: {labels.get(pred, 'Unknown')}")
+    print(f"🧠 Predicted Stress Level: {LABELS.get(pred, 'Unknown')}")
     print("\n(0 = Calm, 1 = Normal, 2 = Stressed)\n")
+def read_keys():
+    """Yield typed characters one at a time, without waiting for ENTER."""
+    try:
+        import msvcrt
+    except ImportError:
+        import termios
+        import tty
+        fd = sys.stdin.fileno()
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            while True:
+                yield sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+    else:
+        while True:
+            yield msvcrt.getwch()
+def run_streaming_prediction(show_title=True, level=None):
+    """Type the sentence while the predicted stress level updates on the same line."""
+    if show_title:
+        print("\n=== KeystrokeSense: Streaming Stress Prediction ===\n")
+    reference_text = choose_reference_text(level)
+    user_id = input("Enter user id (optional, for your personal baseline): ").strip()
+    sleep_raw = input("How many hours did you sleep last night? (just press ENTER to skip): ").strip()
+    try:
+        sleep_hours = float(sleep_raw) if sleep_raw else 0.0
+    except ValueError:
+        sleep_hours = 0.0
+    print("\nType the following sentence; press ENTER when done:\n")
+    print("-->", reference_text, "\n")
+    stream = StreamingFeatures(reference_text, sleep_hours=sleep_hours, baseline=ProfileStore().get(user_id))
+    typed = []
+    status = {"text": "waiting for input", "feature_us": 0.0}
+    lock = threading.Lock()
+    def render():
+        with lock:
+            line = "".join(typed[-60:])
+            sys.stdout.write(f"\r\033[K> {line}   [{status['text']}]")
+            sys.stdout.flush()
+    def on_result(result):
+        if "error" in result:
+            status["text"] = f"no prediction: {result['error']}"
+        else:
+            status["text"] = (f"{result['stress']} {result['confidence']:.0%} | "
+                              f"features {status['feature_us']:.0f}us, model {result['predict_ms']:.1f}ms")
+        render()
+    scorer = LiveScorer(on_result)
+    render()
+    for ch in read_keys():
+        if ch in ("\r", "\n", ""):
+            break
+        start = time.perf_counter()
+        if ch in ("\x7f", "\b"):
+            if typed:
+                typed.pop()
+                stream.backspace()
+        elif ch.isprintable():
+            typed.append(ch)
+            stream.type_char(ch)
+        else:
+            continue
+        features = stream.features()
+        elapsed = time.perf_counter() - start
+        status["feature_us"] = elapsed * 1e6
+        metrics.record("stream.features", elapsed)
+        scorer.update(features)
+        render()
+    # Let the last keystroke's prediction land before leaving.
+    time.sleep(scorer.debounce_sec + 0.1)
+    scorer.close()
+    print()
+    if scorer.latencies:
+        lat = sorted(scorer.latencies)
+        print(f"\nLive updates: {len(lat)}, key-to-result latency median {lat[len(lat) // 2] * 1000:.0f} ms, "
+              f"max {lat[-1] * 1000:.0f} ms")
+    print(f"🧠 Final live prediction: {status['text'].split(' | ')[0]}\n")
+def main():
+    parser = argparse.ArgumentParser(description="Live stress prediction from one or more typing rounds.")
+    parser.add_argument("--loop", action="store_true", help="keep running rounds on the same warm model")
+    parser.add_argument("--rounds", type=int, default=0, help="stop after this many rounds with --loop (0 = until you quit)")
+    parser.add_argument("--stream", action="store_true", help="update the prediction on every keystroke while typing")
+    parser.add_argument("--level", choices=LEVELS, help="reference sentence difficulty (default: any, stratified)")
+    args = parser.parse_args()
+    run_round = run_streaming_prediction if args.stream else run_live_prediction
+    # Load while the user reads and types, not after they finish.
+    model_cache.shared.preload()
+    run_round(level=args.level)
+    rounds = 1
+    while args.loop and (args.rounds == 0 or rounds < args.rounds):
+        try:
+            again = input("Press ENTER for another round (q to quit): ").strip().lower()
+        except EOFError:
+            break
+        if again in ("q", "quit", "exit"):
+            break
+        print(f"\n=== Round {rounds + 1} ===\n")
+        run_round(show_title=False, level=args.level)
+        rounds += 1
 if __name__ == "__main__":
-    run_live_prediction()
+    main()
@@ -0,0 +1,249 @@
+"""Span timers and counters for the prediction, feature and training stages.
+
+    from src import metrics
+    with metrics.span("predict.model"):
+        pred = model.predict(X)
+    metrics.count("predict.remote")
+
+Off unless KEYSTROKESENSE_METRICS names a directory (or enable() is
+called). When off, span() hands back one shared do-nothing context manager
+and count() returns at once, so instrumented code pays a function call.
+
+When on, every span and count is kept in memory and flushed (at exit, and
+at most every FLUSH_INTERVAL seconds while running) to two files in the
+directory:
+  events.jsonl        one line per span/count, from every process
+  <program>.prom      Prometheus text format, cumulative over all runs of
+                      the program: a latency histogram per stage and a
+                      counter per name, for node_exporter's textfile
+                      collector or any scraper
+The cumulative totals live in <program>.state.json and are updated under a
+file lock, so concurrent processes add up instead of overwriting.
+
+    python -m src.metrics DIR    per-stage latency percentiles from events.jsonl
+"""
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "KEYSTROKESENSE_METRICS"
+FLUSH_INTERVAL = 5.0
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "keystrokesense"
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    __slots__ = ("name", "start", "seconds")
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        if _recorder is not None:
+            _recorder.observe(self.name, self.seconds)
+        return False
+
+class Recorder:
+    """In-memory spans and counts of one process, flushed to the metrics directory."""
+
+    def __init__(self, directory, program):
+        self.directory = directory
+        self.program = program
+        self.events_path = os.path.join(directory, "events.jsonl")
+        self.prom_path = os.path.join(directory, f"{program}.prom")
+        self.state_path = os.path.join(directory, f"{program}.state.json")
+        self._lock = threading.Lock()
+        self._events = []
+        self._histograms = {}   # name -> [per-bucket counts..., +Inf count, sum]
+        self._counters = {}
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._events.append({"t": time.time(), "span": name, "ms": seconds * 1000})
+            h = self._histograms.get(name)
+            if h is None:
+                h = self._histograms[name] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+                    break
+            else:
+                h[len(BUCKETS)] += 1
+            h[-1] += seconds
+        self._maybe_flush()
+
+    def count(self, name, n):
+        with self._lock:
+            self._events.append({"t": time.time(), "count": name, "n": n})
+            self._counters[name] = self._counters.get(name, 0) + n
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, histograms, counters = self._events, self._histograms, self._counters
+            self._events, self._histograms, self._counters = [], {}, {}
+            self._last_flush = time.monotonic()
+        if not events:
+            return
+        pid = os.getpid()
+        lines = "".join(
+            json.dumps(dict(e, program=self.program, pid=pid), separators=(",", ":")) + "\n" for e in events
+        )
+        # One O_APPEND write per flush, so lines from concurrent processes do not interleave.
+        fd = os.open(self.events_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode("utf-8"))
+        finally:
+            os.close(fd)
+        from src.ingest import FileLock
+        with FileLock(self.state_path + ".lock"):
+            state = self._load_state()
+            for name, h in histograms.items():
+                total = state["histograms"].setdefault(name, [0] * (len(BUCKETS) + 1) + [0.0])
+                state["histograms"][name] = [a + b for a, b in zip(total, h)]
+            for name, n in counters.items():
+                state["counters"][name] = state["counters"].get(name, 0) + n
+            _write_atomic(self.state_path, json.dumps(state))
+            _write_atomic(self.prom_path, prometheus_text(state, self.program))
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, mode="r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("buckets") == list(BUCKETS):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"buckets": list(BUCKETS), "histograms": {}, "counters": {}}
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, mode="w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text(state, program):
+    """Cumulative state as Prometheus text exposition format."""
+    out = [
+        f"# HELP {PREFIX}_stage_seconds Time spent in each instrumented stage.",
+        f"# TYPE {PREFIX}_stage_seconds histogram"
+    ]
+    for name, h in sorted(state["histograms"].items()):
+        labels = f'program="{_label(program)}",stage="{_label(name)}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS, h):
+            cumulative += n
+            out.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        cumulative += h[len(BUCKETS)]
+        out.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+        out.append(f"{PREFIX}_stage_seconds_sum{{{labels}}} {h[-1]:.6f}")
+        out.append(f"{PREFIX}_stage_seconds_count{{{labels}}} {cumulative}")
+    out.append(f"# HELP {PREFIX}_events_total Number of times each counted event happened.")
+    out.append(f"# TYPE {PREFIX}_events_total counter")
+    for name, n in sorted(state["counters"].items()):
+        out.append(f'{PREFIX}_events_total{{program="{_label(program)}",name="{_label(name)}"}} {n}')
+    return "\n".join(out) + "\n"
+
+_recorder = None
+
+def enable(directory, program=None):
+    """Start recording to `directory`; `program` defaults to the running script's name."""
+    global _recorder
+    if _recorder is not None:
+        _recorder.flush()
+    if program is None:
+        program = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        if program in ("", "-", "-c"):
+            program = "python"
+    _recorder = Recorder(directory, program)
+    atexit.register(_recorder.flush)
+    return _recorder
+
+def disable():
+    global _recorder
+    if _recorder is not None:
+        _recorder.flush()
+    _recorder = None
+
+def enabled():
+    return _recorder is not None
+
+def span(name):
+    """Context manager timing the enclosed block as stage `name`."""
+    if _recorder is None:
+        return _NULL_SPAN
+    return Span(name)
+
+def record(name, seconds):
+    """Add a duration measured elsewhere to stage `name`."""
+    if _recorder is not None:
+        _recorder.observe(name, seconds)
+
+def count(name, n=1):
+    if _recorder is not None:
+        _recorder.count(name, n)
+
+def flush():
+    if _recorder is not None:
+        _recorder.flush()
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
+
+def summarize(directory):
+    """{stage: (count, p50, p90, p99, max) in ms} from the directory's events.jsonl."""
+    import numpy as np
+    spans = {}
+    with open(os.path.join(directory, "events.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if "span" in event:
+                spans.setdefault((event["program"], event["span"]), []).append(event["ms"])
+    return {
+        key: (len(ms), *np.percentile(ms, [50, 90, 99]).tolist(), max(ms))
+        for key, ms in sorted(spans.items())
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency percentiles from a metrics directory.")
+    parser.add_argument("directory", nargs="?", default=os.environ.get(ENV_VAR))
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error(f"give a metrics directory or set {ENV_VAR}")
+    print(f"{'program':<18} {'stage':<26} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for (program, stage), (n, p50, p90, p99, top) in summarize(args.directory).items():
+        print(f"{program:<18} {stage:<26} {n:7d} {p50:9.3f} {p90:9.3f} {p99:9.3f} {top:9.3f}")
+
+if __name__ == "__main__":
+    main()
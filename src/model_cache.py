@@ -0,0 +1,117 @@
+"""Per-process model cache that notices when train_model.py publishes a new model.
+
+The first `get()` loads the model: the registry's current version
+(memory-mapped, see model_registry.py), or before anything was published
+the legacy files (compiled .npz when current, else the joblib .pkl).
+Later calls only stat the registry pointer and model files, at most once
+every `check_interval` seconds. When they change, the new model is loaded
+on a background thread and swapped in with one assignment, so predictions
+keep using the old model until the new one is ready and are never blocked.
+"""
+import os
+import threading
+import time
+from src import metrics, model_registry
+from src.compiled_model import COMPILED_PATH, file_digest, load_predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.pkl")
+
+def _signature(paths):
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+class ModelCache:
+    def __init__(self, model_path=MODEL_PATH, compiled_path=COMPILED_PATH, check_interval=1.0,
+                 registry=model_registry.REGISTRY_DIR):
+        self.model_path = model_path
+        self.compiled_path = compiled_path
+        self.registry = registry
+        self.registry_version = None
+        self.check_interval = check_interval
+        self.model = None
+        self.version = 0
+        self.last_error = None
+        self._signature = None
+        self._digest = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def _paths(self):
+        return [model_registry.current_path(self.registry), self.model_path, self.compiled_path]
+
+    def _load(self):
+        signature = _signature(self._paths())
+        version = model_registry.current(self.registry)
+        if version is not None:
+            if self.model is None or version != self.registry_version:
+                with metrics.span("model.load"):
+                    model = model_registry.load(version, self.registry)
+                self.model, self.registry_version = model, version
+                self.version += 1
+            self._signature = signature
+            return
+        digest = file_digest(self.model_path) if os.path.exists(self.model_path) else None
+        if self.model is not None and self.registry_version is None and digest == self._digest \
+                and signature[2] == self._signature[2]:
+            # Touched or rewritten with the same contents.
+            self._signature = signature
+            return
+        with metrics.span("model.load"):
+            model = load_predictor(self.model_path, self.compiled_path)
+        self.model, self._signature, self._digest = model, signature, digest
+        self.registry_version = None
+        self.version += 1
+
+    def get(self):
+        """The current model; loads it on first use and schedules reloads when the files change."""
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    self._load()
+                    self._checked = time.monotonic()
+            return self.model
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            if _signature(self._paths()) != self._signature:
+                self._reload_in_background()
+        return self.model
+
+    def preload(self):
+        """Start loading on a background thread so a later `get()` finds the model warm."""
+        if self.model is None:
+            threading.Thread(target=self._safe_get, daemon=True).start()
+
+    def _safe_get(self):
+        try:
+            self.get()
+        except Exception as e:
+            self.last_error = e
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self):
+        try:
+            with self._lock:
+                self._load()
+            self.last_error = None
+        except Exception as e:
+            # Half-written or broken file: keep serving the old model and
+            # try again at the next check.
+            self.last_error = e
+        finally:
+            self._reloading = False
+
+shared = ModelCache()
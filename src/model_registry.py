@@ -0,0 +1,174 @@
+"""Versioned model registry with an atomic "current" pointer.
+
+    models/registry/
+        CURRENT              name of the live version, replaced atomically
+        v00001/
+            manifest.json    features (in order), labels, training data hash, metrics
+            model.pkl        the fitted sklearn pipeline (joblib, uncompressed)
+            arrays/*.npy     the compiled model in its scoring layout
+
+Publishing builds a version in a temporary directory, renames it into
+place and only then swaps CURRENT, so a reader sees either the old or the
+new model, never a mix. Versions are never rewritten.
+
+load() memory-maps the .npy arrays read-only and scores straight from the
+mapping (CompiledModel.runtime_arrays() saves them already converted), so
+every process using a version shares one page-cache copy: loading costs
+a few file opens instead of unpickling, and per-process RSS no longer grows
+with the number of trees. Models that cannot be compiled are loaded from
+model.pkl with joblib's mmap_mode.
+
+    python -m src.model_registry                list versions
+    python -m src.model_registry --use v00003   roll back (or forward)
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import numpy as np
+from src.compiled_model import COMPILED_PATH, CompiledModel, compile_model, file_digest, load_predictor
+
+REGISTRY_DIR = os.path.join(os.path.dirname(__file__), "..", "models", "registry")
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.pkl")
+# Old versions beyond this many are deleted on publish (never the current one).
+KEEP_VERSIONS = 10
+MMAP_MIN_BYTES = 4096
+_VERSION = re.compile(r"^v\d{5}$")
+
+def current_path(registry=REGISTRY_DIR):
+    return os.path.join(registry, "CURRENT")
+
+def current(registry=REGISTRY_DIR):
+    """Name of the live version, or None when nothing has been published."""
+    try:
+        with open(current_path(registry), mode="r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def versions(registry=REGISTRY_DIR):
+    if not os.path.isdir(registry):
+        return []
+    return sorted(v for v in os.listdir(registry) if _VERSION.match(v))
+
+def manifest(version=None, registry=REGISTRY_DIR):
+    version = version or current(registry)
+    with open(os.path.join(registry, version, "manifest.json"), mode="r", encoding="utf-8") as f:
+        return json.load(f)
+
+def set_current(version, registry=REGISTRY_DIR):
+    """Point CURRENT at `version`; running ModelCaches pick it up at their next check."""
+    if not os.path.isfile(os.path.join(registry, version, "manifest.json")):
+        raise ValueError(f"No model version {version} in {registry}")
+    tmp = f"{current_path(registry)}.{os.getpid()}.tmp"
+    with open(tmp, mode="w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, current_path(registry))
+
+def data_digest(path):
+    """SHA-1 of a training dataset: a file, or a directory of part files (Parquet)."""
+    if not os.path.isdir(path):
+        return file_digest(path)
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(path)):
+        part = os.path.join(path, name)
+        if name.endswith(".tmp") or not os.path.isfile(part):
+            continue
+        digest.update(name.encode("utf-8") + b"\0")
+        with open(part, mode="rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def publish(model, feature_names, labels=None, data_path=None, metrics=None,
+            registry=REGISTRY_DIR, keep=KEEP_VERSIONS):
+    """Save `model` as a new version and make it current; returns the version name."""
+    import joblib
+    from src.ingest import FileLock
+    os.makedirs(registry, exist_ok=True)
+    with FileLock(os.path.join(registry, ".lock")):
+        existing = versions(registry)
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1:05d}"
+        tmp = os.path.join(registry, f".{version}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(os.path.join(tmp, "arrays"))
+        pkl = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, pkl)
+        try:
+            compiled = CompiledModel(compile_model(model, feature_names=feature_names, source_path=pkl))
+            for name, array in compiled.runtime_arrays().items():
+                np.save(os.path.join(tmp, "arrays", f"{name}.npy"), array)
+            kind = compiled.kind
+        except ValueError:
+            kind = None
+        classes = getattr(model, "classes_", [])
+        info = {
+            "version": version,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "model_type": type(model.steps[-1][1] if hasattr(model, "steps") else model).__name__,
+            "compiled": kind,
+            "feature_names": list(feature_names),
+            "classes": [c.item() if hasattr(c, "item") else c for c in classes],
+            "labels": {str(k): v for k, v in (labels or {}).items()},
+            "model_sha1": file_digest(pkl),
+            "training_data": os.path.basename(os.path.normpath(data_path)) if data_path else None,
+            "training_data_sha1": data_digest(data_path) if data_path else None,
+            "metrics": metrics or {}
+        }
+        with open(os.path.join(tmp, "manifest.json"), mode="w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2, default=float)
+        os.rename(tmp, os.path.join(registry, version))
+        set_current(version, registry)
+        live = current(registry)
+        for old in versions(registry)[:-keep]:
+            if old != live:
+                shutil.rmtree(os.path.join(registry, old), ignore_errors=True)
+    return version
+
+def load(version=None, registry=REGISTRY_DIR):
+    """Predictor for `version` (default: current), memory-mapped read-only."""
+    version = version or current(registry)
+    if version is None:
+        raise FileNotFoundError(f"No model published to {registry}")
+    path = os.path.join(registry, version)
+    arrays_dir = os.path.join(path, "arrays")
+    names = [n for n in os.listdir(arrays_dir) if n.endswith(".npy")] if os.path.isdir(arrays_dir) else []
+    if names:
+        arrays = {}
+        for n in names:
+            file = os.path.join(arrays_dir, n)
+            # Arrays under a page (meta, scalars) are cheaper to read than to map.
+            arrays[n[:-4]] = np.load(file, mmap_mode="r" if os.path.getsize(file) > MMAP_MIN_BYTES else None)
+        return CompiledModel(arrays)
+    import joblib
+    return joblib.load(os.path.join(path, "model.pkl"), mmap_mode="r")
+
+def load_live(model_path=MODEL_PATH, compiled_path=COMPILED_PATH, registry=REGISTRY_DIR):
+    """The current registry model, or (before anything is published) the legacy model files."""
+    if current(registry) is not None:
+        return load(registry=registry)
+    return load_predictor(model_path, compiled_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="List model versions or switch the current one.")
+    parser.add_argument("--use", metavar="VERSION", help="make VERSION the current model")
+    args = parser.parse_args()
+    if args.use:
+        set_current(args.use)
+        print(f"✅ Current model: {args.use}")
+    live = current()
+    if not versions():
+        print(f"No models published to {REGISTRY_DIR}; train one with python -m src.train_model")
+        return
+    print(f"  {'version':<8} {'created':<20} {'model':<24} {'compiled':<9} {'accuracy':>8}  data")
+    for version in versions():
+        m = manifest(version)
+        acc = m["metrics"].get("accuracy")
+        print(f"{'*' if version == live else ' '} {version:<8} {m['created']:<20} {m['model_type']:<24} "
+              f"{m['compiled'] or '-':<9} {'-' if acc is None else f'{acc:.3f}':>8}  "
+              f"{m['training_data'] or '-'} {(m['training_data_sha1'] or '')[:10]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Stratified k-fold model search used by `train_model.py --search`.
+
+Every candidate (model type + hyperparameters) is scored on the same
+folds. Folds run in rounds: round k fits fold k of every candidate still in
+the race, in parallel on a process pool. After each round, candidates
+whose mean accuracy so far trails the leader by more than `abandon_margin`
+are dropped. The workers are joblib (loky) processes, which do not re-run
+the unguarded train_model.py script.
+
+When the wall-clock budget runs out, the fits still running are stopped.
+Candidates that finished the current fold keep that score; the others are
+marked out_of_budget. The search then ranks what it has.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+REPORT_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "model_search_report.csv")
+
+MODELS = {
+    "random_forest": lambda: RandomForestClassifier(random_state=42, n_jobs=1),
+    "logistic_regression": lambda: Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", LogisticRegression(max_iter=1000))
+    ]),
+    "hist_gradient_boosting": lambda: HistGradientBoostingClassifier(random_state=42)
+}
+DEFAULT_GRID = {
+    "random_forest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [None, 6, 12],
+        "min_samples_leaf": [1, 3]
+    },
+    "logistic_regression": {
+        "clf__C": [0.1, 1.0, 10.0]
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": [0.05, 0.1],
+        "max_depth": [None, 4],
+        "max_iter": [100, 200]
+    }
+}
+
+def candidates(grid):
+    """(name, params) for every combination in `grid` ({model: {param: [values]}})."""
+    for name, params in grid.items():
+        if name not in MODELS:
+            raise ValueError(f"Unknown model {name!r}; expected one of {list(MODELS)}")
+        keys = sorted(params)
+        for values in itertools.product(*(params[k] for k in keys)):
+            yield name, dict(zip(keys, values))
+
+def build(name, params):
+    return MODELS[name]().set_params(**params)
+
+def load_grid(path):
+    """Grid from a JSON file; models it does not mention are left out of the search."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _fit_fold(index, name, params, X, y, train, test):
+    model = build(name, params)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    acc = float(np.mean(model.predict(X[test]) == y[test]))
+    return index, acc, fit_sec, time.perf_counter() - start
+
+def search(X, y, grid=None, folds=5, jobs=None, budget=None, abandon_margin=0.10, min_folds=2, log=print):
+    """Cross-validate every candidate; returns the report as a DataFrame, best first."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    smallest_class = np.unique(y, return_counts=True)[1].min()
+    if folds > smallest_class:
+        log(f"⚠️ Only {smallest_class} sessions in the rarest class; using {smallest_class} folds instead of {folds}.")
+        folds = int(smallest_class)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X, y))
+    grid = DEFAULT_GRID if grid is None else grid
+    rows = [
+        {"model": name, "params": params, "scores": [], "fit_sec": [], "predict_sec": [], "status": "complete"}
+        for name, params in candidates(grid)
+    ]
+    jobs = jobs or os.cpu_count() or 1
+    started = time.perf_counter()
+    for k, (train, test) in enumerate(splits):
+        alive = [i for i, r in enumerate(rows) if r["status"] == "complete"]
+        remaining = None if budget is None else max(0.01, budget - (time.perf_counter() - started))
+        parallel = Parallel(n_jobs=jobs, return_as="generator_unordered", timeout=remaining)
+        try:
+            for i, acc, fit_sec, predict_sec in parallel(
+                delayed(_fit_fold)(i, rows[i]["model"], rows[i]["params"], X, y, train, test) for i in alive
+            ):
+                rows[i]["scores"].append(acc)
+                rows[i]["fit_sec"].append(fit_sec)
+                rows[i]["predict_sec"].append(predict_sec)
+                # joblib's timeout is per task; the budget is for the whole search.
+                if budget is not None and time.perf_counter() - started > budget:
+                    raise TimeoutError
+        except (TimeoutError, multiprocessing.TimeoutError):
+            for i in alive:
+                if len(rows[i]["scores"]) <= k:
+                    rows[i]["status"] = "out_of_budget"
+            log(f"⏱️ Budget of {budget}s spent during fold {k + 1} of {folds}.")
+            break
+        if k + 1 >= min_folds and k + 1 < folds:
+            leader = max(np.mean(rows[i]["scores"]) for i in alive)
+            dropped = [i for i in alive if np.mean(rows[i]["scores"]) < leader - abandon_margin]
+            for i in dropped:
+                rows[i]["status"] = "abandoned"
+            log(f"Fold {k + 1}/{folds}: {len(alive)} candidates, best mean {leader:.3f}, abandoned {len(dropped)}")
+        else:
+            log(f"Fold {k + 1}/{folds}: {len(alive)} candidates")
+
+    report = pd.DataFrame([{
+        "model": r["model"],
+        "params": json.dumps(r["params"], sort_keys=True),
+        "status": r["status"],
+        "folds": len(r["scores"]),
+        "mean_accuracy": round(float(np.mean(r["scores"])), 4) if r["scores"] else np.nan,
+        "std_accuracy": round(float(np.std(r["scores"])), 4) if r["scores"] else np.nan,
+        "mean_fit_sec": round(float(np.mean(r["fit_sec"])), 4) if r["fit_sec"] else np.nan,
+        "mean_predict_sec": round(float(np.mean(r["predict_sec"])), 5) if r["predict_sec"] else np.nan,
+        "total_sec": round(float(np.sum(r["fit_sec"]) + np.sum(r["predict_sec"])), 3)
+    } for r in rows])
+    # Candidates scored on more folds rank first; ties go to the faster model.
+    report = report.sort_values(
+        ["folds", "mean_accuracy", "mean_fit_sec"], ascending=[False, False, True]
+    ).reset_index(drop=True)
+    report.insert(0, "rank", range(1, len(report) + 1))
+    return report
+
+def best_model(report, X, y):
+    """Refit the top-ranked candidate on all the data."""
+    top = report.iloc[0]
+    if top["folds"] == 0:
+        raise RuntimeError("No candidate finished a single fold within the budget; raise --budget.")
+    model = build(top["model"], json.loads(top["params"]))
+    return model.fit(X, y)
@@ -0,0 +1,136 @@
+"""Pick the stress model by accuracy *and* by what it costs to ship.
+
+For every candidate, profile() measures what the apps pay for it:
+  * artifact size: the joblib pipeline, and the compiled .npz when the
+    model can be compiled;
+  * load time of each;
+  * single-row predict latency (p50/p99) on the path the apps use, which
+    is the compiled model when there is one, otherwise sklearn with a
+    one-row DataFrame;
+  * batch throughput in rows/s.
+
+Forest candidates come from prune_forest(): the first n trees of a fitted
+forest are exactly the forest sklearn would have grown with n_estimators=n
+and the same random_state, so fewer trees cost no refit. Depth limits do
+need one fit per depth.
+
+select() then returns the most accurate candidate within the latency,
+size and load-time budgets (ties go to the faster one). When nothing fits,
+it returns the fastest candidate and says so.
+"""
+import copy
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from src.compiled_model import CompiledModel, export_model, model_input
+
+REPORT_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "model_selection_report.csv")
+BATCH_ROWS = 10_000
+
+def logistic_pipeline(max_iter=300):
+    """Scaler and classifier in one artifact, so the scaler can never be left behind."""
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", LogisticRegression(max_iter=max_iter))
+    ])
+
+def forest_pipeline(forest):
+    return Pipeline([("clf", forest)])
+
+def prune_forest(forest, n_trees):
+    """A fitted forest keeping only its first `n_trees` trees (no refit)."""
+    pruned = copy.copy(forest)
+    pruned.estimators_ = forest.estimators_[:n_trees]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+def forest_candidates(X, y, n_estimators=200, trees=(10, 25, 50, 100), depths=(None, 8, 4), random_state=42):
+    """(name, fitted pipeline) for every depth limit x tree count."""
+    out = []
+    for depth in depths:
+        full = RandomForestClassifier(n_estimators=n_estimators, max_depth=depth, random_state=random_state)
+        full.fit(X, y)
+        for n in sorted({t for t in trees if t < n_estimators} | {n_estimators}, reverse=True):
+            name = f"random_forest_{n}{'' if depth is None else f'_depth{depth}'}"
+            out.append((name, forest_pipeline(prune_forest(full, n))))
+    return out
+
+def _timings(fn, min_sec=0.2, max_calls=2000, min_calls=5):
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_calls or (len(times) < max_calls and time.perf_counter() - start < min_sec):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return np.array(times)
+
+def profile(model, X_sample, feature_names):
+    """Size, load time and latency of a fitted model as the apps would use it."""
+    import joblib
+    row = dict(zip(feature_names, np.asarray(X_sample, dtype=np.float64)[0].tolist()))
+    batch = pd.DataFrame(np.resize(np.asarray(X_sample, dtype=np.float64), (BATCH_ROWS, len(feature_names))),
+                         columns=feature_names)
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, pkl)
+        out["size_kb"] = os.path.getsize(pkl) / 1024
+        out["load_ms"] = _timings(lambda: joblib.load(pkl), min_sec=0.1, max_calls=20).min() * 1000
+        try:
+            npz = export_model(model, os.path.join(tmp, "model.npz"), feature_names=feature_names, source_path=pkl)
+            out["compiled_kb"] = os.path.getsize(npz) / 1024
+            out["compiled_load_ms"] = _timings(lambda: CompiledModel.load(npz), min_sec=0.1, max_calls=50).min() * 1000
+            served = CompiledModel.load(npz)
+        except ValueError:
+            out["compiled_kb"] = out["compiled_load_ms"] = np.nan
+            served = model
+    out["served_by"] = "compiled" if isinstance(served, CompiledModel) else "sklearn"
+    row_times = _timings(lambda: served.predict(model_input(served, [row], feature_names))) * 1e6
+    out["row_p50_us"], out["row_p99_us"] = np.percentile(row_times, [50, 99])
+    batch_sec = _timings(lambda: served.predict_proba(batch), min_sec=0.2, max_calls=20, min_calls=2).min()
+    out["batch_rows_per_sec"] = BATCH_ROWS / batch_sec
+    return out
+
+def evaluate(candidates, X_test, y_test, feature_names, accuracy=None, log=print):
+    """Report (DataFrame) of accuracy and profile() for every (name, fitted model).
+
+    `accuracy`, if given, holds scores measured elsewhere (e.g. cross-validated)
+    to report instead of the accuracy on X_test.
+    """
+    rows = []
+    for i, (name, model) in enumerate(candidates):
+        if accuracy is None:
+            acc = float(np.mean(np.asarray(model.predict(X_test)) == np.asarray(y_test)))
+        else:
+            acc = float(accuracy[i])
+        rows.append({"candidate": name, "accuracy": round(acc, 4), **profile(model, X_test, feature_names)})
+        r = rows[-1]
+        log(f"  {name:<28} acc {acc:.3f}  {r['size_kb']:8.1f} KB  load {r['load_ms']:6.1f} ms  "
+            f"row p99 {r['row_p99_us']:8.1f} us ({r['served_by']})")
+    return pd.DataFrame(rows)
+
+def select(report, max_latency_ms=None, max_size_kb=None, max_load_ms=None):
+    """Index of the chosen row in `report` and whether it is within budget.
+
+    The load budget applies to the artifact the apps load (compiled when
+    available), the size budget to the joblib pipeline.
+    """
+    load_ms = report["compiled_load_ms"].where(report["served_by"] == "compiled", report["load_ms"])
+    fits = pd.Series(True, index=report.index)
+    if max_latency_ms is not None:
+        fits &= report["row_p99_us"] <= max_latency_ms * 1000
+    if max_size_kb is not None:
+        fits &= report["size_kb"] <= max_size_kb
+    if max_load_ms is not None:
+        fits &= load_ms <= max_load_ms
+    report["within_budget"] = fits
+    if fits.any():
+        pool = report[fits].sort_values(["accuracy", "row_p99_us", "size_kb"], ascending=[False, True, True])
+        return pool.index[0], True
+    return report.sort_values(["row_p99_us", "accuracy"], ascending=[True, False]).index[0], False
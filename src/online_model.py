@@ -0,0 +1,146 @@
+"""Online stress model that folds in newly logged sessions without a full retrain.
+
+The model is a StandardScaler + SGDClassifier (logistic loss) pipeline;
+both support `partial_fit`, so an update costs time proportional to the new
+sessions only: the scaler's running mean/variance absorb the new rows, then
+the classifier takes a few passes over them. The raw file offset reached so
+far is kept with the model, exactly like feature_engineering.py's
+incremental mode, and every update is saved as a new version under
+models/online/ with a line in history.jsonl.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from src import model_registry
+from src.compiled_model import COMPILED_PATH, export_model
+from src.feature_engineering import DATA_FILE, _tail_digest, build_features
+from src.predict_stress import FEATURES, LABELS, MODEL_PATH
+from src.session_store import SessionStore
+
+ONLINE_DIR = os.path.join(os.path.dirname(__file__), "..", "models", "online")
+HISTORY_FILE = os.path.join(ONLINE_DIR, "history.jsonl")
+CLASSES = np.array([0, 1, 2])
+LABEL = "self_stress_level"
+
+def new_model(seed=42):
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", SGDClassifier(loss="log_loss", alpha=1e-3, random_state=seed))
+    ])
+
+def labeled_xy(df):
+    """Model inputs and labels for the sessions in `df` that carry a stress label."""
+    df = df[df[LABEL].notna()]
+    if df.empty:
+        return np.empty((0, len(FEATURES))), np.empty(0, dtype=int)
+    X = build_features(df.copy())[FEATURES].astype("float64").to_numpy()
+    X[~np.isfinite(X)] = 0.0
+    return X, df[LABEL].astype(int).to_numpy()
+
+def partial_update(model, X, y, epochs=5, seed=0):
+    """Fold (X, y) into `model` in place: update the running scaler stats, then SGD passes."""
+    scaler = model.named_steps["scaler"]
+    clf = model.named_steps["clf"]
+    scaler.partial_fit(X)
+    Xs = scaler.transform(X)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        clf.partial_fit(Xs[order], y[order], classes=CLASSES)
+    return model
+
+def _version_path(version):
+    return os.path.join(ONLINE_DIR, f"stress_online_v{version:05d}.pkl")
+
+def load_latest():
+    """Most recent saved update ({"model", "version", "raw_offset", ...}) or None."""
+    versions = sorted(glob.glob(os.path.join(ONLINE_DIR, "stress_online_v*.pkl")))
+    return joblib.load(versions[-1]) if versions else None
+
+def _save(state, keep):
+    os.makedirs(ONLINE_DIR, exist_ok=True)
+    path = _version_path(state["version"])
+    joblib.dump(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    record = {k: v for k, v in state.items() if k != "model"}
+    with open(HISTORY_FILE, mode="a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    for old in sorted(glob.glob(os.path.join(ONLINE_DIR, "stress_online_v*.pkl")))[:-keep]:
+        os.remove(old)
+
+def _stale(state):
+    """True if the raw file was rewritten (not appended) since `state` was saved."""
+    offset = state["raw_offset"]
+    return os.path.getsize(DATA_FILE) < offset or _tail_digest(offset) != state["raw_digest"]
+
+def publish(model, state=None):
+    """Make `model` the one live_predict, tk_ui and the prediction server use."""
+    version = model_registry.publish(
+        model, FEATURES, labels=LABELS, data_path=DATA_FILE,
+        metrics={"online_version": state["version"], "rows": state["rows"]} if state else None
+    )
+    joblib.dump(model, MODEL_PATH + ".tmp")
+    os.replace(MODEL_PATH + ".tmp", MODEL_PATH)
+    export_model(model, COMPILED_PATH, feature_names=FEATURES, source_path=MODEL_PATH)
+    return version
+
+def update(epochs=5, keep=10, do_publish=False):
+    """Fold sessions logged since the last update into the online model.
+
+    Starts from scratch when there is no saved model or the raw file was
+    rewritten. Returns the new state, or the previous one if nothing new
+    was labeled.
+    """
+    state = load_latest()
+    if state is not None and _stale(state):
+        print("⚠️ raw_sessions.csv was rewritten; rebuilding the online model from scratch.")
+        state = None
+    if state is None:
+        state = {"model": new_model(), "version": 0, "raw_offset": 0, "rows": 0}
+    raw = SessionStore(DATA_FILE)
+    df, offset = raw.read_tail(state["raw_offset"])
+    X, y = labeled_xy(df)
+    if len(y) == 0:
+        if do_publish and state["version"] > 0:
+            publish(state["model"], state)
+        return state
+    partial_update(state["model"], X, y, epochs=epochs, seed=state["version"])
+    state = {
+        "model": state["model"],
+        "version": state["version"] + 1,
+        "raw_offset": offset,
+        "raw_digest": _tail_digest(offset),
+        "rows": state["rows"] + len(y),
+        "added": len(y),
+        "updated": datetime.datetime.now().isoformat(timespec="seconds")
+    }
+    _save(state, keep)
+    if do_publish:
+        publish(state["model"], state)
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold newly logged sessions into the online stress model.")
+    parser.add_argument("--epochs", type=int, default=5, help="SGD passes over each batch of new sessions")
+    parser.add_argument("--keep", type=int, default=10, help="saved versions to keep")
+    parser.add_argument("--publish", action="store_true",
+                        help="also publish the updated model to the registry and models/stress_model.pkl")
+    args = parser.parse_args()
+    before = load_latest()
+    state = update(epochs=args.epochs, keep=args.keep, do_publish=args.publish)
+    if state["version"] == (before["version"] if before is not None else 0):
+        print(f"No new labeled sessions; online model stays at v{state['version']}.")
+    else:
+        print(f"✅ Online model v{state['version']}: +{state['added']} sessions ({state['rows']} total)")
+    if args.publish and state["version"] > 0:
+        print(f"✅ Published as model {model_registry.current()} and to: {MODEL_PATH}")
+
+if __name__ == "__main__":
+    main()
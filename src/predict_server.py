@@ -0,0 +1,327 @@
+"""Long-lived local prediction service that keeps the stress model warm.
+
+Clients send one JSON line per request over a Unix socket (localhost TCP
+where Unix sockets are unavailable) and get one JSON line back:
+
+    {"rows": [{"chars_per_sec": ..., ...}, ...]}  ->  {"labels": [...], "stress": [...], "proba": [[...]]}
+    {"cmd": "stats"}                                ->  queue depth, batch sizes, latency percentiles
+
+Requests arriving within `window_ms` of each other are scored together as
+one micro-batch. live_predict.py and tk_ui.py call `remote_predict()`, which
+returns None when no server is running so they can load the model themselves.
+"""
+import argparse
+import collections
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from src.features import FEATURES, LABELS
+from src.compiled_model import model_features
+from src.model_cache import ModelCache
+
+SOCKET_PATH = os.environ.get(
+    "KEYSTROKESENSE_SOCKET", os.path.join(tempfile.gettempdir(), "keystrokesense-predict.sock")
+)
+DEFAULT_PORT = 8765
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX") and hasattr(socketserver, "ThreadingUnixStreamServer")
+
+def default_address():
+    return SOCKET_PATH if HAS_UNIX_SOCKETS else ("127.0.0.1", DEFAULT_PORT)
+
+def _feature_rows(rows, names=FEATURES):
+    """Validate request rows (dicts by feature name or lists in `names` order) into lists of floats."""
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("'rows' must be a non-empty list")
+    out = []
+    for row in rows:
+        if isinstance(row, dict):
+            missing = [f for f in names if f not in row]
+            if missing:
+                raise ValueError(f"Row is missing features: {missing}")
+            row = [row[f] for f in names]
+        if len(row) != len(names):
+            raise ValueError(f"Rows need {len(names)} features, got {len(row)}")
+        out.append([float(v) for v in row])
+    return out
+
+class _Request:
+    __slots__ = ("rows", "arrived", "done", "result")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.arrived = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+
+class MicroBatcher:
+    """Scores queued requests in batches on one thread.
+
+    The first queued request opens a batch; everything that arrives within
+    `window_ms` of it (up to `max_batch` rows) is scored with it in one
+    predict_proba call. A lone request is scored without waiting.
+    `model` may be a ModelCache, in which case retrained models are picked
+    up between batches.
+    """
+
+    def __init__(self, model, window_ms=2.0, max_batch=256, history=10_000):
+        self.model = model
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self._latencies = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._requests = 0
+        self._rows = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._max_depth = 0
+        self._waiting = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._stop = threading.Event()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def submit(self, rows, timeout=None):
+        """Queue rows for scoring and wait for their labels and probabilities."""
+        request = _Request(rows)
+        with self._lock:
+            self._waiting += 1
+        try:
+            self.queue.put(request)
+            depth = self.queue.qsize()
+            if depth > self._max_depth:
+                self._max_depth = depth
+            if not request.done.wait(timeout):
+                raise TimeoutError("Prediction timed out")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        return request.result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = [first]
+            n = len(first.rows)
+            deadline = first.arrived + self.window
+            # Stop waiting early once every client that is waiting is in the batch.
+            while n < self.max_batch and len(batch) < self._waiting:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                n += len(request.rows)
+            self._score(batch, n)
+
+    def _score(self, batch, n):
+        X = np.array([row for request in batch for row in request.rows], dtype=np.float64)
+        try:
+            model = self.model.get() if isinstance(self.model, ModelCache) else self.model
+            proba = model.predict_proba(X)
+        except Exception as e:
+            for request in batch:
+                request.result = {"error": str(e)}
+                request.done.set()
+            return
+        classes = [c.item() if hasattr(c, "item") else c for c in model.classes_]
+        labels = [classes[i] for i in proba.argmax(axis=1)]
+        start = 0
+        now = time.perf_counter()
+        for request in batch:
+            stop = start + len(request.rows)
+            request.result = {
+                "labels": labels[start:stop],
+                "stress": [LABELS.get(label, "Unknown") for label in labels[start:stop]],
+                "proba": proba[start:stop].round(6).tolist(),
+                "classes": classes
+            }
+            start = stop
+            request.done.set()
+        with self._lock:
+            self._requests += len(batch)
+            self._rows += n
+            self._batches += 1
+            self._max_batch_seen = max(self._max_batch_seen, n)
+            self._latencies.extend(now - request.arrived for request in batch)
+
+    def feature_names(self):
+        """Inputs of the model currently served (FEATURES, plus Z_FEATURES for user-relative models)."""
+        model = self.model.get() if isinstance(self.model, ModelCache) else self.model
+        return model_features(model, FEATURES)
+
+    def stats(self):
+        with self._lock:
+            lat = np.array(self._latencies) * 1000
+            return {
+                "uptime_sec": round(time.time() - self._started, 1),
+                "model_version": self.model.version if isinstance(self.model, ModelCache) else 1,
+                "requests": self._requests,
+                "rows": self._rows,
+                "batches": self._batches,
+                "mean_batch_rows": round(self._rows / self._batches, 2) if self._batches else 0.0,
+                "max_batch_rows": self._max_batch_seen,
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self._max_depth,
+                "latency_ms": {
+                    "p50": round(float(np.percentile(lat, 50)), 3),
+                    "p95": round(float(np.percentile(lat, 95)), 3),
+                    "p99": round(float(np.percentile(lat, 99)), 3),
+                    "max": round(float(lat.max()), 3)
+                } if len(lat) else None
+            }
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One connection may carry many requests, one JSON line each.
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                if message.get("cmd") == "stats":
+                    reply = self.server.batcher.stats()
+                elif message.get("cmd") == "ping":
+                    reply = {"ok": True}
+                else:
+                    rows = _feature_rows(message.get("rows"), self.server.batcher.feature_names())
+                    reply = self.server.batcher.submit(rows, timeout=30)
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+if HAS_UNIX_SOCKETS:
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+def make_server(model, address=None, window_ms=2.0, max_batch=256):
+    """Bind a server on `address` (socket path or (host, port)) around a started MicroBatcher."""
+    address = address or default_address()
+    if isinstance(address, str):
+        if is_running(address):
+            raise RuntimeError(f"A prediction server is already listening on {address}")
+        if os.path.exists(address):
+            # Left behind by a server that did not shut down cleanly.
+            os.remove(address)
+        server = _UnixServer(address, _Handler)
+    else:
+        server = _TcpServer(address, _Handler)
+    server.batcher = MicroBatcher(model, window_ms=window_ms, max_batch=max_batch).start()
+    return server
+
+# ---------- CLIENT ----------
+
+def _connect(address, timeout):
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def request(message, address=None, timeout=2.0):
+    """Send one JSON message and return the decoded reply; raises OSError if no server answers."""
+    address = address or default_address()
+    with _connect(address, timeout) as sock:
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Prediction server closed the connection")
+    reply = json.loads(line)
+    if "error" in reply:
+        raise ValueError(reply["error"])
+    return reply
+
+def is_running(address=None, timeout=0.5):
+    try:
+        return request({"cmd": "ping"}, address, timeout).get("ok", False)
+    except (OSError, ValueError):
+        return False
+
+def remote_predict(rows, address=None, timeout=2.0):
+    """Labels for `rows` from a running server, or None if none is reachable."""
+    address = address or default_address()
+    if isinstance(address, str) and not os.path.exists(address):
+        return None
+    try:
+        return request({"rows": rows}, address, timeout)["labels"]
+    except (OSError, ValueError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stress predictions from a warm model.")
+    parser.add_argument("--socket", help=f"Unix socket path (default: {SOCKET_PATH})")
+    parser.add_argument("--port", type=int, help="listen on 127.0.0.1:PORT instead of a Unix socket")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="micro-batch collection window")
+    parser.add_argument("--max-batch", type=int, default=256, help="max rows per micro-batch")
+    parser.add_argument("--stats-interval", type=float, default=60.0, help="seconds between stats lines (0 = off)")
+    parser.add_argument("--stats", action="store_true", help="print a running server's stats and exit")
+    args = parser.parse_args()
+    address = ("127.0.0.1", args.port) if args.port else (args.socket or default_address())
+
+    if args.stats:
+        try:
+            print(json.dumps(request({"cmd": "stats"}, address), indent=2))
+        except OSError:
+            sys.exit(f"No prediction server on {address}")
+        return
+
+    model = ModelCache()
+    model.get()
+    server = make_server(model, address, window_ms=args.window_ms, max_batch=args.max_batch)
+    print(f"✅ Serving {type(model.model).__name__} on {address} (window {args.window_ms} ms)", file=sys.stderr)
+
+    def report():
+        while True:
+            time.sleep(args.stats_interval)
+            print(json.dumps(server.batcher.stats()), file=sys.stderr)
+    if args.stats_interval > 0:
+        threading.Thread(target=report, daemon=True).start()
+    # Clean shutdown (socket file removed) on `kill` as well as Ctrl+C.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
-import joblib
-import pandas as pd
+import argparse
+import collections
+import json
+import multiprocessing as mp
+import sys
 import os
+from src.compiled_model import model_features, model_input
+from src.features import FEATURES, LABELS, batch_session_features
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.pkl")
-model = joblib.load(MODEL_PATH)
+model = None
+history = None
+def load_model():
+    """Load the model once per process (memory-mapped from the registry, so workers share it)."""
+    global model
+    if model is None:
+        from src import model_registry
+        model = model_registry.load_live(MODEL_PATH)
+    return model
 def predict_stress():
     print("\n=== Stress Prediction Using Typing Behavior ===")
     chars_per_sec = float(input("Enter chars per second: "))
@@ -11,20 +24,127 @@ def predict_stress():
     word_mistake_rate = float(input("Enter word mistake rate: "))
     accuracy_percent = float(input("Enter accuracy percent: "))
     sleep_hours = float(input("Enter sleep hours: "))
-    user_data = pd.DataFrame([{
+    user_id = input("Enter user id (optional, for user-relative models): ").strip()
+    user_data = [{
         "chars_per_sec": chars_per_sec,
         "mistakes_per_char": mistakes_per_char,
         "difficulty_score": difficulty_score,
         "word_mistake_rate": word_mistake_rate,
         "accuracy_percent": accuracy_percent,
         "sleep_hours": sleep_hours
-    }])
-    prediction = model.predict(user_data)[0]
-    labels = {
-        0: "Calm",
-        1: "Normal",
-        2: "Stressed"
-    }
-    print(f"\n🧠 Predicted Stress Level: {labels[prediction]}\n")
+    }]
+    from src.user_profiles import ProfileStore
+    user_data[0].update(ProfileStore().z_scores(user_id, user_data[0]))
+    m = load_model()
+    prediction = m.predict(model_input(m, user_data, model_features(m, FEATURES)))[0]
+    print(f"\n🧠 Predicted Stress Level: {LABELS[prediction]}\n")
+
+# ---------- BATCH SCORING ----------
+
+def session_features(chunk):
+    """The six model features for a chunk of sessions.
+
+    Chunks that already carry the feature columns are used as-is; raw
+    sessions (reference_text, typed_text, time_taken_sec, sleep_hours) get
+    the same features live_predict.py computes for a single session.
+    """
+    if all(f in chunk for f in FEATURES):
+        return chunk[FEATURES].fillna(0).astype("float64").reset_index(drop=True)
+    sleep = chunk["sleep_hours"] if "sleep_hours" in chunk else None
+    return batch_session_features(
+        chunk["reference_text"], chunk["typed_text"], chunk["time_taken_sec"], sleep
+    )[FEATURES].astype("float64")
+
+def load_history():
+    """Z-scores of the logged sessions, read once per process."""
+    global history
+    if history is None:
+        from src.user_profiles import logged_history
+        history = logged_history()
+    return history
+
+def with_user_relative(X, chunk):
+    """Add the Z_FEATURES against each session's user baseline (zeros without a user_id).
+
+    Sessions already in raw_sessions.csv are scored against the user's
+    sessions before them, as in training; new ones against the current store.
+    """
+    import numpy as np
+    from src.user_profiles import PROFILE_FEATURES, Z_FEATURES, ProfileStore, logged_z_scores
+    users = chunk["user_id"].astype(str).tolist() if "user_id" in chunk else [""] * len(X)
+    z = ProfileStore().batch_z_scores(users, X[PROFILE_FEATURES].to_numpy())
+    if "session_id" in chunk:
+        past = logged_z_scores(load_history(), users, chunk["session_id"])
+        logged = ~np.isnan(past).any(axis=1)
+        z[logged] = past[logged]
+    X = X.copy()
+    X[Z_FEATURES] = z
+    return X
+
+def score_chunk(chunk):
+    """Predicted label and class probabilities for one chunk of sessions."""
+    import pandas as pd
+    m = load_model()
+    X = session_features(chunk)
+    names = model_features(m, FEATURES)
+    if names != FEATURES:
+        X = with_user_relative(X, chunk)[names]
+    proba = m.predict_proba(X)
+    pred = m.classes_[proba.argmax(axis=1)]
+    out = pd.DataFrame({"predicted_level": pred, "predicted_stress": [LABELS.get(p, "Unknown") for p in pred]})
+    for i, cls in enumerate(m.classes_):
+        out[f"prob_{LABELS.get(cls, cls).lower()}"] = proba[:, i]
+    if "session_id" in chunk:
+        out.insert(0, "session_id", chunk["session_id"].to_numpy())
+    return out
+
+def _scored_chunks(chunks, workers):
+    """Score chunks in order, in-process or on a pool that loads the model once per worker."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(chunk)
+        return
+    with mp.get_context("spawn").Pool(workers, initializer=load_model) as pool:
+        # Keep only a few chunks in flight so memory stays bounded.
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(score_chunk, (chunk,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def score_file(input_path, output_path, chunk_size=50_000, workers=1):
+    """Stream sessions from `input_path`, write predictions to `output_path` ("-" = stdout)."""
+    from src import storage
+    is_jsonl = output_path.endswith((".jsonl", ".ndjson"))
+    out = sys.stdout if output_path == "-" else open(output_path, mode="w", newline="", encoding="utf-8")
+    rows = 0
+    try:
+        for scored in _scored_chunks(storage.iter_chunks(input_path, chunk_size), workers):
+            if is_jsonl:
+                for record in scored.to_dict(orient="records"):
+                    out.write(json.dumps(record, default=str) + "\n")
+            else:
+                scored.to_csv(out, header=rows == 0, index=False)
+            rows += len(scored)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict stress from typing features.")
+    parser.add_argument("--input", help="CSV, JSONL or Parquet of sessions to score in bulk")
+    parser.add_argument("--output", default="-", help="CSV or JSONL for predictions (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1, help="processes to score chunks on")
+    args = parser.parse_args()
+    if args.input is None:
+        predict_stress()
+        return
+    rows = score_file(args.input, args.output, args.chunk_size, args.workers)
+    print(f"✅ Scored {rows} sessions -> {args.output}", file=sys.stderr)
+
 if __name__ == "__main__":
-    predict_stress()
+    main()
@@ -0,0 +1,271 @@
+"""Reference passages for the typing tests, with a precomputed difficulty index.
+
+The built-in passages are enough to run. For a large corpus, put one
+passage per line in a text file and build the index once:
+
+    python -m src.reference_corpus --build passages.txt
+
+which writes data/corpus/:
+    passages.txt    the passages, UTF-8, one per line
+    index.npy       one PASSAGE_DTYPE record per passage: byte offset and
+                    length, characters, bigram rarity, punctuation
+                    density, difficulty (0-100) and level
+    order.npy       passage ids grouped by level, easiest first
+    meta.json       level boundaries in order.npy, source and counts
+
+Opening the corpus memory-maps these files, so start-up cost and memory do
+not grow with the corpus, and a passage's text is read only when it is
+chosen. sample() picks a level (uniformly, so every difficulty is
+practised equally however the corpus is skewed, or the one asked for),
+then a random slot in that level's slice of order.npy: O(1), with a few
+retries to skip passages seen in the last RECENT_WINDOW samples. The
+recent ids are kept in data/reference_recent.txt, so one-shot CLI runs do
+not repeat each other either.
+
+Difficulty is a property of the text, from within-corpus percentile ranks
+of length, mean bigram rarity (-log2 of each lower-cased character pair's
+frequency in the corpus) and punctuation density; the levels are its
+tertiles.
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import string
+import numpy as np
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "corpus")
+RECENT_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "reference_recent.txt")
+
+BUILTIN_TEXTS = [
+    "Python makes data science fun and powerful.",
+    "Typing speed and accuracy can reflect our focus.",
+    "Machine learning finds patterns in noisy data.",
+    "College projects are a great way to learn real skills.",
+    "Typing speed and accuracy during a test can reflect how focused or distracted a student is at that moment.",
+    "Machine learning models can discover hidden patterns in noisy data, helping us make better predictions about the real world.",
+    "Python makes data science fun and powerful for students who love logic.",
+    "College projects are a great way to learn real skills, because they force us to combine theory, problem solving, teamwork, and clear communication in one place.",
+    "When students track their daily habits, such as sleep, screen time, and study hours, they can often see clear trends that explain why their performance improves or drops over time.",
+    "Stress does not always reduce productivity immediately, but over time it can increase mistakes, reduce focus, and make even simple tasks feel much harder than they actually are."
+]
+
+LEVELS = ("easy", "medium", "hard")
+# Weights of the percentile ranks in the difficulty score.
+DIFFICULTY_WEIGHTS = {"chars": 0.4, "bigram_rarity": 0.4, "punct_density": 0.2}
+RECENT_WINDOW = 50
+MAX_TRIES = 8
+FORMAT_VERSION = 1
+PASSAGE_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("nbytes", "<u4"),
+    ("chars", "<u4"),
+    ("bigram_rarity", "<f4"),
+    ("punct_density", "<f4"),
+    ("difficulty", "<f4"),
+    ("level", "u1")
+])
+_PUNCT = np.array([ord(c) for c in string.punctuation], dtype=np.uint32)
+
+Passage = collections.namedtuple("Passage", ["id", "text", "difficulty", "level"])
+
+def _pct_rank(x):
+    """Percentile rank in [0, 1] of every value in `x` (ties share the lower rank)."""
+    if len(x) < 2:
+        return np.zeros(len(x))
+    return np.searchsorted(np.sort(x), x, side="left") / (len(x) - 1)
+
+def build_index(texts):
+    """(UTF-8 bytes of the passages, one per line; PASSAGE_DTYPE index; order; level starts)."""
+    texts = [" ".join(t.split()) for t in texts]
+    texts = [t for t in texts if t]
+    n = len(texts)
+    data = "\n".join(texts).encode("utf-8")
+    nbytes = np.fromiter((len(t.encode("utf-8")) for t in texts), dtype=np.int64, count=n)
+    chars = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+    index = np.zeros(n, dtype=PASSAGE_DTYPE)
+    index["offset"] = np.concatenate([[0], np.cumsum(nbytes + 1)[:-1]]) if n else []
+    index["nbytes"] = nbytes
+    index["chars"] = chars
+    if n:
+        codes = np.frombuffer("\n".join(texts).encode("utf-32-le"), dtype=np.uint32)
+        # Passage of every character; each separator goes with the passage before it.
+        owner = np.repeat(np.arange(n), chars + 1)[:len(codes)]
+        upper = (codes >= 65) & (codes <= 90)
+        lower = np.where(upper, codes + 32, codes).astype(np.uint64)
+        pairs = (lower[:-1] << np.uint64(32)) | lower[1:]
+        inside = (codes[:-1] != 10) & (codes[1:] != 10)
+        _, inverse, counts = np.unique(pairs[inside], return_inverse=True, return_counts=True)
+        surprisal = -np.log2(counts / counts.sum())[inverse]
+        pair_owner = owner[:-1][inside]
+        per_passage = np.maximum(np.bincount(pair_owner, minlength=n), 1)
+        index["bigram_rarity"] = np.bincount(pair_owner, weights=surprisal, minlength=n) / per_passage
+        punct = np.isin(codes, _PUNCT)
+        index["punct_density"] = np.bincount(owner[punct], minlength=n) / np.maximum(chars, 1)
+        score = sum(w * _pct_rank(index[name].astype(np.float64)) for name, w in DIFFICULTY_WEIGHTS.items())
+        index["difficulty"] = 100 * score / sum(DIFFICULTY_WEIGHTS.values())
+        index["level"] = np.minimum((_pct_rank(index["difficulty"]) * len(LEVELS)).astype(int), len(LEVELS) - 1)
+    order = np.lexsort((index["difficulty"], index["level"])).astype(np.uint32)
+    starts = np.searchsorted(index["level"][order], np.arange(len(LEVELS) + 1)).tolist()
+    return data, index, order, starts
+
+class Corpus:
+    """Passages with their difficulty index; sample() is O(1) and avoids recent repeats."""
+
+    def __init__(self, data, index, order, starts, recent_file=None):
+        self._data = data
+        self.index = index
+        self.order = order
+        self.starts = starts
+        self.recent_file = recent_file
+        # (passage id, draw number within its level) of the last RECENT_WINDOW
+        # samples, and the draw number each of those ids was last drawn at.
+        self._recent = collections.deque(maxlen=RECENT_WINDOW)
+        self._last = {}
+        self._drawn = [0] * len(LEVELS)
+        self._rng = random.Random()
+        if recent_file and os.path.isfile(recent_file):
+            with open(recent_file, mode="r", encoding="utf-8") as f:
+                for line in f.read().split()[-RECENT_WINDOW:]:
+                    if line.isdigit() and int(line) < len(index):
+                        self._remember(int(line))
+
+    @classmethod
+    def from_texts(cls, texts, recent_file=None):
+        return cls(*build_index(texts), recent_file=recent_file)
+
+    @classmethod
+    def open(cls, directory=CORPUS_DIR, recent_file=None):
+        """Memory-map a corpus written by save()."""
+        with open(os.path.join(directory, "meta.json"), mode="r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{directory} was built by another version; rebuild it with --build")
+        path = os.path.join(directory, "passages.txt")
+        data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else b""
+        index = np.load(os.path.join(directory, "index.npy"), mmap_mode="r")
+        order = np.load(os.path.join(directory, "order.npy"), mmap_mode="r")
+        return cls(data, index, order, meta["starts"], recent_file=recent_file)
+
+    def save(self, directory=CORPUS_DIR, source=None):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "passages.txt"), mode="wb") as f:
+            f.write(bytes(self._data))
+        np.save(os.path.join(directory, "index.npy"), self.index)
+        np.save(os.path.join(directory, "order.npy"), self.order)
+        meta = {
+            "version": FORMAT_VERSION,
+            "passages": len(self),
+            "levels": list(LEVELS),
+            "starts": list(self.starts),
+            "source": os.path.basename(source) if source else None
+        }
+        # meta.json last: a half-built directory does not open.
+        with open(os.path.join(directory, "meta.json"), mode="w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    def __len__(self):
+        return len(self.index)
+
+    def text(self, i):
+        rec = self.index[i]
+        start = int(rec["offset"])
+        return bytes(self._data[start:start + int(rec["nbytes"])]).decode("utf-8")
+
+    def passage(self, i):
+        rec = self.index[i]
+        return Passage(int(i), self.text(i), round(float(rec["difficulty"]), 1), LEVELS[int(rec["level"])])
+
+    def level_sizes(self):
+        return {level: self.starts[k + 1] - self.starts[k] for k, level in enumerate(LEVELS)}
+
+    def _remember(self, i):
+        if len(self._recent) == self._recent.maxlen:
+            old, n = self._recent[0]
+            if self._last.get(old) == n:
+                del self._last[old]
+        k = int(self.index[i]["level"])
+        self._drawn[k] += 1
+        self._recent.append((i, self._drawn[k]))
+        self._last[i] = self._drawn[k]
+
+    def _is_recent(self, i, k, window):
+        # Only the level's last `window` draws count, so a small level never runs dry.
+        n = self._last.get(i)
+        return n is not None and self._drawn[k] - n < window
+
+    def sample(self, level=None):
+        """A Passage at `level` (one of LEVELS; None for any level, stratified)."""
+        if not len(self):
+            raise ValueError("The reference corpus is empty")
+        if level is None:
+            k = self._rng.choice([k for k in range(len(LEVELS)) if self.starts[k + 1] > self.starts[k]])
+        else:
+            k = LEVELS.index(level)
+        start, size = self.starts[k], self.starts[k + 1] - self.starts[k]
+        if size == 0:
+            raise ValueError(f"No {level} passages in the reference corpus")
+        window = min(RECENT_WINDOW, size - 1)
+        if size <= MAX_TRIES:
+            # Tiny level (e.g. the built-in passages): choose among the non-recent ones directly.
+            ids = [int(i) for i in self.order[start:start + size]]
+            i = self._rng.choice([i for i in ids if not self._is_recent(i, k, window)] or ids)
+        else:
+            for _ in range(MAX_TRIES):
+                i = int(self.order[start + self._rng.randrange(size)])
+                if not self._is_recent(i, k, window):
+                    break
+        self._remember(i)
+        self._save_recent()
+        return self.passage(i)
+
+    def _save_recent(self):
+        if not self.recent_file:
+            return
+        try:
+            tmp = f"{self.recent_file}.{os.getpid()}.tmp"
+            with open(tmp, mode="w", encoding="utf-8") as f:
+                f.write("\n".join(str(i) for i, _ in self._recent) + "\n")
+            os.replace(tmp, self.recent_file)
+        except OSError:
+            pass
+
+_shared = None
+
+def shared():
+    """The process-wide corpus: data/corpus/ if built, else the built-in passages."""
+    global _shared
+    if _shared is None:
+        if os.path.isfile(os.path.join(CORPUS_DIR, "meta.json")):
+            _shared = Corpus.open(CORPUS_DIR, recent_file=RECENT_FILE)
+        else:
+            _shared = Corpus.from_texts(BUILTIN_TEXTS, recent_file=RECENT_FILE)
+    return _shared
+
+def choose_reference_text(level=None):
+    return shared().sample(level).text
+
+def read_passages(path):
+    with open(path, mode="r", encoding="utf-8") as f:
+        return [line for line in f if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the reference-text corpus.")
+    parser.add_argument("--build", metavar="FILE", help="index FILE (one passage per line) into data/corpus/")
+    parser.add_argument("--sample", type=int, default=0, help="print this many sampled passages")
+    parser.add_argument("--level", choices=LEVELS, help="level to sample from")
+    args = parser.parse_args()
+    if args.build:
+        corpus = Corpus.from_texts(read_passages(args.build))
+        corpus.save(CORPUS_DIR, source=args.build)
+        print(f"✅ Indexed {len(corpus):,} passages into {CORPUS_DIR}")
+    corpus = shared()
+    sizes = ", ".join(f"{level} {n:,}" for level, n in corpus.level_sizes().items())
+    print(f"{len(corpus):,} passages ({sizes})")
+    for _ in range(args.sample):
+        p = corpus.sample(args.level)
+        print(f"[{p.level:<6} {p.difficulty:5.1f}] {p.text}")
+
+if __name__ == "__main__":
+    main()
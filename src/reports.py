@@ -0,0 +1,345 @@
+"""Analytics rollups of the logged sessions and the charts in graphs/.
+
+Rollups keep, per stress label, per day and per user, the session count
+and for every ROLLUP_FEATURES column its count, sum, sum of squares and a
+fixed-bin histogram. They are updated from the raw file's high-water mark
+like feature_engineering.py --incremental, so an update costs time
+proportional to the sessions logged since the last one, and they are
+rebuilt only when the raw file was rewritten or the rollup schema changed.
+
+Each chart is drawn from the rollups alone and records a digest of the
+rollup slice (or model) it was drawn from; it is redrawn only when that
+digest changes. Report generation cost depends on the number of labels,
+days and users, not on the number of sessions.
+
+    python -m src.reports              update rollups, redraw changed charts
+    python -m src.reports --force      redraw every chart
+    python -m src.reports --users 20   also print the 20 most active users
+"""
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+from src.feature_engineering import DATA_FILE, _tail_digest
+from src.features import LABELS, batch_session_features
+from src.session_store import SessionStore
+
+ROLLUP_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "rollups.npz")
+STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "rollups.state.json")
+GRAPHS_DIR = os.path.join(os.path.dirname(__file__), "..", "graphs")
+
+# Bump when the rollup logic changes; the rollups are then rebuilt.
+ROLLUP_VERSION = 1
+# Histogram range per feature; values outside fall into the end bins.
+ROLLUP_FEATURES = {
+    "chars_per_sec": (0.0, 12.0),
+    "mistakes_per_char": (0.0, 1.2),
+    "accuracy_percent": (0.0, 100.0),
+    "word_mistake_rate": (0.0, 1.2),
+    "difficulty_score": (0.0, 240.0),
+    "sleep_hours": (0.0, 12.0),
+    "self_stress_level": (-0.5, 2.5)
+}
+BINS = 48
+DIMENSIONS = ("label", "day", "user")
+COLORS = ["#E69F00", "#56B4E9", "#009E73"]
+CHUNK_ROWS = 100_000
+
+class Rollup:
+    """Count, sums, sums of squares and histograms of ROLLUP_FEATURES per key."""
+
+    def __init__(self, keys=(), count=None, n=None, total=None, sumsq=None, hist=None):
+        f = len(ROLLUP_FEATURES)
+        self.keys = {str(k): i for i, k in enumerate(keys)}
+        g = len(self.keys)
+        self.count = np.zeros(g, dtype=np.int64) if count is None else count
+        self.n = np.zeros((g, f), dtype=np.int64) if n is None else n
+        self.total = np.zeros((g, f)) if total is None else total
+        self.sumsq = np.zeros((g, f)) if sumsq is None else sumsq
+        self.hist = np.zeros((g, f, BINS), dtype=np.int64) if hist is None else hist
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _rows(self, keys):
+        new = [k for k in keys if k not in self.keys]
+        if new:
+            for k in new:
+                self.keys[k] = len(self.keys)
+            grow = len(new)
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+            self.n = np.concatenate([self.n, np.zeros((grow,) + self.n.shape[1:], dtype=np.int64)])
+            self.total = np.concatenate([self.total, np.zeros((grow,) + self.total.shape[1:])])
+            self.sumsq = np.concatenate([self.sumsq, np.zeros((grow,) + self.sumsq.shape[1:])])
+            self.hist = np.concatenate([self.hist, np.zeros((grow,) + self.hist.shape[1:], dtype=np.int64)])
+        return np.array([self.keys[k] for k in keys], dtype=np.intp)
+
+    def add(self, keys, X):
+        """Fold rows `X` (sessions x ROLLUP_FEATURES, NaN = missing) into their keys' groups."""
+        uniq, inverse = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+        rows = self._rows(uniq.tolist())
+        g = len(uniq)
+        self.count[rows] += np.bincount(inverse, minlength=g)
+        for j, (lo, hi) in enumerate(ROLLUP_FEATURES.values()):
+            x = X[:, j]
+            ok = ~np.isnan(x)
+            at, x = inverse[ok], x[ok]
+            self.n[rows, j] += np.bincount(at, minlength=g)
+            self.total[rows, j] += np.bincount(at, weights=x, minlength=g)
+            self.sumsq[rows, j] += np.bincount(at, weights=x * x, minlength=g)
+            b = np.clip(((x - lo) / (hi - lo) * BINS).astype(np.int64), 0, BINS - 1)
+            self.hist[rows, j] += np.bincount(at * BINS + b, minlength=g * BINS).reshape(g, BINS)
+
+    def arrays(self, prefix):
+        return {
+            f"{prefix}.keys": np.array(list(self.keys), dtype=str),
+            f"{prefix}.count": self.count,
+            f"{prefix}.n": self.n,
+            f"{prefix}.total": self.total,
+            f"{prefix}.sumsq": self.sumsq,
+            f"{prefix}.hist": self.hist
+        }
+
+    @classmethod
+    def from_arrays(cls, data, prefix):
+        return cls(*(data[f"{prefix}.{name}"] for name in ("keys", "count", "n", "total", "sumsq", "hist")))
+
+    def frame(self):
+        """DataFrame of sessions and per-feature mean/std per key."""
+        import pandas as pd
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = self.total / self.n
+            std = np.sqrt(np.maximum(self.sumsq / self.n - mean * mean, 0.0))
+        out = pd.DataFrame({"key": list(self.keys), "sessions": self.count})
+        for j, name in enumerate(ROLLUP_FEATURES):
+            out[f"{name}_mean"] = mean[:, j]
+            out[f"{name}_std"] = std[:, j]
+        return out
+
+    def digest(self, features=None):
+        """Hash of the groups and the given features' stats: a chart's input."""
+        cols = [list(ROLLUP_FEATURES).index(f) for f in (features or ROLLUP_FEATURES)]
+        h = hashlib.sha1("\x00".join(self.keys).encode("utf-8"))
+        for a in (self.count, self.n[:, cols], self.total[:, cols], self.sumsq[:, cols], self.hist[:, cols]):
+            h.update(np.ascontiguousarray(a).tobytes())
+        return h.hexdigest()
+
+def _schema():
+    return {"version": ROLLUP_VERSION, "features": ROLLUP_FEATURES, "bins": BINS}
+
+def _load_state():
+    try:
+        with open(STATE_FILE, mode="r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # JSON turns the ranges into lists.
+    return state if state.get("schema") == json.loads(json.dumps(_schema())) else None
+
+def _save(rollups, state):
+    arrays = {}
+    for dim, rollup in rollups.items():
+        arrays.update(rollup.arrays(dim))
+    tmp = ROLLUP_FILE + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, ROLLUP_FILE)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, mode="w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+def session_values(df):
+    """(label, day and user keys; sessions x ROLLUP_FEATURES matrix) for raw sessions."""
+    import pandas as pd
+    sleep = pd.to_numeric(df["sleep_hours"], errors="coerce") if "sleep_hours" in df else None
+    f = batch_session_features(df["reference_text"], df["typed_text"], df["time_taken_sec"], sleep)
+    # Missing sleep stays missing here instead of counting as 0 hours.
+    f["sleep_hours"] = sleep.to_numpy(dtype=np.float64) if sleep is not None else np.nan
+    f["self_stress_level"] = pd.to_numeric(df["self_stress_level"], errors="coerce").to_numpy(dtype=np.float64)
+    X = f[list(ROLLUP_FEATURES)].to_numpy(dtype=np.float64)
+    label = f["self_stress_level"].to_numpy()
+    keys = {
+        "label": np.where(np.isnan(label), "unlabeled", np.nan_to_num(label).astype(int).astype(str)),
+        "day": df["date_time"].astype(str).str[:10].to_numpy(),
+        "user": df["user_id"].astype(str).to_numpy()
+    }
+    return keys, X
+
+def update():
+    """Fold sessions logged since the last update into the rollups: (rollups, state, new rows)."""
+    state = _load_state()
+    raw = SessionStore(DATA_FILE)
+    rebuild = (
+        state is None or not os.path.exists(ROLLUP_FILE)
+        or os.path.getsize(DATA_FILE) < state["raw_offset"]
+        or _tail_digest(state["raw_offset"]) != state["raw_digest"]
+    )
+    if rebuild:
+        rollups = {dim: Rollup() for dim in DIMENSIONS}
+        state = {"schema": _schema(), "raw_offset": 0, "rows": 0, "charts": (state or {}).get("charts", {})}
+    else:
+        with np.load(ROLLUP_FILE) as data:
+            rollups = {dim: Rollup.from_arrays(data, dim) for dim in DIMENSIONS}
+    added = 0
+    for df, offset in raw.iter_tail(state["raw_offset"], CHUNK_ROWS):
+        keys, X = session_values(df)
+        for dim in DIMENSIONS:
+            rollups[dim].add(keys[dim], X)
+        added += len(df)
+        state["raw_offset"] = offset
+    if added or rebuild:
+        state["raw_digest"] = _tail_digest(state["raw_offset"])
+        state["rows"] += added
+        _save(rollups, state)
+    return rollups, state, added
+
+# ---------- CHARTS ----------
+
+def _style(ax, title, ylabel, xlabel="Stress Level (0 = Calm, 1 = Normal, 2 = Stressed)"):
+    ax.set_title(title, fontsize=15)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+def _feature_vs_stress(path, rollup, feature, title, ylabel):
+    """Per stress level, the feature's histogram drawn as a violin, with its mean."""
+    import matplotlib.pyplot as plt
+    j = list(ROLLUP_FEATURES).index(feature)
+    lo, hi = ROLLUP_FEATURES[feature]
+    centers = lo + (np.arange(BINS) + 0.5) * (hi - lo) / BINS
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for level, color in enumerate(COLORS):
+        row = rollup.keys.get(str(level))
+        if row is None or not rollup.n[row, j]:
+            continue
+        hist = rollup.hist[row, j]
+        used = np.nonzero(hist)[0]
+        span = slice(used[0], used[-1] + 1)
+        width = 0.4 * hist[span] / hist.max()
+        ax.fill_betweenx(centers[span], level - width, level + width, color=color, alpha=0.5, step="mid",
+                         label=f"Stress {level} ({rollup.n[row, j]:,} sessions)")
+        ax.scatter([level], [rollup.total[row, j] / rollup.n[row, j]], marker="x", color=color, s=60)
+    ax.set_xticks(range(len(COLORS)))
+    _style(ax, title, ylabel)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+
+def _sessions_per_day(path, rollup):
+    import matplotlib.pyplot as plt
+    days = sorted(k for k in rollup.keys if len(k) == 10 and k[4] == "-")
+    rows = [rollup.keys[d] for d in days]
+    j = list(ROLLUP_FEATURES).index("self_stress_level")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stress = rollup.total[rows, j] / rollup.n[rows, j]
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(range(len(days)), rollup.count[rows], color=COLORS[1], label="Sessions")
+    twin = ax.twinx()
+    twin.plot(range(len(days)), stress, color=COLORS[0], marker="x", label="Mean stress level")
+    twin.set_ylim(-0.1, 2.1)
+    twin.set_ylabel("Mean stress level")
+    step = max(1, len(days) // 12)
+    ax.set_xticks(range(0, len(days), step))
+    ax.set_xticklabels(days[::step], rotation=45, ha="right")
+    _style(ax, "Sessions and Mean Stress Level per Day", "Sessions", xlabel="Day")
+    fig.legend(loc="upper right", bbox_to_anchor=(0.9, 0.88))
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+
+def _live_model():
+    """(digest, artifact path) of the current model, or (None, None); the digest
+    comes from the manifest or a file hash, so nothing is unpickled for it."""
+    from src import model_registry
+    from src.compiled_model import file_digest
+    if model_registry.current() is not None:
+        info = model_registry.manifest()
+        return info["model_sha1"], os.path.join(model_registry.REGISTRY_DIR, info["version"], "model.pkl")
+    if not os.path.exists(model_registry.MODEL_PATH):
+        return None, None
+    return file_digest(model_registry.MODEL_PATH), model_registry.MODEL_PATH
+
+def _feature_importance(path, model_path):
+    import joblib
+    import matplotlib.pyplot as plt
+    model = joblib.load(model_path)
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    if hasattr(est, "feature_importances_"):
+        scores, ylabel = est.feature_importances_, "Importance Score"
+    else:
+        scores, ylabel = np.abs(np.atleast_2d(est.coef_)).mean(axis=0), "Mean |coefficient| (scaled inputs)"
+    names = list(getattr(model, "feature_names_in_", [f"feature {i}" for i in range(len(scores))]))
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(names, scores, color=COLORS[0])
+    ax.set_xticks(range(len(names)))
+    ax.set_xticklabels(names, rotation=45, ha="right")
+    _style(ax, f"Feature Importance ({type(est).__name__})", ylabel, xlabel="")
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+
+VS_STRESS_CHARTS = {
+    "speed_vs_stress.png": ("chars_per_sec", "Typing Speed (chars/sec) vs Stress Level", "Characters per Second"),
+    "mistakes_vs_stress.png": ("mistakes_per_char", "Mistakes per Character vs Stress Level", "Mistakes per Character"),
+    "accuracy_vs_stress.png": ("accuracy_percent", "Accuracy (%) vs Stress Level", "Accuracy (%)"),
+    "sleep_vs_stress.png": ("sleep_hours", "Sleep Hours vs Stress Level", "Sleep Hours (previous night)")
+}
+
+def render(rollups, state, out_dir=GRAPHS_DIR, force=False):
+    """Redraw the charts whose inputs changed; returns the names redrawn."""
+    import matplotlib
+    matplotlib.use("Agg")
+    os.makedirs(out_dir, exist_ok=True)
+    charts = {}
+    for name, (feature, title, ylabel) in VS_STRESS_CHARTS.items():
+        charts[name] = (
+            rollups["label"].digest([feature]),
+            lambda path, f=feature, t=title, y=ylabel: _feature_vs_stress(path, rollups["label"], f, t, y)
+        )
+    charts["sessions_per_day.png"] = (
+        rollups["day"].digest(["self_stress_level"]),
+        lambda path: _sessions_per_day(path, rollups["day"])
+    )
+    model_digest, model_path = _live_model()
+    if model_digest is not None:
+        charts["feature_importance.png"] = (model_digest, lambda path: _feature_importance(path, model_path))
+    drawn = []
+    done = state.setdefault("charts", {})
+    for name, (digest, draw) in charts.items():
+        path = os.path.join(out_dir, name)
+        if not force and done.get(name) == digest and os.path.exists(path):
+            continue
+        draw(path)
+        done[name] = digest
+        drawn.append(name)
+    if drawn:
+        tmp = STATE_FILE + ".tmp"
+        with open(tmp, mode="w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, STATE_FILE)
+    return drawn
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the session rollups and redraw changed charts.")
+    parser.add_argument("--force", action="store_true", help="redraw every chart")
+    parser.add_argument("--out", default=GRAPHS_DIR, help="directory for the charts")
+    parser.add_argument("--users", type=int, default=0, help="print the N users with the most sessions")
+    args = parser.parse_args()
+    rollups, state, added = update()
+    print(f"✅ Rollups: {state['rows']:,} sessions (+{added:,}), {len(rollups['day'])} days, "
+          f"{len(rollups['user'])} users")
+    drawn = render(rollups, state, args.out, force=args.force)
+    print(f"✅ Redrew {', '.join(drawn)}" if drawn else "Charts are up to date.")
+    by_label = rollups["label"].frame().set_index("key")
+    cols = ["sessions", "chars_per_sec_mean", "accuracy_percent_mean", "sleep_hours_mean"]
+    print(by_label.loc[[k for k in ("0", "1", "2", "unlabeled") if k in by_label.index], cols]
+          .rename(index={str(k): v for k, v in LABELS.items()}).round(2).to_string())
+    if args.users:
+        users = rollups["user"].frame().nlargest(args.users, "sessions")
+        print(users[["key", "sessions", "chars_per_sec_mean", "accuracy_percent_mean", "self_stress_level_mean"]]
+              .round(2).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import csv
+import hashlib
+import io
+import os
+import struct
+import numpy as np
+
+# One fixed-size record per CSV row, in file order, kept in "<csv path>.idx".
+INDEX_RECORD = struct.Struct("<qqiiQ")
+INDEX_DTYPE = np.dtype([
+    ("session_id", "<i8"),
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("date", "<i4"),
+    ("user", "<u8")
+])
+
+def user_key(user_id):
+    """64-bit hash of a user id, as stored in the index."""
+    digest = hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def date_key(value):
+    """YYYYMMDD int from a "YYYY-MM-DD ..." string or a date; 0 if unparseable."""
+    if hasattr(value, "strftime"):
+        value = value.strftime("%Y-%m-%d")
+    try:
+        return int(str(value)[:10].replace("-", ""))
+    except ValueError:
+        return 0
+
+class SessionStore:
+    """Append-only session CSV with a sidecar index.
+
+    The index holds (session_id, byte offset, byte length, date, user hash)
+    for every row, so allocating the next id, fetching a session by id and
+    picking out one user's or one day's rows never parse the whole CSV. Rows
+    appended by other tools are picked up on open; if the CSV was rewritten
+    the index is rebuilt.
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.index_path = path + ".idx"
+        if not os.path.isfile(path):
+            if columns is None:
+                raise FileNotFoundError(f"Session file not found at: {path}")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, mode="w", newline="", encoding="utf-8") as f:
+                csv.writer(f, lineterminator="\n").writerow(columns)
+        self._open()
+
+    def _open(self):
+        with open(self.path, mode="rb") as f:
+            header_line = f.readline()
+        self.columns = next(csv.reader([header_line.decode("utf-8")]))
+        self.header_end = len(header_line)
+        self._sync()
+
+    # ---------- index maintenance ----------
+
+    def _column(self, name):
+        return self.columns.index(name) if name in self.columns else None
+
+    def _record_for(self, row, offset, length):
+        id_col, user_col, date_col = (
+            self._column("session_id"), self._column("user_id"), self._column("date_time")
+        )
+        try:
+            session_id = int(float(row[id_col]))
+        except (TypeError, ValueError, IndexError):
+            session_id = -1
+        user = user_key(row[user_col]) if user_col is not None and user_col < len(row) else 0
+        date = date_key(row[date_col]) if date_col is not None and date_col < len(row) else 0
+        return INDEX_RECORD.pack(session_id, offset, length, date, user)
+
+    def __len__(self):
+        if not os.path.isfile(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // INDEX_RECORD.size
+
+    def _record_at(self, i):
+        with open(self.index_path, mode="rb") as f:
+            f.seek(i * INDEX_RECORD.size)
+            return INDEX_RECORD.unpack(f.read(INDEX_RECORD.size))
+
+    def _row_bytes(self, offset, length):
+        with open(self.path, mode="rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _index_is_valid(self):
+        if not os.path.isfile(self.index_path):
+            return False
+        if os.path.getsize(self.index_path) % INDEX_RECORD.size:
+            return False
+        if len(self) == 0:
+            return True
+        session_id, offset, length, _, _ = self._record_at(len(self) - 1)
+        if offset + length > os.path.getsize(self.path):
+            return False
+        # Cheap check that the last indexed row is still where we left it.
+        row = self._row_bytes(offset, length)
+        return row.endswith(b"\n") and (session_id < 0 or row.startswith(f"{session_id},".encode()))
+
+    def indexed_end(self):
+        """Byte offset just past the last indexed row."""
+        if len(self) == 0:
+            return self.header_end
+        _, offset, length, _, _ = self._record_at(len(self) - 1)
+        return offset + length
+
+    def _sync(self):
+        if not self._index_is_valid():
+            open(self.index_path, mode="wb").close()
+        start = self.indexed_end()
+        if os.path.getsize(self.path) > start:
+            self._index_from(start)
+
+    def _index_from(self, offset):
+        records = []
+        with open(self.path, mode="rb") as f:
+            f.seek(offset)
+            pending = b""
+            for line in f:
+                pending += line
+                # Quoted fields may hold newlines: a row is complete once its
+                # quotes balance. A last row without "\n" is still being written.
+                if pending.count(b'"') % 2 or not pending.endswith(b"\n"):
+                    continue
+                row = next(csv.reader([pending.decode("utf-8")]), [])
+                records.append(self._record_for(row, offset, len(pending)))
+                offset += len(pending)
+                pending = b""
+        with open(self.index_path, mode="ab") as f:
+            f.write(b"".join(records))
+
+    def _records(self):
+        if len(self) == 0:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+
+    # ---------- id allocation and appends ----------
+
+    def next_id(self):
+        """Next free session id, normally from the last index record only.
+
+        If the last row's id did not parse (stored as -1), falls back to the
+        largest valid id in the index so existing ids are never handed out.
+        """
+        if len(self) == 0:
+            return 1
+        last = self._record_at(len(self) - 1)[0]
+        if last < 0:
+            last = int(self._records()["session_id"].max())
+        return max(last, 0) + 1
+
+    def append(self, row):
+        """Append one session (dict keyed by column); returns its session_id."""
+        return self.append_rows([row])[0]
+
+    def append_rows(self, rows, fsync=False, before_write=None):
+        """Append sessions in a single write; returns their session_ids.
+
+        Rows without a session_id get consecutive ids after the last indexed
+        one. `before_write(offset, length, ids)` is called once the batch is
+        encoded, so callers can journal it. Not safe against concurrent
+        writers on its own; see src.ingest for that.
+        """
+        next_id = self.next_id()
+        ids, encoded = [], []
+        for row in rows:
+            row = dict(row)
+            if row.get("session_id") in (None, ""):
+                row["session_id"] = next_id
+                next_id += 1
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator="\n").writerow([row.get(c, "") for c in self.columns])
+            ids.append(row["session_id"])
+            encoded.append(([str(row.get(c, "")) for c in self.columns], buf.getvalue().encode("utf-8")))
+        data = b"".join(chunk for _, chunk in encoded)
+        with open(self.path, mode="ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            if before_write is not None:
+                before_write(offset, len(data), ids)
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        records = []
+        for values, chunk in encoded:
+            records.append(self._record_for(values, offset, len(chunk)))
+            offset += len(chunk)
+        with open(self.index_path, mode="ab") as f:
+            f.write(b"".join(records))
+        return ids
+
+    def append_frame(self, df):
+        """Append a DataFrame with the store's columns, then index the new rows."""
+        with open(self.path, mode="ab") as f:
+            f.write(df[self.columns].to_csv(header=False, index=False).encode("utf-8"))
+        self._sync()
+
+    @classmethod
+    def write_frame(cls, path, df):
+        """Write `df` as a new session file (replacing any old one) and index it."""
+        df.to_csv(path, index=False)
+        open(path + ".idx", mode="wb").close()
+        return cls(path)
+
+    # ---------- lookups ----------
+
+    def find(self, session_id):
+        """Index position of a session id, or None.
+
+        Ids are allocated sequentially, so the first probe normally hits; a
+        binary search covers gaps.
+        """
+        n = len(self)
+        if n == 0:
+            return None
+        first = self._record_at(0)[0]
+        guess = session_id - first
+        if 0 <= guess < n and self._record_at(guess)[0] == session_id:
+            return guess
+        lo, hi = 0, n - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            mid_id = self._record_at(mid)[0]
+            if mid_id == session_id:
+                return mid
+            if mid_id < session_id:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return None
+
+    def get(self, session_id):
+        """One session as a dict of column -> string, or None."""
+        i = self.find(session_id)
+        if i is None:
+            return None
+        _, offset, length, _, _ = self._record_at(i)
+        row = next(csv.reader([self._row_bytes(offset, length).decode("utf-8")]))
+        return dict(zip(self.columns, row))
+
+    def _frame(self, records):
+        # pandas is only needed for reads; the logger's append path never imports it.
+        import pandas as pd
+        if len(records) == 0:
+            return pd.DataFrame(columns=self.columns)
+        chunks = []
+        with open(self.path, mode="rb") as f:
+            for offset, length in zip(records["offset"], records["length"]):
+                f.seek(offset)
+                chunks.append(f.read(length))
+        return pd.read_csv(io.BytesIO(b"".join(chunks)), header=None, names=self.columns)
+
+    def user_sessions(self, user_id):
+        """DataFrame of one user's sessions."""
+        records = self._records()
+        df = self._frame(records[records["user"] == user_key(user_id)])
+        return df[df["user_id"].astype(str) == str(user_id)].reset_index(drop=True)
+
+    def date_sessions(self, date):
+        """DataFrame of the sessions logged on one day ("YYYY-MM-DD" or a date)."""
+        records = self._records()
+        return self._frame(records[records["date"] == date_key(date)])
+
+    def read_tail(self, offset):
+        """Rows from byte `offset` up to the last indexed row: (df, end offset)."""
+        import pandas as pd
+        end = self.indexed_end()
+        offset = max(offset, self.header_end)
+        if end <= offset:
+            return pd.DataFrame(columns=self.columns), offset
+        data = self._row_bytes(offset, end - offset)
+        return pd.read_csv(io.BytesIO(data), header=None, names=self.columns), end
+
+    def iter_tail(self, offset, chunk_rows=100_000):
+        """read_tail() in chunks of at most `chunk_rows` rows: yields (df, end offset)."""
+        import pandas as pd
+        records = self._records()
+        first = int(np.searchsorted(records["offset"], max(offset, self.header_end)))
+        for start in range(first, len(records), chunk_rows):
+            chunk = records[start:start + chunk_rows]
+            begin, end = int(chunk["offset"][0]), int(chunk["offset"][-1] + chunk["length"][-1])
+            data = self._row_bytes(begin, end - begin)
+            yield pd.read_csv(io.BytesIO(data), header=None, names=self.columns), end
+
+    def read_frame(self):
+        """All indexed rows as a DataFrame."""
+        return self.read_tail(self.header_end)[0]
@@ -0,0 +1,206 @@
+import argparse
+import glob
+import os
+import shutil
+import pandas as pd
+from src.session_store import SessionStore
+
+# Low-cardinality text columns stored dictionary-encoded (pandas categoricals)
+# in the columnar formats: a few reference sentences, a handful of users.
+DICTIONARY_COLUMNS = ["user_id", "reference_text", "notes"]
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.feather
+    except ImportError as e:
+        raise ImportError("Parquet/Feather storage needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def _dictionary_encode(df):
+    df = df.copy()
+    for col in DICTIONARY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+def _cast(df, dtype):
+    return df if dtype is None else df.astype(dtype)
+
+class CsvBackend:
+    """Plain CSV, indexed through SessionStore. The compatibility format."""
+
+    suffix = ".csv"
+
+    def read(self, path, columns=None, dtype=None):
+        if columns is None:
+            return _cast(SessionStore(path).read_frame(), dtype)
+        return pd.read_csv(path, usecols=columns, dtype=dtype)[columns]
+
+    def write(self, df, path):
+        SessionStore.write_frame(path, df)
+
+    def append(self, df, path):
+        SessionStore(path).append_frame(df)
+
+    def mark(self, path):
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
+    def rollback(self, path, mark):
+        if os.path.getsize(path) > mark:
+            with open(path, mode="r+b") as f:
+                f.truncate(mark)
+
+class ParquetBackend:
+    """Parquet dataset directory; every append adds one part file.
+
+    Text columns in DICTIONARY_COLUMNS are dictionary encoded, and reads
+    only decode the requested columns.
+    """
+
+    suffix = ".parquet"
+
+    def _parts(self, path):
+        return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+    def read(self, path, columns=None, dtype=None):
+        pa = _pyarrow()
+        parts = self._parts(path)
+        if not parts:
+            raise FileNotFoundError(f"No parquet parts found in: {path}")
+        table = pa.parquet.read_table(parts, columns=columns)
+        return _cast(table.to_pandas(), dtype)
+
+    def write(self, df, path):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        self.append(df, path)
+
+    def append(self, df, path):
+        pa = _pyarrow()
+        os.makedirs(path, exist_ok=True)
+        part = os.path.join(path, f"part-{len(self._parts(path)):05d}.parquet")
+        table = pa.Table.from_pandas(_dictionary_encode(df), preserve_index=False)
+        if part.endswith("part-00000.parquet"):
+            table = table.cast(pa.schema([
+                f.with_type(pa.dictionary(pa.int32(), pa.string())) if f.name in DICTIONARY_COLUMNS else f
+                for f in table.schema
+            ]))
+        else:
+            # Keep every part on the first part's schema (e.g. an all-empty
+            # "notes" column would otherwise come out as type null).
+            table = table.cast(pa.parquet.read_schema(self._parts(path)[0]))
+        tmp = part + ".tmp"
+        pa.parquet.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, part)
+
+    def mark(self, path):
+        return len(self._parts(path))
+
+    def rollback(self, path, mark):
+        for part in self._parts(path)[mark:]:
+            os.remove(part)
+
+class FeatherBackend:
+    """Single Arrow IPC (Feather v2) file; appends rewrite it."""
+
+    suffix = ".feather"
+
+    def read(self, path, columns=None, dtype=None):
+        pa = _pyarrow()
+        return _cast(pa.feather.read_feather(path, columns=columns), dtype)
+
+    def write(self, df, path):
+        pa = _pyarrow()
+        tmp = path + ".tmp"
+        pa.feather.write_feather(_dictionary_encode(df).reset_index(drop=True), tmp, compression="zstd")
+        os.replace(tmp, path)
+
+    def append(self, df, path):
+        if os.path.isfile(path):
+            df = pd.concat([self.read(path), _dictionary_encode(df)], ignore_index=True)
+        self.write(df, path)
+
+    def mark(self, path):
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
+    def rollback(self, path, mark):
+        # Writes are atomic renames, so there is never a partial append to undo.
+        pass
+
+BACKENDS = {b.suffix: b for b in (CsvBackend(), ParquetBackend(), FeatherBackend())}
+FORMATS = {suffix.lstrip("."): suffix for suffix in BACKENDS}
+
+def backend_for(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in BACKENDS:
+        raise ValueError(f"Unknown storage format for {path!r}; expected one of {list(BACKENDS)}")
+    return BACKENDS[suffix]
+
+def with_format(path, fmt):
+    """Same path with the suffix of format `fmt` ("csv", "parquet" or "feather")."""
+    return os.path.splitext(path)[0] + FORMATS[fmt]
+
+def find_dataset(path):
+    """Most recently written variant of `path` across all formats."""
+    candidates = [with_format(path, fmt) for fmt in FORMATS]
+    existing = [p for p in candidates if os.path.exists(p)]
+    if not existing:
+        raise FileNotFoundError(f"No sessions file found for: {path}")
+    return max(existing, key=os.path.getmtime)
+
+def iter_chunks(path, chunk_size, columns=None):
+    """Stream a sessions file as DataFrames of at most `chunk_size` rows.
+
+    Also accepts JSON lines (.jsonl), read-only. Memory stays bounded by the
+    chunk size, not the file size.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+    elif suffix in (".jsonl", ".ndjson"):
+        for chunk in pd.read_json(path, lines=True, chunksize=chunk_size):
+            yield chunk if columns is None else chunk[columns]
+    elif suffix == ".parquet":
+        pa = _pyarrow()
+        parts = BACKENDS[".parquet"]._parts(path) if os.path.isdir(path) else [path]
+        for part in parts:
+            for batch in pa.parquet.ParquetFile(part).iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+    elif suffix == ".feather":
+        pa = _pyarrow()
+        import pyarrow.ipc
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(start, chunk_size).to_pandas()
+    else:
+        raise ValueError(f"Cannot stream {path!r}; expected .csv, .jsonl, .parquet or .feather")
+
+def read(path, columns=None, dtype=None):
+    """Load sessions from any backend, optionally only `columns`, cast to `dtype`."""
+    return backend_for(path).read(path, columns=columns, dtype=dtype)
+
+def write(df, path):
+    backend_for(path).write(df, path)
+
+def convert(src, dst):
+    """Copy a sessions file between formats (CSV import/export)."""
+    write(read(src), dst)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert session files between CSV, Parquet and Feather.")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    args = parser.parse_args()
+    convert(args.src, args.dst)
+    print(f"✅ Converted {args.src} -> {args.dst}")
+
+if __name__ == "__main__":
+    main()
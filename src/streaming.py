@@ -0,0 +1,199 @@
+"""Live stress prediction while the user types.
+
+StreamingFeatures keeps the six model features up to date one keystroke
+at a time. Typing a character or a backspace is O(1): the character is
+compared with the reference at the same position, the current word's
+match state is carried along, and the state before every character is
+kept on a stack so a backspace just pops it. Only edits that are not at
+the end of the text (cursor moves, paste) fall back to `sync()`, which
+replays the text. chars_per_sec is measured over a rolling window.
+
+While typing, characters not typed yet are not counted as mistakes,
+except in difficulty_score, which uses the kernel's formula throughout.
+Once the text reaches the reference length, or with features(final=True)
+for a text submitted short, the features equal session_features() for the
+whole text, apart from chars_per_sec (rolling rather than whole-session).
+
+LiveScorer scores the latest features on a background thread, at most
+once per `debounce_sec`, and hands each result to `on_result` on that
+thread. tk_ui.py passes results to the Tk thread through a queue that it
+drains with after().
+"""
+import collections
+import threading
+import time
+from src import metrics, model_cache
+from src.compiled_model import model_features, model_input
+from src.features import FEATURES, LABELS, reference_info
+
+
+class StreamingFeatures:
+    def __init__(self, reference, window_sec=10.0, sleep_hours=0.0, baseline=None):
+        info = reference_info(reference)
+        # The user's user_profiles.Baseline, read once; adds the Z_FEATURES.
+        self.baseline = baseline
+        self.reference = info.text
+        self.ref_words = info.words
+        self.window_sec = window_sec
+        self.sleep_hours = sleep_hours
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.matches = 0
+        self.words_done = 0
+        self.word_mistakes_done = 0
+        self.cur_len = 0
+        self.cur_ok = True
+        self._undo = []
+        self._key_times = collections.deque()
+        self.started = None
+
+    def _ref_word(self, k):
+        return self.ref_words[k] if k < len(self.ref_words) else ""
+
+    def type_char(self, ch, t=None):
+        """Account for `ch` typed at the end of the text."""
+        t = time.perf_counter() if t is None else t
+        if self.started is None:
+            self.started = t
+        self._key_times.append(t)
+        self._undo.append((self.matches, self.words_done, self.word_mistakes_done, self.cur_len, self.cur_ok))
+        if self.n < len(self.reference) and self.reference[self.n] == ch:
+            self.matches += 1
+        self.n += 1
+        if ch.isspace():
+            if self.cur_len:
+                word = self._ref_word(self.words_done)
+                if not (self.cur_ok and self.cur_len == len(word)):
+                    self.word_mistakes_done += 1
+                self.words_done += 1
+                self.cur_len = 0
+                self.cur_ok = True
+        else:
+            word = self._ref_word(self.words_done)
+            self.cur_ok = self.cur_ok and self.cur_len < len(word) and word[self.cur_len] == ch
+            self.cur_len += 1
+
+    def backspace(self, t=None):
+        """Undo the last character typed."""
+        if not self.n:
+            return
+        self.matches, self.words_done, self.word_mistakes_done, self.cur_len, self.cur_ok = self._undo.pop()
+        self.n -= 1
+
+    def sync(self, text, t=None):
+        """Rebuild the state for arbitrary `text` (after a paste or a mid-text edit)."""
+        t = time.perf_counter() if t is None else t
+        key_times, started = self._key_times, self.started
+        self.reset()
+        for ch in text:
+            self.type_char(ch, t)
+        # Typed characters are not re-timed by a sync.
+        self._key_times, self.started = key_times, started
+
+    def chars_per_sec(self, t=None):
+        t = time.perf_counter() if t is None else t
+        times = self._key_times
+        while times and times[0] < t - self.window_sec:
+            times.popleft()
+        if not times or self.started is None:
+            return 0.0
+        span = min(self.window_sec, t - self.started)
+        return len(times) / span if span > 0 else 0.0
+
+    def word_mistakes(self, final=False):
+        mistakes = self.word_mistakes_done
+        typed_words = self.words_done
+        if self.cur_len:
+            word = self._ref_word(self.words_done)
+            mistakes += not (self.cur_ok and self.cur_len == len(word))
+            typed_words += 1
+        if final or self.n >= len(self.reference):
+            # Finished: reference words never typed are missing, as in word_level_mistakes().
+            mistakes += max(0, len(self.ref_words) - typed_words)
+        return mistakes
+
+    def features(self, t=None, final=False):
+        """Model features for the text so far; `final` scores it as submitted."""
+        ref_len = len(self.reference)
+        # Finished, the kernel compares up to the longer of the two texts.
+        compared = max(self.n, ref_len) if final else self.n
+        mistakes = compared - self.matches
+        features = {
+            "chars_per_sec": self.chars_per_sec(t),
+            "mistakes_per_char": mistakes / ref_len if ref_len else 0.0,
+            "difficulty_score": max(0, (ref_len - self.n) + mistakes),
+            "word_mistake_rate": self.word_mistakes(final) / ref_len if ref_len else 0.0,
+            "accuracy_percent": round(self.matches / compared * 100, 2) if compared else 0.0,
+            "sleep_hours": self.sleep_hours
+        }
+        if self.baseline is not None:
+            features.update(self.baseline.z_scores(features))
+        return features
+
+class LiveScorer:
+    """Scores the most recent features on a worker thread, debounced.
+
+    `update()` never blocks: it replaces the pending features. The worker
+    waits `debounce_sec` after the first pending update, scores whatever is
+    latest by then, and calls `on_result` with the label, stress name,
+    confidence and latencies. Sustained typing therefore costs one
+    prediction per `debounce_sec`, however fast the keys come.
+    """
+
+    def __init__(self, on_result, debounce_sec=0.25, get_model=None, history=1000):
+        self.on_result = on_result
+        self.debounce_sec = debounce_sec
+        self.get_model = get_model or model_cache.shared.get
+        self.latencies = collections.deque(maxlen=history)
+        self._pending = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="live-scorer", daemon=True)
+        self._thread.start()
+
+    def update(self, features):
+        with self._cond:
+            self._pending = (features, time.perf_counter())
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            time.sleep(self.debounce_sec)
+            with self._cond:
+                features, since = self._pending
+                self._pending = None
+            try:
+                model = self.get_model()
+                start = time.perf_counter()
+                proba = model.predict_proba(model_input(model, [features], model_features(model, FEATURES)))[0]
+                done = time.perf_counter()
+            except Exception as e:
+                self.on_result({"error": str(e)})
+                continue
+            best = int(proba.argmax())
+            label = model.classes_[best]
+            label = label.item() if hasattr(label, "item") else label
+            latency = done - since
+            self.latencies.append(latency)
+            metrics.record("stream.predict", done - start)
+            metrics.record("stream.latency", latency)
+            self.on_result({
+                "label": label,
+                "stress": LABELS.get(label, "Unknown"),
+                "confidence": float(proba[best]),
+                "predict_ms": (done - start) * 1000,
+                "latency_ms": latency * 1000
+            })
@@ -0,0 +1,348 @@
+"""Seeded synthetic typing sessions, fitted to the real ones, for scale testing.
+
+fit_profile() learns from data/raw_sessions.csv:
+  * per user: share of sessions, typing speed (log chars/sec mean and
+    spread), how often a session is typed perfectly and the edit rate
+    (edits per reference char) otherwise, and the mix of substitutions,
+    insertions and deletions (from alignment.batch_alignment);
+  * sleep hours and how often they are skipped, stress labels given the
+    sleep bucket, and how stress shifts speed and edit rate;
+  * reference texts and notes, with their frequencies.
+
+generate() samples whole columns at once with numpy: typos are injected
+into every row of a reference block together, and accuracy, mistakes and
+lengths come from features.batch_session_features(), exactly as the
+logger computes them. The output has the logger's RAW_COLUMNS.
+
+The rows are cut into shards with their own seed (SeedSequence.spawn), so
+the output depends on --seed and --rows only, not on --workers. Each
+worker writes its shards as part files; CSV parts are then concatenated,
+Parquet parts form a dataset directory that storage.read() understands.
+
+Run from the repo root:
+  python -m src.synthetic data/synthetic.csv --rows 10000000 --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from src import storage
+from src.alignment import batch_alignment
+from src.features import batch_session_features
+from src.typing_logger import DATA_FILE, RAW_COLUMNS
+
+SLEEP_BUCKETS = [6.0, 8.0]      # < 6 h, 6-8 h, >= 8 h
+STRESS_LEVELS = [0, 1, 2]
+OPS = ["substitutions", "insertions", "deletions"]
+# Characters that replace or are inserted next to a typed character.
+TYPO_CHARS = np.frombuffer("abcdefghijklmnopqrstuvwxyz    ,.".encode("utf-32-le"), dtype=np.uint32)
+# Pseudo-counts pulling each user's typo mix towards everyone's.
+PRIOR_WEIGHT = 10.0
+# No synthetic session edits more than this share of the reference.
+MAX_EDIT_RATE = 0.3
+# Rows typed in one vectorized block (bounds the per-char random arrays).
+BLOCK_ROWS = 20_000
+
+# ---------- FIT ----------
+
+def _empirical(values):
+    counts = pd.Series(values).value_counts(sort=False)
+    return {"values": counts.index.tolist(), "p": (counts / counts.sum()).tolist()}
+
+def fit_profile(df):
+    """Distributions for generate(), as a JSON-friendly dict."""
+    df = df.copy()
+    df["typed_text"] = df["typed_text"].fillna("").astype(str)
+    ref_len = df["reference_text"].str.strip().str.len().clip(lower=1)
+    typed_len = df["typed_text"].str.strip().str.len()
+    time_taken = pd.to_numeric(df["time_taken_sec"], errors="coerce")
+    ok = (typed_len > 0) & (time_taken > 0)
+    log_cps = np.log(typed_len[ok] / time_taken[ok])
+
+    edits = batch_alignment(df["reference_text"], df["typed_text"])
+    ops = np.column_stack([edits[f"char_{op}"] for op in OPS]).astype(float)
+    rate = ops.sum(axis=1) / ref_len.to_numpy()
+    pooled_mix = (ops.sum(axis=0) + 1) / (ops.sum() + len(OPS))
+
+    sleep = pd.to_numeric(df["sleep_hours"], errors="coerce")
+    stress = pd.to_numeric(df["self_stress_level"], errors="coerce")
+    bucket = np.digitize(sleep.fillna(sleep.median()), SLEEP_BUCKETS)
+    stress_given_sleep = []
+    for b in range(len(SLEEP_BUCKETS) + 1):
+        counts = np.array([((bucket == b) & (stress == s)).sum() for s in STRESS_LEVELS], dtype=float) + 1
+        stress_given_sleep.append((counts / counts.sum()).tolist())
+
+    users = {}
+    for user, idx in df.groupby("user_id").indices.items():
+        u_cps = log_cps.reindex(df.index[idx]).dropna()
+        u_rate = rate[idx]
+        dirty = u_rate[u_rate > 0]
+        mix = (ops[idx].sum(axis=0) + PRIOR_WEIGHT * pooled_mix)
+        users[str(user)] = {
+            "weight": len(idx) / len(df),
+            "log_cps_mean": float(u_cps.mean()) if len(u_cps) else float(log_cps.mean()),
+            "log_cps_std": float(u_cps.std()) if len(u_cps) > 1 else float(log_cps.std()),
+            "p_clean": float((len(idx) - len(dirty) + 1) / (len(idx) + 2)),
+            "edit_rate": float(dirty.mean()) if len(dirty) else float(rate[rate > 0].mean()),
+            "mix": (mix / mix.sum()).tolist()
+        }
+
+    # How each stress level shifts a user's speed (log scale) and edit rate,
+    # relative to that user's own average so user and stress are not confused.
+    user_mean = df["user_id"].map({u: p["log_cps_mean"] for u, p in users.items()})
+    residual = (np.log(typed_len / time_taken) - user_mean)[ok]
+    user_rate = pd.Series(rate).groupby(df["user_id"].to_numpy()).transform("mean").to_numpy()
+    relative_rate = np.divide(rate, user_rate, out=np.ones_like(rate), where=user_rate > 0)
+    speed_shift, rate_factor = [], []
+    for s in STRESS_LEVELS:
+        at = (stress == s).to_numpy()
+        speed_shift.append(float(residual[at[ok.to_numpy()]].mean()) if at[ok.to_numpy()].any() else 0.0)
+        rate_factor.append(float(relative_rate[at].mean()) if at.any() else 1.0)
+
+    notes = df["notes"].dropna().astype(str)
+    notes = notes[notes.str.strip() != ""]
+    dates = pd.to_datetime(df["date_time"], errors="coerce").dropna().sort_values()
+    gap = (dates.iloc[-1] - dates.iloc[0]).total_seconds() / max(len(dates) - 1, 1) if len(dates) > 1 else 600.0
+    return {
+        "users": users,
+        "references": _empirical(df["reference_text"].str.strip()),
+        "sleep": _empirical(sleep.dropna()),
+        "p_sleep_missing": float(sleep.isna().mean()),
+        "stress_given_sleep": stress_given_sleep,
+        "speed_shift": speed_shift,
+        "rate_factor": rate_factor,
+        "notes": _empirical(notes) if len(notes) else {"values": [""], "p": [1.0]},
+        "p_note": len(notes) / len(df),
+        "start": str(dates.iloc[0] if len(dates) else pd.Timestamp("2025-01-01")),
+        "mean_gap_sec": gap
+    }
+
+def expand_users(profile, n_users, seed=0):
+    """Profile with `n_users` users, each a copy of a real one with its own speed and accuracy.
+
+    The real users are kept as they are when n_users is at most their number.
+    """
+    real = profile["users"]
+    names = list(real)
+    if n_users <= len(names):
+        return profile
+    rng = np.random.default_rng([seed, n_users])
+    weights = np.array([real[u]["weight"] for u in names])
+    protos = rng.choice(len(names), size=n_users, p=weights / weights.sum())
+    speeds = np.array([real[u]["log_cps_mean"] for u in names])
+    rates = np.log([real[u]["edit_rate"] for u in names])
+    speed_spread = speeds.std() if len(names) > 1 else 0.2
+    rate_spread = rates.std() if len(names) > 1 else 0.3
+    users = {}
+    for k, p in enumerate(protos):
+        base = real[names[p]]
+        users[f"{names[p]}_{k:0{len(str(n_users))}d}"] = dict(
+            base,
+            weight=1.0 / n_users,
+            log_cps_mean=float(base["log_cps_mean"] + rng.normal(0, speed_spread)),
+            edit_rate=float(base["edit_rate"] * np.exp(rng.normal(0, rate_spread)))
+        )
+    return dict(profile, users=users)
+
+# ---------- GENERATE ----------
+
+def _typo_block(ref_codes, edit_p, mix, rng):
+    """Type the reference (a code-point array) once per row with random edits.
+
+    Each reference char is, independently with probability edit_p[row],
+    substituted, followed by an inserted char, or dropped, in proportions
+    mix[row]. Returns the typed strings.
+    """
+    m, n = len(edit_p), len(ref_codes)
+    r = rng.random((m, n), dtype=np.float32)
+    op = rng.random((m, n), dtype=np.float32)
+    edited = r < edit_p[:, None]
+    cum = np.cumsum(mix, axis=1)
+    sub = edited & (op < cum[:, 0:1])
+    ins = edited & ~sub & (op < cum[:, 1:2])
+    dele = edited & ~sub & ~ins
+    # Output chars per reference char: 0 dropped, 2 with an insertion, else 1.
+    counts = (1 + ins - dele).astype(np.int64).ravel()
+    out = np.repeat(np.tile(ref_codes, m), counts)
+    last = np.cumsum(counts) - 1
+    changed = last[(sub | ins).ravel()]
+    out[changed] = rng.choice(TYPO_CHARS, size=len(changed))
+    lengths = counts.reshape(m, n).sum(axis=1)
+    width = max(int(lengths.max()), 1)
+    grid = np.zeros((m, width), dtype=np.uint32)
+    row_of = np.repeat(np.arange(m), lengths)
+    grid[row_of, np.arange(len(out)) - np.repeat(np.cumsum(lengths) - lengths, lengths)] = out
+    return grid.view(f"<U{width}").ravel().tolist()
+
+def generate(profile, n_rows, seed=0, first_id=1, start_offset=0):
+    """`n_rows` sessions as a DataFrame with RAW_COLUMNS.
+
+    `start_offset` places the block's clock that many sessions after the
+    profile's start, so shards generated separately line up in time.
+    """
+    rng = np.random.default_rng(seed)
+    users = list(profile["users"].values())
+    names = np.array(list(profile["users"]), dtype=object)
+    weights = np.array([u["weight"] for u in users])
+    user = rng.choice(len(users), size=n_rows, p=weights / weights.sum())
+
+    refs = profile["references"]
+    ref_pick = rng.choice(len(refs["values"]), size=n_rows, p=refs["p"])
+    sleep = rng.choice(np.array(profile["sleep"]["values"], dtype=float), size=n_rows, p=profile["sleep"]["p"])
+    bucket = np.digitize(sleep, SLEEP_BUCKETS)
+    stress_cdf = np.cumsum(profile["stress_given_sleep"], axis=1)[bucket]
+    stress = (rng.random(n_rows)[:, None] > stress_cdf[:, :-1]).sum(axis=1)
+
+    log_cps_mean = np.array([u["log_cps_mean"] for u in users])[user]
+    log_cps_std = np.array([u["log_cps_std"] for u in users])[user]
+    cps = np.exp(log_cps_mean + np.array(profile["speed_shift"])[stress] + rng.standard_normal(n_rows) * log_cps_std)
+    p_clean = np.array([u["p_clean"] for u in users])[user]
+    # Gamma(2) around the user's rate: most sessions near it, a few much worse.
+    edit_p = np.array([u["edit_rate"] for u in users])[user] * np.array(profile["rate_factor"])[stress]
+    edit_p = np.where(rng.random(n_rows) < p_clean, 0.0, rng.gamma(2.0, 0.5, n_rows) * edit_p).clip(0, MAX_EDIT_RATE)
+    mix = np.array([u["mix"] for u in users])[user]
+
+    typed = np.empty(n_rows, dtype=object)
+    for k, ref in enumerate(refs["values"]):
+        rows = np.flatnonzero(ref_pick == k)
+        codes = np.frombuffer(ref.encode("utf-32-le"), dtype=np.uint32)
+        for s in range(0, len(rows), BLOCK_ROWS):
+            block = rows[s:s + BLOCK_ROWS]
+            typed[block] = _typo_block(codes, edit_p[block], mix[block], rng)
+    references = np.array(refs["values"], dtype=object)[ref_pick]
+    typed_len = np.fromiter(map(len, typed), dtype=np.int64, count=n_rows)
+    time_taken = np.round(np.maximum(typed_len, 1) / cps, 2).clip(min=0.01)
+    f = batch_session_features(references, typed, time_taken)
+
+    gaps = rng.exponential(1.0, n_rows)
+    seconds = profile["mean_gap_sec"] * (start_offset + np.cumsum(gaps) * n_rows / gaps.sum())
+    stamps = np.datetime64(pd.Timestamp(profile["start"]).to_datetime64(), "s") + seconds.astype("timedelta64[s]")
+    date_time = np.strings.replace(np.datetime_as_string(stamps, unit="s"), "T", " ")
+
+    notes = profile["notes"]
+    note = np.where(
+        rng.random(n_rows) < profile["p_note"],
+        rng.choice(np.array(notes["values"], dtype=object), size=n_rows, p=notes["p"]),
+        ""
+    )
+    sleep_out = np.where(rng.random(n_rows) < profile["p_sleep_missing"], np.nan, sleep)
+    return pd.DataFrame({
+        "session_id": np.arange(first_id, first_id + n_rows),
+        "user_id": names[user],
+        "reference_text": references,
+        "reference_text_len": f["reference_len"].to_numpy(),
+        "typed_text": typed,
+        "typed_text_len": f["typed_len"].to_numpy(),
+        "time_taken_sec": time_taken,
+        "accuracy_percent": f["accuracy_percent"].to_numpy(),
+        "mistake_count": f["mistake_count"].to_numpy(),
+        "backspace_estimate": f["difficulty_score"].to_numpy(),
+        "date_time": date_time.astype(object),
+        "self_stress_level": stress,
+        "sleep_hours": sleep_out,
+        "notes": note
+    })[RAW_COLUMNS]
+
+# ---------- SHARDED OUTPUT ----------
+
+def _part_path(parts_dir, shard, fmt):
+    return os.path.join(parts_dir, f"part-{shard:05d}.{fmt}")
+
+def _write_csv(df, path):
+    """Header-less CSV part; pyarrow's writer when installed (about 20x faster than pandas)."""
+    try:
+        pa = storage._pyarrow()
+        import pyarrow.csv
+    except ImportError:
+        df.to_csv(path, index=False, header=False, lineterminator="\n")
+        return
+    pa.csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path,
+                     write_options=pa.csv.WriteOptions(include_header=False))
+
+def _write_shard(task):
+    profile, seed, shard, start, rows, parts_dir, fmt = task
+    df = generate(profile, rows, seed=seed, first_id=start + 1, start_offset=start)
+    path = _part_path(parts_dir, shard, fmt)
+    if fmt == "csv":
+        _write_csv(df, path)
+    else:
+        pa = storage._pyarrow()
+        table = pa.Table.from_pandas(storage._dictionary_encode(df), preserve_index=False)
+        table = table.cast(pa.schema([
+            pa.field(f.name, pa.dictionary(pa.int32(), pa.string())) if f.name in storage.DICTIONARY_COLUMNS
+            else pa.field(f.name, pa.float64() if f.name == "sleep_hours" else f.type)
+            for f in table.schema
+        ]))
+        pa.parquet.write_table(table, path, compression="zstd")
+    return shard, rows
+
+def write_sessions(profile, path, n_rows, seed=0, workers=1, shard_rows=250_000, progress=None):
+    """Generate `n_rows` sessions into `path` (.csv file or .parquet dataset directory)."""
+    fmt = os.path.splitext(path)[1].lower().lstrip(".")
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown output format for {path!r}; expected .csv or .parquet")
+    parts_dir = path if fmt == "parquet" else path + ".parts"
+    if os.path.isdir(parts_dir):
+        shutil.rmtree(parts_dir)
+    os.makedirs(parts_dir)
+    starts = range(0, n_rows, shard_rows)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [
+        (profile, seeds[k], k, start, min(shard_rows, n_rows - start), parts_dir, fmt)
+        for k, start in enumerate(starts)
+    ]
+    done = 0
+    if workers > 1 and len(tasks) > 1:
+        with mp.get_context("spawn").Pool(workers) as pool:
+            for _, rows in pool.imap_unordered(_write_shard, tasks):
+                done += rows
+                if progress:
+                    progress(done)
+    else:
+        for task in tasks:
+            done += _write_shard(task)[1]
+            if progress:
+                progress(done)
+    if fmt == "csv":
+        tmp = path + ".tmp"
+        with open(tmp, mode="wb") as out:
+            out.write((",".join(RAW_COLUMNS) + "\n").encode("utf-8"))
+            for k in range(len(tasks)):
+                with open(_part_path(parts_dir, k, fmt), mode="rb") as part:
+                    shutil.copyfileobj(part, out, 16 << 20)
+        os.replace(tmp, path)
+        shutil.rmtree(parts_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic typing sessions fitted to the real ones.")
+    parser.add_argument("output", help="output .csv file or .parquet dataset directory")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=0, help="synthetic users (default: the real ones)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-rows", type=int, default=250_000)
+    parser.add_argument("--source", default=DATA_FILE, help="real sessions to fit the distributions to")
+    args = parser.parse_args()
+
+    profile = expand_users(fit_profile(pd.read_csv(args.source)), args.users, seed=args.seed)
+    print(f"Fitted {len(profile['users'])} users and {len(profile['references']['values'])} reference texts "
+          f"from {args.source}")
+    start = time.perf_counter()
+
+    def progress(done):
+        elapsed = time.perf_counter() - start
+        print(f"  {done:>13,} rows  {done / elapsed:>10,.0f} rows/s", end="\r", flush=True)
+
+    write_sessions(profile, args.output, args.rows, seed=args.seed, workers=args.workers,
+                   shard_rows=args.shard_rows, progress=progress)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(args.output) for f in fs) \
+        if os.path.isdir(args.output) else os.path.getsize(args.output)
+    print(f"\n✅ {args.rows:,} sessions written to {args.output} in {elapsed:.1f} s: "
+          f"{args.rows / elapsed:,.0f} rows/s, {size / elapsed / 1e6:,.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
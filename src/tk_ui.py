@@ -1,57 +1,153 @@
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 import time
-import random
+APP_START = time.perf_counter()  # before the heavy imports, for time-to-first-paint
+import datetime
 import os
-import joblib
-import pandas as pd
-
-# ---------- REFERENCE TEXTS (same style as typing_logger) ----------
-REFERENCE_TEXTS = [
-    "Python makes data science fun and powerful.",
-    "Typing speed and accuracy can reflect our focus.",
-    "Machine learning finds patterns in noisy data.",
-    "College projects are a great way to learn real skills.",
-    "Typing speed and accuracy during a test can reflect how focused or distracted a student is at that moment.",
-    "Machine learning models can discover hidden patterns in noisy data, helping us make better predictions about the real world."
-]
-
-def choose_reference_text():
-    return random.choice(REFERENCE_TEXTS)
-
-# ---------- HELPER FUNCTIONS (same logic as live_predict) ----------
-
-def calculate_accuracy(reference, typed):
-    """Return (accuracy_percent, mistake_count) based on character comparison."""
-    ref = reference.strip()
-    t = typed.strip()
-    max_len = max(len(ref), len(t))
-
-    mistakes = 0
-    for i in range(max_len):
-        ref_char = ref[i] if i < len(ref) else ""
-        t_char = t[i] if i < len(t) else ""
-        if ref_char != t_char:
-            mistakes += 1
-
-    if max_len == 0:
-        return 0.0, mistakes
-
-    accuracy = ((max_len - mistakes) / max_len) * 100
-    return round(accuracy, 2), mistakes
-
-def word_level_mistakes(ref, typed):
-    ref_words = str(ref).split()
-    typed_words = str(typed).split()
-    mistakes = sum(1 for rw, tw in zip(ref_words, typed_words) if rw != tw)
-    mistakes += abs(len(ref_words) - len(typed_words))
-    return mistakes
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from src import metrics, model_cache
+from src.features import FEATURES, LABELS, session_features
+from src.streaming import LiveScorer, StreamingFeatures
+from src.keystrokes import KeystrokeRecorder, keystroke_stats, save_session, session_path
+from src.alignment import alignment_scores
+from src.live_predict import predict_one, user_relative
+from src.predict_server import is_running
+from src.reference_corpus import LEVELS, choose_reference_text
+from src.user_profiles import ProfileStore
 
 def load_model():
-    model_path = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.pkl")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file not found at: {model_path}")
-    return joblib.load(model_path)
+    """Warm model from the process-wide cache (reloaded when train_model.py writes a new one)."""
+    return model_cache.shared.get()
+
+# ---------- BACKGROUND WORK ----------
+
+class BackgroundTasks:
+    """Runs functions on one worker thread and delivers results on the Tk thread.
+
+    Finished futures are picked up by an after() poll, so callbacks always
+    run on the Tk thread. `cancel()` drops the cancellable jobs submitted so
+    far: those that have not started are cancelled, and results of running
+    ones are discarded when they arrive. Jobs submitted with
+    cancellable=False (the model load) are left alone.
+    """
+
+    def __init__(self, master, poll_ms=30):
+        self.master = master
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ui-worker")
+        self.generation = 0
+        self.pending = []
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, cancellable=True):
+        future = self.executor.submit(fn, *args)
+        self.pending.append((future, self.generation if cancellable else None, on_done, on_error))
+        if not self._polling:
+            self._polling = True
+            self.master.after(self.poll_ms, self._poll)
+        return future
+
+    def cancel(self):
+        self.generation += 1
+        for future, generation, _, _ in self.pending:
+            if generation is not None:
+                future.cancel()
+
+    def _poll(self):
+        still_pending = []
+        for future, generation, on_done, on_error in self.pending:
+            if not future.done():
+                still_pending.append((future, generation, on_done, on_error))
+            elif generation not in (None, self.generation) or future.cancelled():
+                continue
+            elif future.exception() is not None:
+                if on_error:
+                    on_error(future.exception())
+            elif on_done:
+                on_done(future.result())
+        self.pending = still_pending
+        if self.pending:
+            self.master.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        self.cancel()
+        self.pending = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def warm_up_model():
+    """Load the model in the background unless a prediction server already holds it."""
+    if is_running():
+        return "prediction server"
+    return type(load_model()).__name__
+
+def run_prediction(reference_text, typed_text, time_taken_sec, sleep_hours, events, user_id=""):
+    """Features, prediction and keystroke stats for one session; runs on the worker thread."""
+    with metrics.span("predict.features"):
+        f = session_features(reference_text, typed_text, time_taken_sec, sleep_hours)
+    with metrics.span("predict.alignment"):
+        edits = alignment_scores(reference_text, typed_text)
+    features = {name: f[name] for name in FEATURES}
+    features.update(user_relative(user_id, f))
+
+    # Predict (prediction server if reachable, else the in-process model)
+    pred = predict_one(features)
+    stress_label = LABELS.get(pred, "Unknown")
+
+    result_str = (
+        f"Predicted Stress Level: {stress_label}\n"
+        f"----------------------------------------\n"
+        f"Time taken (sec):      {time_taken_sec}\n"
+        f"Reference length:      {f['reference_len']}\n"
+        f"Typed length:          {f['typed_len']}\n"
+        f"Accuracy (%):          {f['accuracy_percent']}\n"
+        f"Mistakes (chars):      {f['mistake_count']}\n"
+        f"Word mistakes:         {f['word_mistake_count']}\n"
+        f"Char edits (s/i/d):    {edits['char_substitutions']}/{edits['char_insertions']}/{edits['char_deletions']}\n"
+        f"Word edits (s/i/d):    {edits['word_substitutions']}/{edits['word_insertions']}/{edits['word_deletions']}\n"
+        f"Chars per second:      {round(f['chars_per_sec'], 3)}\n"
+        f"Mistakes per char:     {round(f['mistakes_per_char'], 4)}\n"
+        f"Difficulty score:      {f['difficulty_score']}\n"
+        f"Word mistake rate:     {round(f['word_mistake_rate'], 4)}\n"
+        f"Sleep hours:           {sleep_hours}"
+    )
+    if user_id:
+        result_str += (
+            f"\nSpeed vs baseline (z): {features['chars_per_sec_z']:+.2f}\n"
+            f"Accuracy vs baseline:  {features['accuracy_percent_z']:+.2f}"
+        )
+
+    # Keystroke timing (the capture is saved by save_keystrokes once shown)
+    times, keys, kinds = events
+    if len(times):
+        with metrics.span("predict.keystroke_stats"):
+            stats = keystroke_stats(times, keys, kinds)
+        result_str += (
+            f"\n----------------------------------------\n"
+            f"Key presses:           {stats['key_downs']}\n"
+            f"Backspaces:            {stats['backspaces']}\n"
+            f"Mean dwell (ms):       {round(stats['mean_dwell_sec'] * 1000, 1)}\n"
+            f"Mean flight (ms):      {round(stats['mean_flight_sec'] * 1000, 1)}\n"
+            f"Pauses (>= 2 s):       {stats['pauses']}"
+        )
+    return result_str
+
+def save_keystrokes(events):
+    """Save one capture; returns a status line. Runs on the worker thread.
+
+    The UI logs no training row (it asks for no stress label), so the
+    capture gets its own id: time to the microsecond plus the process id,
+    unique across saves and stations.
+    """
+    capture_id = f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}"
+    try:
+        with metrics.span("predict.save_keystrokes"):
+            save_session(session_path(capture_id), *events)
+    except OSError as e:
+        return f"Keystrokes not saved:  {e}"
+    return f"Keystrokes saved as:   {capture_id}"
 
 # ---------- TKINTER APP ----------
 
@@ -67,21 +163,48 @@ class KeystrokeSenseApp:
         self.accent_color = "#4a6cf7"   # primary blue for button
         self.master.configure(bg=self.bg_color)
 
-        # Load model once
-        try:
-            self.model = load_model()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not load model:\n{e}")
-            self.master.destroy()
-            return
-
         self.reference_text = ""
         self.start_time = None
+        self.feature_us = 0.0
+        self.ready = False
+        self.first_paint_ms = None
+        self.tasks = BackgroundTasks(self.master)
 
         # Build UI
         self.create_widgets()
         self.new_test()  # Load first sentence
 
+        # The window draws first; the model loads on the worker thread (unless
+        # a warm prediction server has it). The cache picks up a retrained
+        # model without restarting the app.
+        self.predict_button.config(state=tk.DISABLED)
+        self.footer_label.config(text="Loading model…")
+        self.master.after_idle(self.on_first_paint)
+        self.tasks.submit(warm_up_model, on_done=self.on_model_ready, on_error=self.on_model_error,
+                          cancellable=False)
+        self.master.protocol("WM_DELETE_WINDOW", self.close)
+
+    def on_first_paint(self):
+        # Idle callbacks run after Tk's own pending redraws.
+        self.first_paint_ms = (time.perf_counter() - APP_START) * 1000
+
+    def on_model_ready(self, source):
+        self.ready = True
+        ready_ms = (time.perf_counter() - APP_START) * 1000
+        self.predict_button.config(state=tk.NORMAL)
+        self.footer_label.config(text=(
+            f"Model: {source} · first paint {self.first_paint_ms or 0:.0f} ms · ready {ready_ms:.0f} ms"
+        ))
+        print(f"time-to-first-paint: {self.first_paint_ms or 0:.0f} ms, time-to-ready: {ready_ms:.0f} ms")
+
+    def on_model_error(self, e):
+        messagebox.showerror("Error", f"Could not load model:\n{e}")
+        self.close()
+
+    def close(self):
+        self.tasks.shutdown()
+        self.master.destroy()
+
     def create_widgets(self):
         # App title
         self.app_title = tk.Label(
@@ -143,10 +266,51 @@ class KeystrokeSenseApp:
         )
         self.text_area.pack(pady=(5, 10), padx=20)
 
+        # Key-down/key-up timestamps for dwell, flight and real backspace counts
+        self.keystrokes = KeystrokeRecorder()
+        self.keystrokes.bind(self.text_area)
+
+        # Live prediction while typing: O(1) feature updates per key, debounced
+        # scoring on a worker thread, results applied here via after().
+        self.stream = None
+        self.stream_dirty = False
+        self.stream_user = None
+        self.live_results = queue.Queue()
+        self.live_scorer = LiveScorer(self.live_results.put)
+        self.text_area.bind("<KeyPress>", self.on_live_key, add="+")
+        self.text_area.bind("<KeyRelease>", self.on_live_release, add="+")
+        self.live_label = tk.Label(
+            self.master,
+            text="",
+            font=("Segoe UI", 10, "italic"),
+            bg=self.bg_color,
+            fg=self.accent_color
+        )
+        self.live_label.pack()
+        self.master.after(50, self.poll_live_results)
+
         # Sleep hours frame
         self.sleep_frame = tk.Frame(self.master, bg=self.bg_color)
         self.sleep_frame.pack(pady=(5, 10))
 
+        self.user_label = tk.Label(
+            self.sleep_frame,
+            text="User id:",
+            font=("Segoe UI", 10),
+            bg=self.bg_color,
+            fg="#333333"
+        )
+        self.user_label.pack(side=tk.LEFT)
+
+        self.user_entry = tk.Entry(
+            self.sleep_frame,
+            width=12,
+            font=("Segoe UI", 10),
+            relief="solid",
+            borderwidth=1
+        )
+        self.user_entry.pack(side=tk.LEFT, padx=(5, 15))
+
         self.sleep_label = tk.Label(
             self.sleep_frame,
             text="Sleep hours last night:",
@@ -166,10 +330,28 @@ class KeystrokeSenseApp:
         self.sleep_entry.pack(side=tk.LEFT, padx=5)
         self.sleep_entry.insert(0, "7")  # default
 
+        self.live_var = tk.BooleanVar(value=True)
+        self.live_check = tk.Checkbutton(
+            self.sleep_frame,
+            text="Live prediction",
+            variable=self.live_var,
+            font=("Segoe UI", 10),
+            bg=self.bg_color,
+            activebackground=self.bg_color
+        )
+        self.live_check.pack(side=tk.LEFT, padx=(15, 0))
+
         # Buttons row
         self.button_frame = tk.Frame(self.master, bg=self.bg_color)
         self.button_frame.pack(pady=(5, 10))
 
+        self.level_var = tk.StringVar(value="any level")
+        self.level_menu = tk.OptionMenu(self.button_frame, self.level_var, "any level", *LEVELS,
+                                        command=lambda _: self.new_test())
+        self.level_menu.config(font=("Segoe UI", 10), bg="#ffffff", relief="solid", borderwidth=1,
+                               highlightthickness=0)
+        self.level_menu.pack(side=tk.LEFT, padx=5)
+
         self.new_test_button = tk.Button(
             self.button_frame,
             text="New Sentence",
@@ -238,16 +420,92 @@ class KeystrokeSenseApp:
 
     def new_test(self):
         """Start a new typing test with a fresh sentence."""
-        self.reference_text = choose_reference_text()
+        level = self.level_var.get()
+        self.reference_text = choose_reference_text(level if level in LEVELS else None)
         self.ref_label.config(text=self.reference_text)
         self.text_area.delete("1.0", tk.END)
         self.sleep_entry.delete(0, tk.END)
         self.sleep_entry.insert(0, "7")
         self.result_text.config(text="")
+        self.keystrokes.reset()
+        # Drop a prediction still running for the previous sentence.
+        self.tasks.cancel()
+        if self.ready:
+            self.predict_button.config(state=tk.NORMAL)
+        self.stream = StreamingFeatures(self.reference_text)
+        self.stream_dirty = False
+        self.stream_user = None
+        self.live_label.config(text="")
         self.start_time = time.time()
 
+    # ---------- LIVE PREDICTION ----------
+
+    def on_live_key(self, event):
+        """Update the streaming features before Tk inserts the key (O(1) when typing at the end)."""
+        if self.stream is None:
+            return
+        if not self.live_var.get():
+            # Catch up with the text when live prediction is switched back on.
+            self.stream_dirty = True
+            return
+        start = time.perf_counter()
+        at_end = self.text_area.compare("insert", "==", "end-1c") and not self.text_area.tag_ranges("sel")
+        control = event.state & 0x4
+        if at_end and not control and event.keysym == "BackSpace":
+            self.stream.backspace()
+        elif at_end and not control and event.char and (event.char.isprintable() or event.char in "\r\t"):
+            self.stream.type_char("\n" if event.char == "\r" else event.char)
+        elif event.char or event.keysym in ("BackSpace", "Delete"):
+            # Edit away from the end, or a shortcut such as paste: resync on release.
+            self.stream_dirty = True
+            return
+        else:
+            return
+        self.push_live_features(start)
+
+    def on_live_release(self, event):
+        if self.stream is None or not self.stream_dirty or not self.live_var.get():
+            return
+        start = time.perf_counter()
+        self.stream.sync(self.text_area.get("1.0", "end-1c"))
+        self.stream_dirty = False
+        self.push_live_features(start)
+
+    def push_live_features(self, start):
+        try:
+            self.stream.sleep_hours = float(self.sleep_entry.get().strip() or 0)
+        except ValueError:
+            self.stream.sleep_hours = 0.0
+        user_id = self.user_entry.get().strip()
+        if user_id != self.stream_user:
+            # One record read when the user id changes, not per keystroke.
+            self.stream.baseline = ProfileStore().get(user_id)
+            self.stream_user = user_id
+        features = self.stream.features()
+        self.feature_us = (time.perf_counter() - start) * 1e6
+        self.live_scorer.update(features)
+
+    def poll_live_results(self):
+        """Apply results from the scoring thread on the Tk thread."""
+        result = None
+        while True:
+            try:
+                result = self.live_results.get_nowait()
+            except queue.Empty:
+                break
+        if result is not None and self.live_var.get():
+            if "error" in result:
+                self.live_label.config(text=f"Live prediction unavailable: {result['error']}")
+            else:
+                self.live_label.config(text=(
+                    f"Live: {result['stress']} ({result['confidence']:.0%})   "
+                    f"features {self.feature_us:.0f} µs · model {result['predict_ms']:.1f} ms · "
+                    f"{result['latency_ms']:.0f} ms after last key"
+                ))
+        self.master.after(50, self.poll_live_results)
+
     def predict_stress(self):
-        """Compute features from typed text and predict stress."""
+        """Collect the session on the Tk thread, predict on the worker thread."""
         if not self.reference_text:
             messagebox.showwarning("Warning", "No reference text loaded.")
             return
@@ -260,16 +518,6 @@ class KeystrokeSenseApp:
         end_time = time.time()
         time_taken_sec = round(end_time - self.start_time, 2) if self.start_time else 0.0
 
-        reference_len = len(self.reference_text.strip())
-        typed_len = len(typed_text.strip())
-
-        accuracy_percent, mistake_count = calculate_accuracy(self.reference_text, typed_text)
-        difficulty_score = max(0, (reference_len - typed_len) + mistake_count)
-        chars_per_sec = typed_len / time_taken_sec if time_taken_sec > 0 else 0.0
-        mistakes_per_char = mistake_count / reference_len if reference_len > 0 else 0.0
-        word_mistake_count = word_level_mistakes(self.reference_text, typed_text)
-        word_mistake_rate = word_mistake_count / reference_len if reference_len > 0 else 0.0
-
         # Sleep hours
         sleep_raw = self.sleep_entry.get().strip()
         try:
@@ -278,38 +526,32 @@ class KeystrokeSenseApp:
             messagebox.showwarning("Warning", "Invalid sleep hours. Using 0.")
             sleep_hours = 0.0
 
-        # Prepare feature row
-        feature_row = pd.DataFrame([{
-            "chars_per_sec": chars_per_sec,
-            "mistakes_per_char": mistakes_per_char,
-            "difficulty_score": difficulty_score,
-            "word_mistake_rate": word_mistake_rate,
-            "accuracy_percent": accuracy_percent,
-            "sleep_hours": sleep_hours
-        }])
-
-        # Predict
-        pred = self.model.predict(feature_row)[0]
-        labels = {0: "Calm", 1: "Normal", 2: "Stressed"}
-        stress_label = labels.get(pred, "Unknown")
-
-        # Show results
-        result_str = (
-            f"Predicted Stress Level: {stress_label}\n"
-            f"----------------------------------------\n"
-            f"Time taken (sec):      {time_taken_sec}\n"
-            f"Reference length:      {reference_len}\n"
-            f"Typed length:          {typed_len}\n"
-            f"Accuracy (%):          {accuracy_percent}\n"
-            f"Mistakes (chars):      {mistake_count}\n"
-            f"Word mistakes:         {word_mistake_count}\n"
-            f"Chars per second:      {round(chars_per_sec, 3)}\n"
-            f"Mistakes per char:     {round(mistakes_per_char, 4)}\n"
-            f"Difficulty score:      {difficulty_score}\n"
-            f"Word mistake rate:     {round(word_mistake_rate, 4)}\n"
-            f"Sleep hours:           {sleep_hours}"
+        self.predict_button.config(state=tk.DISABLED)
+        self.result_text.config(text="Predicting…")
+        events = self.keystrokes.events()
+        self.tasks.submit(
+            run_prediction, self.reference_text, typed_text, time_taken_sec, sleep_hours, events,
+            self.user_entry.get().strip(), on_done=lambda result: self.show_prediction(result, events),
+            on_error=self.on_prediction_error
         )
+
+    def show_prediction(self, result_str, events):
         self.result_text.config(text=result_str)
+        self.predict_button.config(state=tk.NORMAL)
+        # Only a prediction that was shown (not cancelled by "New Sentence")
+        # gets its capture written; the save itself is not cancellable.
+        if len(events[0]):
+            self.tasks.submit(save_keystrokes, events, cancellable=False,
+                              on_done=lambda status: self.show_save_status(result_str, status))
+
+    def show_save_status(self, result_str, status):
+        if self.result_text.cget("text") == result_str:
+            self.result_text.config(text=f"{result_str}\n{status}")
+
+    def on_prediction_error(self, e):
+        self.result_text.config(text="")
+        self.predict_button.config(state=tk.NORMAL)
+        messagebox.showerror("Error", f"Could not predict:\n{e}")
 
 def main():
     root = tk.Tk()
@@ -1,54 +1,143 @@
-import pandas as pd
+import argparse
+import json
 import os
+import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
+from sklearn.metrics import confusion_matrix, classification_report
 import joblib
-DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "sessions_with_features.csv")
-df = pd.read_csv(DATA_FILE)
-features = [
-    "chars_per_sec",
-    "mistakes_per_char",
-    "difficulty_score",
-    "word_mistake_rate",
-    "accuracy_percent",
-    "sleep_hours"
-]
+from src import metrics, model_registry, model_selection, storage
+from src.compiled_model import COMPILED_PATH, export_model
+from src.features import FEATURES, LABELS
+
+parser = argparse.ArgumentParser(description="Train the stress model on sessions_with_features.")
+parser.add_argument("--search", action="store_true", help="cross-validated search over models and hyperparameters")
+parser.add_argument("--folds", type=int, default=5, help="stratified folds for --search")
+parser.add_argument("--grid", help="JSON file {model: {param: [values]}} replacing the default grid")
+parser.add_argument("--jobs", type=int, default=None, help="worker processes for --search (default: all cores)")
+parser.add_argument("--budget", type=float, default=None, help="wall-clock seconds for --search")
+parser.add_argument("--user-relative", action="store_true",
+                    help="also train on each session's z-scores against the user's earlier sessions")
+parser.add_argument("--abandon-margin", type=float, default=0.10,
+                    help="drop candidates trailing the leader's mean accuracy by more than this")
+parser.add_argument("--shortlist", type=int, default=5,
+                    help="top --search candidates profiled against the budgets")
+parser.add_argument("--max-latency-ms", type=float, default=None,
+                    help="budget for single-row predict latency (p99) of the shipped model")
+parser.add_argument("--max-size-kb", type=float, default=None, help="budget for the saved model's size")
+parser.add_argument("--max-load-ms", type=float, default=None, help="budget for loading the shipped model")
+parser.add_argument("--prune-trees", type=int, nargs="*", default=[10, 25, 50, 100],
+                    help="also try the 200-tree forest cut down to these many trees")
+parser.add_argument("--prune-depths", type=int, nargs="*", default=[8, 4],
+                    help="also try forests grown to at most these depths")
+args = parser.parse_args()
+# Newest of sessions_with_features.{csv,parquet,feather}.
+DATA_FILE = storage.find_dataset(os.path.join(os.path.dirname(__file__), "..", "data", "sessions_with_features.csv"))
+features = list(FEATURES)
+# Only the feature columns and the label are loaded; the text columns are never parsed.
+# The user-relative features need each session's user and order as well.
+id_columns = ["session_id", "user_id"] if args.user_relative else []
+with metrics.span("train.read"):
+    df = storage.read(
+        DATA_FILE,
+        columns=features + ["self_stress_level"] + id_columns,
+        dtype={f: "float32" for f in features}
+    )
+metrics.count("train.rows", len(df))
+if args.user_relative:
+    from src.user_profiles import Z_FEATURES, logged_history, logged_z_scores
+    # Scored from raw_sessions.csv, the rows the profile store is built from.
+    with metrics.span("train.user_relative"):
+        z = logged_z_scores(logged_history(), df["user_id"], df["session_id"])
+    unlogged = int(np.isnan(z).any(axis=1).sum())
+    if unlogged:
+        print(f"⚠️ {unlogged} sessions are not in raw_sessions.csv; their user-relative features are 0.")
+    df[Z_FEATURES] = np.nan_to_num(z)
+    features = features + Z_FEATURES
 
 X = df[features]
 y = df["self_stress_level"]
 X = X.fillna(0)
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.30, random_state=42
-)
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-log_model = LogisticRegression(max_iter=300)
-log_model.fit(X_train_scaled, y_train)
-log_pred = log_model.predict(X_test_scaled)
-log_acc = accuracy_score(y_test, log_pred)
-
-print("\n=== Logistic Regression Results ===")
-print("Accuracy:", log_acc)
-print(confusion_matrix(y_test, log_pred))
-print(classification_report(y_test, log_pred))
-rf = RandomForestClassifier(n_estimators=200, random_state=42)
-rf.fit(X_train, y_train)
-rf_pred = rf.predict(X_test)
-rf_acc = accuracy_score(y_test, rf_pred)
-
-print("\n=== Random Forest Results ===")
-print("Accuracy:", rf_acc)
-print(confusion_matrix(y_test, rf_pred))
-print(classification_report(y_test, rf_pred))
-
-best_model = rf if rf_acc >= log_acc else log_model
+budgets = dict(max_latency_ms=args.max_latency_ms, max_size_kb=args.max_size_kb, max_load_ms=args.max_load_ms)
+if args.search:
+    from src import model_search
+    with metrics.span("train.search"):
+        report = model_search.search(
+            X, y,
+            grid=model_search.load_grid(args.grid) if args.grid else None,
+            folds=args.folds,
+            jobs=args.jobs,
+            budget=args.budget,
+            abandon_margin=args.abandon_margin
+        )
+    print("\n=== Cross-validated Model Search ===")
+    print(report.head(10).to_string(index=False))
+    report.to_csv(model_search.REPORT_PATH, index=False)
+    print(f"\n✅ Search report saved to: {model_search.REPORT_PATH}")
+    # The shortlist is refit on all sessions; a scaler, if any, is inside its Pipeline.
+    # Their cross-validated accuracy stands in for a held-out score.
+    shortlist = report[report["folds"] == report["folds"].max()].head(args.shortlist)
+    with metrics.span("train.fit"):
+        candidates = [(f"{report.iloc[0]['model']} #1", model_search.best_model(report, X, y))] + [
+            (f"{top['model']} #{top['rank']}", model_search.build(top["model"], json.loads(top["params"])).fit(X, y))
+            for _, top in shortlist.iloc[1:].iterrows()
+        ]
+    accuracy = shortlist["mean_accuracy"].tolist()
+    X_test, y_test = X, y
+else:
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.30, random_state=42
+    )
+    # The scaler lives inside the pipeline, so the saved model is self-contained.
+    log_model = model_selection.logistic_pipeline()
+    with metrics.span("train.fit_logistic"):
+        log_model.fit(X_train, y_train)
+    with metrics.span("train.fit_forest"):
+        forests = model_selection.forest_candidates(
+            X_train, y_train, trees=args.prune_trees, depths=[None] + args.prune_depths
+        )
+    candidates = [("logistic_regression", log_model)] + forests
+    accuracy = None
+
+print("\n=== Candidates (accuracy, size, load time, latency) ===")
+with metrics.span("train.profile"):
+    selection = model_selection.evaluate(candidates, X_test, y_test, features, accuracy=accuracy)
+chosen, within_budget = model_selection.select(selection, **budgets)
+selection["chosen"] = selection.index == chosen
+selection.round(4).to_csv(model_selection.REPORT_PATH, index=False)
+print(f"✅ Selection report saved to: {model_selection.REPORT_PATH}")
+name, best_model = candidates[chosen]
+if not within_budget:
+    print(f"⚠️ No candidate fits the budget; shipping the fastest one, {name}")
+
+print(f"\n=== Chosen: {name} ===")
+print("Accuracy:", selection.loc[chosen, "accuracy"], *(["(cross-validated)"] if args.search else []))
+if not args.search:
+    with metrics.span("train.predict"):
+        best_pred = best_model.predict(X_test)
+    print(confusion_matrix(y_test, best_pred))
+    print(classification_report(y_test, best_pred, zero_division=0))
 
+with metrics.span("train.publish"):
+    version = model_registry.publish(
+        best_model, features, labels=LABELS, data_path=DATA_FILE,
+        metrics=dict(selection.loc[chosen].drop(["within_budget", "chosen"]), rows=len(X))
+    )
+print(f"\n✅ Published model {version} to: {model_registry.REGISTRY_DIR}")
+
+# Standalone copies for tools that read the model files directly.
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "stress_model.pkl")
-joblib.dump(best_model, MODEL_PATH)
+# Write-then-rename so running apps never load a half-written model.
+with metrics.span("train.save"):
+    joblib.dump(best_model, MODEL_PATH + ".tmp")
+    os.replace(MODEL_PATH + ".tmp", MODEL_PATH)
+
+print(f"✅ Best model saved to: {MODEL_PATH}")
 
-print(f"\n✅ Best model saved to: {MODEL_PATH}")
+# Flat-array copy for the NumPy-only predictor; a scaler is folded in from the pipeline.
+try:
+    with metrics.span("train.export"):
+        export_model(best_model, COMPILED_PATH, feature_names=features, source_path=MODEL_PATH)
+    print(f"✅ Compiled model saved to: {COMPILED_PATH}")
+except ValueError as e:
+    # e.g. HistGradientBoosting; the stale .npz no longer matches the .pkl and is ignored.
+    print(f"⚠️ No compiled copy: {e}")
@@ -1,85 +1,41 @@
 import time
-import csv
 import os
 from datetime import datetime
+from src.session_store import SessionStore
+from src.ingest import SessionIngestor
+from src.alignment import alignment_scores
+from src.features import session_features
+from src.reference_corpus import choose_reference_text
+from src.user_profiles import ProfileStore
 
 DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "raw_sessions.csv")
 
-REFERENCE_TEXTS = [
-    "Python makes data science fun and powerful for students who love logic.",
-    "Typing speed and accuracy during a test can reflect how focused or distracted a student is at that moment.",
-    "Machine learning models can discover hidden patterns in noisy data, helping us make better predictions about the real world.",
-    "College projects are a great way to learn real skills, because they force us to combine theory, problem solving, teamwork, and clear communication in one place.",
-    "When students track their daily habits, such as sleep, screen time, and study hours, they can often see clear trends that explain why their performance improves or drops over time.",
-    "Stress does not always reduce productivity immediately, but over time it can increase mistakes, reduce focus, and make even simple tasks feel much harder than they actually are."
+RAW_COLUMNS = [
+    "session_id",
+    "user_id",
+    "reference_text",
+    "reference_text_len",
+    "typed_text",
+    "typed_text_len",
+    "time_taken_sec",
+    "accuracy_percent",
+    "mistake_count",
+    "backspace_estimate",
+    "date_time",
+    "self_stress_level",
+    "sleep_hours",
+    "notes"
 ]
 
-def choose_reference_text():
-    import random
-    if not hasattr(choose_reference_text, "last_text"):
-        choose_reference_text.last_text = None
-
-    candidates = [t for t in REFERENCE_TEXTS if t != choose_reference_text.last_text] or REFERENCE_TEXTS
-    text = random.choice(candidates)
-    choose_reference_text.last_text = text
-    return text
-def calculate_accuracy(reference, typed):
-    """Return (accuracy_percent, mistake_count)."""
-    ref = reference.strip()
-    t = typed.strip()
-    max_len = max(len(ref), len(t))
-    
-    mistakes = 0
-    for i in range(max_len):
-        ref_char = ref[i] if i < len(ref) else ""
-        t_char = t[i] if i < len(t) else ""
-        if ref_char != t_char:
-            mistakes += 1
-
-    if max_len == 0:
-        return 0.0, mistakes
-    
-    accuracy = ((max_len - mistakes) / max_len) * 100
-    return round(accuracy, 2), mistakes
-
 def init_csv_if_needed():
-    """Create the CSV file with header if it does not exist."""
-    if not os.path.exists(os.path.dirname(DATA_FILE)):
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-
-    if not os.path.isfile(DATA_FILE):
-        with open(DATA_FILE, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "session_id",
-                "user_id",
-                "reference_text",
-                "reference_text_len",
-                "typed_text",
-                "typed_text_len",
-                "time_taken_sec",
-                "accuracy_percent",
-                "mistake_count",
-                "backspace_estimate",
-                "date_time",
-                "self_stress_level",
-                "sleep_hours",
-                "notes"
-            ])
+    """Create the CSV file with header if it does not exist; returns its store."""
+    return SessionStore(DATA_FILE, columns=RAW_COLUMNS)
 
 def get_next_session_id():
-    """Find the next session id based on existing rows."""
+    """Next session id, read from the session index instead of the whole CSV."""
     if not os.path.isfile(DATA_FILE):
         return 1
-    with open(DATA_FILE, mode="r", encoding="utf-8") as f:
-        rows = list(csv.reader(f))
-        if len(rows) <= 1:
-            return 1
-        last_row = rows[-1]
-        try:
-            return int(last_row[0]) + 1
-        except Exception:
-            return 1
+    return SessionStore(DATA_FILE).next_id()
 
 def run_typing_session():
     print("=== KeystrokeSense: Typing Session Logger ===")
@@ -95,15 +51,18 @@ def run_typing_session():
     end_time = time.time()
 
     time_taken_sec = round(end_time - start_time, 2)
-    accuracy_percent, mistake_count = calculate_accuracy(reference, typed_text)
-    reference_len = len(reference.strip())
-    typed_len = len(typed_text.strip())
-    backspace_estimate = max(0, (reference_len - typed_len) + mistake_count)
+    f = session_features(reference, typed_text, time_taken_sec)
+    accuracy_percent, mistake_count = f["accuracy_percent"], f["mistake_count"]
+    reference_len, typed_len = f["reference_len"], f["typed_len"]
+    backspace_estimate = f["difficulty_score"]
 
     print("\n=== Session Summary ===")
     print(f"Time taken (sec): {time_taken_sec}")
     print(f"Accuracy (%):     {accuracy_percent}")
     print(f"Mistakes:         {mistake_count}")
+    edits = alignment_scores(reference, typed_text)
+    print(f"Edits (sub/ins/del): {edits['char_substitutions']}/{edits['char_insertions']}/{edits['char_deletions']} chars, "
+          f"{edits['word_substitutions']}/{edits['word_insertions']}/{edits['word_deletions']} words")
 
     print("\nLabel your current stress level:")
     print("  0 = Calm")
@@ -124,31 +83,36 @@ def run_typing_session():
 
     notes = input("Any notes (e.g., exam tomorrow, not feeling well)? (optional): ").strip()
 
-    init_csv_if_needed()
-    session_id = get_next_session_id()
     date_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    with open(DATA_FILE, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            session_id,
-            user_id,
-            reference,
-            reference_len,
-            typed_text,
-            typed_len,
-            time_taken_sec,
-            accuracy_percent,
-            mistake_count,
-            backspace_estimate,
-            date_time,
-            self_stress_level,
-            sleep_hours,
-            notes
-        ])
+    # Goes through the spool so several stations can share one CSV safely.
+    ingestor = SessionIngestor(DATA_FILE, RAW_COLUMNS)
+    session_id = ingestor.submit({
+        "user_id": user_id,
+        "reference_text": reference,
+        "reference_text_len": reference_len,
+        "typed_text": typed_text,
+        "typed_text_len": typed_len,
+        "time_taken_sec": time_taken_sec,
+        "accuracy_percent": accuracy_percent,
+        "mistake_count": mistake_count,
+        "backspace_estimate": backspace_estimate,
+        "date_time": date_time,
+        "self_stress_level": self_stress_level,
+        "sleep_hours": sleep_hours,
+        "notes": notes
+    })
 
     print("\n✅ Session saved successfully!")
     print(f"Saved as session_id = {session_id} in {DATA_FILE}")
 
+    # O(1) update of the user's running baseline, used for user-relative features.
+    profiles = ProfileStore()
+    z = profiles.z_scores(user_id, f)
+    profiles.update(user_id, f)
+    baseline = profiles.get(user_id)
+    print(f"Baseline for {user_id}: {baseline.count} sessions, "
+          f"speed z = {z['chars_per_sec_z']:+.2f}, accuracy z = {z['accuracy_percent_z']:+.2f}")
+
 if __name__ == "__main__":
     run_typing_session()
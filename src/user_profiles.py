@@ -0,0 +1,311 @@
+"""Per-user typing baselines, updated in O(1) per session.
+
+A slow typist and a stressed fast typist can have the same absolute
+chars_per_sec. The profile store keeps, per user and per PROFILE_FEATURES
+entry, the running count/mean/M2 (Welford) and an exponentially weighted
+mean and variance (recent form). The z-score of a session against the
+user's own history (Z_FEATURES) can then be computed without reading any
+past sessions.
+
+Storage is one fixed-size binary record per user in data/user_profiles.bin,
+in arrival order, with an in-memory map from user hash to record slot
+built when the store is opened. An update reads and rewrites that one
+record under a file lock, so several stations can share the file; a lookup
+reads one record. The file is rebuilt from raw_sessions.csv with
+`python -m src.user_profiles --rebuild` (also needed when PROFILE_FEATURES
+changes, which changes the record layout).
+
+logged_history() scores every logged session against the same user's
+sessions logged before it, from the same rows rebuild() folds into the
+store. Training and bulk scoring of past sessions use it, so no session is
+ever part of its own baseline.
+"""
+import argparse
+import os
+import numpy as np
+from src.session_store import user_key
+
+PROFILES_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "user_profiles.bin")
+DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "raw_sessions.csv")
+
+PROFILE_FEATURES = [
+    "chars_per_sec",
+    "mistakes_per_char",
+    "word_mistake_rate",
+    "accuracy_percent"
+]
+Z_FEATURES = [f"{name}_z" for name in PROFILE_FEATURES]
+# Fewer sessions than this and the baseline is too noisy: z-scores are 0.
+MIN_SESSIONS = 3
+# |z| is capped so one odd session cannot dominate the model input.
+Z_CLIP = 5.0
+# Weight of the newest session in the exponentially weighted stats.
+EWMA_ALPHA = 0.2
+
+MAGIC = b"KSUP"
+FORMAT_VERSION = 1
+_K = len(PROFILE_FEATURES)
+PROFILE_DTYPE = np.dtype([
+    ("user", "<u8"),
+    ("name", "S32"),
+    ("count", "<i8"),
+    ("mean", "<f8", (_K,)),
+    ("m2", "<f8", (_K,)),
+    ("ewma", "<f8", (_K,)),
+    ("ewvar", "<f8", (_K,))
+])
+HEADER = MAGIC + np.array([FORMAT_VERSION, _K], dtype="<u4").tobytes()
+
+def _new_record(user_id):
+    rec = np.zeros((), dtype=PROFILE_DTYPE)
+    rec["user"] = user_key(user_id)
+    rec["name"] = str(user_id).encode("utf-8")[:32]
+    return rec
+
+def _update(rec, values):
+    """Fold one session's PROFILE_FEATURES values into a record, in place."""
+    x = np.asarray(values, dtype=np.float64)
+    rec["count"] += 1
+    n = rec["count"]
+    delta = x - rec["mean"]
+    rec["mean"] += delta / n
+    rec["m2"] += delta * (x - rec["mean"])
+    if n == 1:
+        rec["ewma"] = x
+        rec["ewvar"] = 0.0
+    else:
+        diff = x - rec["ewma"]
+        step = EWMA_ALPHA * diff
+        rec["ewma"] += step
+        rec["ewvar"] = (1 - EWMA_ALPHA) * (rec["ewvar"] + diff * step)
+
+def _z(values, count, mean, m2):
+    """Z-scores of `values` against (count, mean, M2); 0 where the baseline is too thin or flat."""
+    values = np.asarray(values, dtype=np.float64)
+    count = np.asarray(count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt(m2 / np.expand_dims(count - 1, -1))
+        z = (values - mean) / std
+    usable = (np.expand_dims(count, -1) >= MIN_SESSIONS) & (std > 0)
+    return np.clip(np.where(usable, z, 0.0), -Z_CLIP, Z_CLIP)
+
+class Baseline:
+    """A read-only snapshot of one user's profile."""
+    __slots__ = ("count", "mean", "m2", "ewma", "ewvar")
+
+    def __init__(self, rec=None):
+        rec = np.zeros((), dtype=PROFILE_DTYPE) if rec is None else rec
+        self.count = int(rec["count"])
+        self.mean = rec["mean"].copy()
+        self.m2 = rec["m2"].copy()
+        self.ewma = rec["ewma"].copy()
+        self.ewvar = rec["ewvar"].copy()
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.zeros(_K)
+
+    def z_scores(self, features):
+        """Z_FEATURES for a dict holding PROFILE_FEATURES."""
+        z = _z([features[name] for name in PROFILE_FEATURES], self.count, self.mean, self.m2)
+        return dict(zip(Z_FEATURES, z.tolist()))
+
+    def describe(self):
+        """{feature: (mean, std, recent mean)} for display."""
+        std = self.std()
+        return {
+            name: (float(self.mean[i]), float(std[i]), float(self.ewma[i]))
+            for i, name in enumerate(PROFILE_FEATURES)
+        }
+
+class ProfileStore:
+    """Per-user baselines in a flat file of PROFILE_DTYPE records."""
+
+    def __init__(self, path=PROFILES_FILE):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._slots = {}
+        self._synced = len(HEADER)
+        if os.path.isfile(path):
+            self._check_header()
+            self._sync()
+
+    def _check_header(self):
+        with open(self.path, mode="rb") as f:
+            header = f.read(len(HEADER))
+        if header != HEADER:
+            raise ValueError(
+                f"{self.path} was written for other profile features; rebuild it with "
+                "python -m src.user_profiles --rebuild"
+            )
+
+    def _sync(self):
+        """Map the records appended since the last look (by this or another process)."""
+        size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        if size <= self._synced:
+            return
+        with open(self.path, mode="rb") as f:
+            f.seek(self._synced)
+            data = f.read(size - self._synced)
+        n = len(data) // PROFILE_DTYPE.itemsize
+        users = np.frombuffer(data, dtype=PROFILE_DTYPE, count=n)["user"]
+        first = (self._synced - len(HEADER)) // PROFILE_DTYPE.itemsize
+        for i, key in enumerate(users.tolist()):
+            self._slots.setdefault(key, first + i)
+        self._synced += n * PROFILE_DTYPE.itemsize
+
+    def _offset(self, slot):
+        return len(HEADER) + slot * PROFILE_DTYPE.itemsize
+
+    def _read(self, slot):
+        with open(self.path, mode="rb") as f:
+            f.seek(self._offset(slot))
+            return np.frombuffer(f.read(PROFILE_DTYPE.itemsize), dtype=PROFILE_DTYPE)[0].copy()
+
+    def __len__(self):
+        self._sync()
+        return len(self._slots)
+
+    def __contains__(self, user_id):
+        self._sync()
+        return user_key(user_id) in self._slots
+
+    def get(self, user_id):
+        """The user's current Baseline (empty if the user has no sessions yet)."""
+        self._sync()
+        slot = self._slots.get(user_key(user_id))
+        return Baseline(None if slot is None else self._read(slot))
+
+    def z_scores(self, user_id, features):
+        return self.get(user_id).z_scores(features)
+
+    def update(self, user_id, features):
+        """Fold one session (a dict holding PROFILE_FEATURES) into the user's profile."""
+        return self.update_many([(user_id, features)])
+
+    def update_many(self, sessions):
+        """Fold (user_id, features) pairs in order; each costs one record read and write."""
+        from src.ingest import FileLock
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with FileLock(self.lock_path):
+            if not os.path.isfile(self.path) or os.path.getsize(self.path) == 0:
+                with open(self.path, mode="wb") as f:
+                    f.write(HEADER)
+            self._check_header()
+            self._sync()
+            with open(self.path, mode="r+b") as f:
+                for user_id, features in sessions:
+                    key = user_key(user_id)
+                    slot = self._slots.get(key)
+                    if slot is None:
+                        rec = _new_record(user_id)
+                        slot = self._slots[key] = (self._synced - len(HEADER)) // PROFILE_DTYPE.itemsize
+                        self._synced += PROFILE_DTYPE.itemsize
+                    else:
+                        f.seek(self._offset(slot))
+                        rec = np.frombuffer(f.read(PROFILE_DTYPE.itemsize), dtype=PROFILE_DTYPE)[0].copy()
+                    _update(rec, [features[name] for name in PROFILE_FEATURES])
+                    f.seek(self._offset(slot))
+                    f.write(rec.tobytes())
+
+    def records(self):
+        """All profiles as a PROFILE_DTYPE array (one per user)."""
+        if not os.path.isfile(self.path):
+            return np.zeros(0, dtype=PROFILE_DTYPE)
+        self._check_header()
+        return np.fromfile(self.path, dtype=PROFILE_DTYPE, offset=len(HEADER))
+
+    def batch_z_scores(self, user_ids, values):
+        """Z_FEATURES against the current baselines: `values` is (rows, PROFILE_FEATURES)."""
+        records = self.records()
+        if not len(records):
+            return np.zeros((len(values), _K))
+        slots = {key: i for i, key in enumerate(records["user"].tolist())}
+        keys = {u: slots.get(user_key(u), -1) for u in set(user_ids)}
+        at = np.array([keys[u] for u in user_ids], dtype=np.int64)
+        # Unknown users (-1) get count 0, hence z = 0.
+        count = np.where(at >= 0, records["count"][at], 0)
+        return _z(values, count, records["mean"][at], records["m2"][at])
+
+def history_z_scores(df):
+    """Z_FEATURES for every row of `df` against the same user's earlier rows in `df`.
+
+    `df` needs user_id, session_id and PROFILE_FEATURES. Vectorized with
+    per-user cumulative sums. Only matches the store when `df` holds the
+    rows the store was built from; see logged_history().
+    """
+    import pandas as pd
+    order = np.argsort(df["session_id"].to_numpy(), kind="stable")
+    d = df.iloc[order]
+    x = d[PROFILE_FEATURES].fillna(0).to_numpy(dtype=np.float64)
+    users = d["user_id"].astype(str).to_numpy()
+    groups = pd.DataFrame(x).groupby(users, sort=False)
+    count = groups.cumcount().to_numpy()
+    s = groups.cumsum().to_numpy() - x
+    ss = pd.DataFrame(x * x).groupby(users, sort=False).cumsum().to_numpy() - x * x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s / count[:, None]
+        m2 = np.maximum(ss - count[:, None] * mean * mean, 0.0)
+    # Round-off leaves a tiny M2 for a constant history; treat it as flat.
+    m2 = np.where(m2 <= 1e-12 * np.maximum(ss, 1.0), 0.0, m2)
+    z = _z(x, count, np.nan_to_num(mean), m2)
+    out = np.empty_like(z)
+    out[order] = z
+    return pd.DataFrame(out, columns=Z_FEATURES, index=df.index)
+
+def logged_sessions(data_file=DATA_FILE):
+    """user_id, session_id and PROFILE_FEATURES of every logged session, in session order."""
+    from src.features import batch_session_features
+    from src.session_store import SessionStore
+    df = SessionStore(data_file).read_frame().sort_values("session_id", kind="stable").reset_index(drop=True)
+    features = batch_session_features(df["reference_text"], df["typed_text"], df["time_taken_sec"])
+    out = features[PROFILE_FEATURES].copy()
+    out.insert(0, "session_id", df["session_id"].to_numpy())
+    out.insert(0, "user_id", df["user_id"].astype(str).to_numpy())
+    return out
+
+def _session_index(user_ids, session_ids):
+    import pandas as pd
+    return pd.MultiIndex.from_arrays([
+        pd.Series(user_ids).astype(str).to_numpy(),
+        pd.to_numeric(pd.Series(session_ids), errors="coerce").to_numpy(dtype=np.float64)
+    ])
+
+def logged_history(data_file=DATA_FILE):
+    """history_z_scores() of every logged session, indexed by (user_id, session_id)."""
+    df = logged_sessions(data_file)
+    z = history_z_scores(df)
+    z.index = _session_index(df["user_id"], df["session_id"])
+    return z[~z.index.duplicated()]
+
+def logged_z_scores(history, user_ids, session_ids):
+    """`history` rows for these sessions as a (rows, Z_FEATURES) array; NaN where not logged."""
+    return history.reindex(_session_index(user_ids, session_ids)).to_numpy()
+
+def rebuild(path=PROFILES_FILE, data_file=DATA_FILE):
+    """Recreate the store from every logged session, in session order; returns the user count."""
+    df = logged_sessions(data_file)
+    if os.path.exists(path):
+        os.remove(path)
+    store = ProfileStore(path)
+    store.update_many(zip(df["user_id"], df[PROFILE_FEATURES].to_dict(orient="records")))
+    return len(store)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or rebuild the per-user typing baselines.")
+    parser.add_argument("--rebuild", action="store_true", help="recreate the store from raw_sessions.csv")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"✅ Rebuilt {rebuild()} user profiles in {PROFILES_FILE}")
+    store = ProfileStore()
+    records = store.records()
+    if not len(records):
+        print("No user profiles yet.")
+        return
+    print(f"{'user':<16} {'sessions':>8}  " + "  ".join(f"{name + ' (mean/std/recent)':>36}" for name in PROFILE_FEATURES))
+    for rec in records:
+        b = Baseline(rec)
+        cells = "  ".join(f"{m:>12.3f}{s:>12.3f}{r:>12.3f}" for m, s, r in b.describe().values())
+        print(f"{rec['name'].decode('utf-8', 'replace'):<16} {b.count:>8}  {cells}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Synthetic sessions shared by the tests and benchmarks.bench_features."""
+import random
+
+from src.reference_corpus import BUILTIN_TEXTS
+
+def typed_sessions(n, seed=0):
+    """(references, typed texts, times, sleep hours) lists for `n` synthetic sessions.
+
+    Typed texts carry typos, extra and missing characters, odd leading and
+    trailing whitespace, some are empty and some times are 0.
+    """
+    rng = random.Random(seed)
+    refs, typed, times, sleep = [], [], [], []
+    for _ in range(n):
+        ref = rng.choice(BUILTIN_TEXTS)
+        t = list(ref)
+        for _ in range(rng.choice([0, 0, 1, 2, 5])):
+            p = rng.randrange(len(t) + 1)
+            op = rng.random()
+            if op < 0.4 and p < len(t):
+                t[p] = rng.choice("abcxyz é")
+            elif op < 0.7:
+                t.insert(p, rng.choice(" ,.qwe"))
+            elif p < len(t):
+                del t[p]
+        text = "".join(t)
+        text = rng.choice(["", " ", "\t"]) + text + rng.choice(["", " ", "\n"])
+        if rng.random() < 0.02:
+            text = ""
+        refs.append(ref)
+        typed.append(text)
+        times.append(rng.choice([0.0, round(rng.uniform(3, 30), 2)]))
+        sleep.append(rng.choice([0.0, 6.5, 8.0]))
+    return refs, typed, times, sleep
@@ -0,0 +1,50 @@
+"""Online and offline features must be identical.
+
+session_features() serves typing_logger, live_predict and tk_ui;
+batch_session_features() serves feature_engineering and predict_stress;
+StreamingFeatures serves live prediction. Run from the repo root:  python -m pytest
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_engineering import DATA_FILE, build_features
+from src.features import FEATURES, SESSION_COLUMNS, batch_session_features, session_features
+from src.streaming import StreamingFeatures
+from tests.helpers import typed_sessions
+
+@pytest.fixture(scope="module")
+def sessions():
+    return typed_sessions(5_000, seed=1)
+
+def test_scalar_matches_batch(sessions):
+    refs, typed, times, sleep = sessions
+    batch = batch_session_features(refs, typed, times, sleep)
+    scalar = pd.DataFrame(
+        [session_features(r, t, s, h) for r, t, s, h in zip(refs, typed, times, sleep)], columns=SESSION_COLUMNS
+    )
+    for col in SESSION_COLUMNS:
+        np.testing.assert_array_equal(scalar[col].to_numpy(dtype=float), batch[col].to_numpy(dtype=float), err_msg=col)
+
+def test_logged_sessions_match_online_kernel():
+    df = build_features(pd.read_csv(DATA_FILE))
+    assert len(df)
+    for row in df.itertuples():
+        typed = "" if pd.isna(row.typed_text) else row.typed_text
+        f = session_features(row.reference_text, typed, row.time_taken_sec, row.sleep_hours)
+        for col in FEATURES:
+            assert f[col] == getattr(row, col), f"session {row.session_id}: {col}"
+
+def test_streaming_matches_kernel_when_submitted(sessions):
+    refs, typed, _, _ = sessions
+    for ref, t in zip(refs[:1_000], typed[:1_000]):
+        t = t.strip()
+        stream = StreamingFeatures(ref)
+        for ch in t:
+            stream.type_char(ch)
+        online = stream.features(final=True)
+        offline = session_features(ref, t, 1.0)
+        for col in FEATURES:
+            # chars_per_sec is rolling while streaming, whole-session offline.
+            if col != "chars_per_sec":
+                assert online[col] == offline[col], f"{col} for {t!r}"
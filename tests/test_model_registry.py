@@ -0,0 +1,44 @@
+"""Publishing to the model registry from each dataset format train_model.py can read."""
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src import model_registry, storage
+from src.feature_engineering import OUTPUT_FILE
+from src.features import FEATURES
+
+@pytest.fixture
+def sessions(tmp_path):
+    # A copy, so reading it never leaves an index next to the repo's dataset.
+    path = str(tmp_path / "fixture.csv")
+    shutil.copyfile(OUTPUT_FILE, path)
+    return storage.read(path)
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "feather"])
+def test_publish_from_dataset(tmp_path, sessions, fmt):
+    # The steps train_model.py takes: find the newest dataset, read it, fit, publish.
+    storage.write(sessions, storage.with_format(str(tmp_path / "sessions.csv"), fmt))
+    data_path = storage.find_dataset(str(tmp_path / "sessions.csv"))
+    df = storage.read(data_path, columns=FEATURES + ["self_stress_level"])
+    df = df[df["self_stress_level"].notna()]
+    X, y = df[FEATURES].fillna(0), df["self_stress_level"]
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+
+    registry = str(tmp_path / "registry")
+    version = model_registry.publish(model, FEATURES, data_path=data_path, registry=registry)
+    with open(os.path.join(registry, version, "manifest.json"), encoding="utf-8") as f:
+        info = json.load(f)
+    assert info["training_data"] == f"sessions.{fmt}"
+    assert info["training_data_sha1"] == model_registry.data_digest(data_path)
+    np.testing.assert_array_equal(model_registry.load(registry=registry).predict(X), model.predict(X))
+
+def test_parquet_digest_tracks_appends(tmp_path, sessions):
+    path = str(tmp_path / "sessions.parquet")
+    storage.write(sessions, path)
+    before = model_registry.data_digest(path)
+    storage.backend_for(path).append(sessions, path)
+    assert model_registry.data_digest(path) != before